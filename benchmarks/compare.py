@@ -0,0 +1,66 @@
+"""Compare two result files written by `benchmarks/run.py`.
+
+Prints the time and peak-memory ratio of every scenario present in both runs. With `--threshold`, exits with status 1
+when any ratio exceeds it, so the comparison can gate a change.
+
+Usage:
+    python benchmarks/compare.py BASELINE.json CURRENT.json [--threshold 1.10]
+"""
+
+import argparse
+import json
+import sys
+from pathlib import Path
+from typing import Optional
+
+_METRICS = (("seconds", "time", 1000, "ms"), ("peak_bytes", "peak", 2**-20, "MiB"))
+
+
+def compare(
+    baseline: dict, current: dict, threshold: Optional[float] = None
+) -> list[str]:
+    """Print the comparison table and return the names of the regressed metrics."""
+    regressions = []
+    names = [name for name in baseline["scenarios"] if name in current["scenarios"]]
+    print(f"{'scenario':>22}  {'metric':>6}  {'baseline':>12}  {'current':>12}  ratio")
+    for name in names:
+        before, after = baseline["scenarios"][name], current["scenarios"][name]
+        if before.get("params") != after.get("params"):
+            print(f"{name:>22}  parameters differ, skipped")
+            continue
+        for key, label, scale, unit in _METRICS:
+            ratio = after[key] / before[key] if before[key] else float("inf")
+            flag = ""
+            if threshold is not None and ratio > threshold:
+                flag = "  REGRESSION"
+                regressions.append(f"{name}.{label}")
+            print(
+                f"{name:>22}  {label:>6}  {before[key] * scale:9.1f} {unit:<3}"
+                f" {after[key] * scale:9.1f} {unit:<3}  {ratio:5.2f}x{flag}"
+            )
+    for name in sorted(set(baseline["scenarios"]) ^ set(current["scenarios"])):
+        print(f"{name:>22}  only present in one run, skipped")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("baseline")
+    parser.add_argument("current")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        help="Fail when a current/baseline ratio exceeds this value (e.g. 1.10).",
+    )
+    args = parser.parse_args()
+
+    baseline = json.loads(Path(args.baseline).read_text())
+    current = json.loads(Path(args.current).read_text())
+    regressions = compare(baseline, current, args.threshold)
+    if regressions:
+        print(f"Regressed: {', '.join(regressions)}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""Check that `!flatten` and `!merge` scale linearly with the size of deeply and widely nested sequences.
+
+The operands are built in memory and `Flatten.flattened`/`Merge.merged` are timed directly, since the YAML composer
+and the tree-walking passes recurse once per nesting level. For each shape the size doubles between rows: with linear
+flattening the time per item stays flat, with copying at every level it grows along with the size on the deep shapes.
+
+Usage:
+    python benchmarks/flatten.py [--sizes N,N,...] [--repeat R]
+"""
+
+import argparse
+import time
+from collections.abc import Callable
+from typing import Any
+
+from yaml_reference import Flatten, Merge
+
+
+def _deep(size: int, leaf: Callable[[int], Any]) -> list:
+    """[leaf(0), [leaf(1), [leaf(2), ...]]], nested *size* levels deep."""
+    nested: list = []
+    for index in reversed(range(size)):
+        nested = [leaf(index), nested]
+    return nested
+
+
+def _wide(size: int, leaf: Callable[[int], Any]) -> list:
+    """*size* lists of eight items each, side by side."""
+    return [[leaf(index * 8 + item) for item in range(8)] for index in range(size)]
+
+
+def _nested_merges(size: int) -> Merge:
+    merge = Merge([{"k0": 0}])
+    for index in range(1, size):
+        merge = Merge([merge, {f"k{index % 64}": index}])
+    return merge
+
+
+SHAPES: dict[str, Callable[[int], Callable[[], Any]]] = {
+    "flatten/deep": lambda size: Flatten(_deep(size, int)).flattened,
+    "flatten/wide": lambda size: Flatten(_wide(size // 8, int)).flattened,
+    "merge/deep": lambda size: (
+        Merge(_deep(size, lambda index: {f"k{index % 64}": index})).merged
+    ),
+    "merge/nested-merges": lambda size: _nested_merges(size).merged,
+}
+
+
+def _best_of(operation: Callable[[], Any], repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        operation()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--sizes",
+        default="2000,4000,8000,16000,32000",
+        help="Comma-separated numbers of items.",
+    )
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    sizes = [int(size) for size in args.sizes.split(",")]
+    print(f"{'shape':>26} {'items':>8} {'ms':>9} {'ns/item':>9}")
+    for name, build in SHAPES.items():
+        for size in sizes:
+            seconds = _best_of(build(size), args.repeat)
+            print(
+                f"{name:>26} {size:>8} {seconds * 1e3:>9.2f} {seconds / size * 1e9:>9.0f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+"""Synthetic reference graphs used by the benchmark runner.
+
+Every generator writes a self-contained tree of YAML files below `root` and returns the path of the file to load. The
+size parameters are keyword arguments so that the runner can scale each shape independently.
+"""
+
+from collections.abc import Callable
+from pathlib import Path
+from typing import NamedTuple
+
+
+def _write(path: Path, text: str) -> Path:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(text)
+    return path
+
+
+def _payload(index: int, keys: int = 5) -> str:
+    """A small block-style configuration mapping, indented to sit under a top-level key."""
+    return "".join(
+        f"  key_{index}_{key}: {{name: item-{key}, enabled: true, weight: {key * 0.5}, tags: [a, b, c]}}\n"
+        for key in range(keys)
+    )
+
+
+def deep_chain(root: Path, depth: int = 200) -> Path:
+    """A linear chain of `!reference` tags: file N references file N + 1."""
+    for index in range(depth):
+        tail = (
+            f"next: !reference link-{index + 1:04d}.yml\n"
+            if index + 1 < depth
+            else "next: null\n"
+        )
+        _write(
+            root / f"link-{index:04d}.yml",
+            f"depth: {index}\ndata:\n{_payload(index)}{tail}",
+        )
+    return _write(root / "root.yml", "chain: !reference link-0000.yml\n")
+
+
+def wide_fanout(root: Path, files: int = 500) -> Path:
+    """One `!reference-all` glob expanding to many independent leaf files."""
+    for index in range(files):
+        _write(root / "leaves" / f"leaf-{index:05d}.yml", f"data:\n{_payload(index)}")
+    return _write(root / "root.yml", "leaves: !reference-all leaves/*.yml\n")
+
+
+def diamond(root: Path, layers: int = 5, width: int = 4) -> Path:
+    """Layers of files where every file references every file of the next layer, so shared files are reached many
+    times (width ** layers paths through the graph)."""
+    for layer in range(layers, -1, -1):
+        for index in range(width):
+            if layer == layers:
+                body = f"data:\n{_payload(index)}"
+            else:
+                body = "children:\n" + "".join(
+                    f"  - !reference ../layer-{layer + 1}/node-{child}.yml\n"
+                    for child in range(width)
+                )
+            _write(root / f"layer-{layer}" / f"node-{index}.yml", body)
+    return _write(root / "root.yml", "top: !reference layer-0/node-0.yml\n")
+
+
+def large_file(root: Path, keys: int = 10000) -> Path:
+    """A single large, tag-free document referenced from a small root."""
+    _write(root / "large.yml", "items:\n" + _payload(0, keys))
+    return _write(root / "root.yml", "large: !reference large.yml\n")
+
+
+def anchor_heavy(root: Path, anchors: int = 100) -> Path:
+    """Many `!reference` tags each extracting a different anchor from the same file."""
+    _write(
+        root / "anchors.yml",
+        "".join(
+            f"section_{index}: &anchor_{index}\n{_payload(index, keys=3)}"
+            for index in range(anchors)
+        ),
+    )
+    return _write(
+        root / "root.yml",
+        "".join(
+            f"ref_{index}: !reference {{ path: anchors.yml, anchor: anchor_{index} }}\n"
+            for index in range(anchors)
+        ),
+    )
+
+
+def alias_heavy(root: Path, anchors: int = 50, aliases: int = 5000) -> Path:
+    """A referenced file in which a few anchored mappings are aliased many times."""
+    body = "".join(
+        f"base_{index}: &base_{index}\n{_payload(index, keys=3)}"
+        for index in range(anchors)
+    )
+    body += "uses:\n" + "".join(
+        f"  - *base_{index % anchors}\n" for index in range(aliases)
+    )
+    _write(root / "aliases.yml", body)
+    return _write(root / "root.yml", "aliases: !reference aliases.yml\n")
+
+
+def nested_flatten_merge(root: Path, depth: int = 30, width: int = 20) -> Path:
+    """Deeply nested `!flatten` and `!merge` tags, interleaved with references to small files.
+
+    Each `!merge` level sits under a key of its parent rather than directly in its operand list, which the merge pass
+    does not support.
+    """
+    _write(root / "part.yml", "- shared\n- [nested, [deeper]]\n")
+    _write(root / "overrides.yml", "from_file: true\n")
+    flatten = "[" + ", ".join(str(index) for index in range(width)) + "]"
+    merge = "{" + ", ".join(f"k{index}: {index}" for index in range(width)) + "}"
+    for level in range(depth):
+        flatten = f"!flatten [{flatten}, [{level}, [{level}]], !reference part.yml]"
+        merge = f"!merge [{{nested: {merge}}}, {{level_{level}: {level}}}, !reference overrides.yml]"
+    return _write(root / "root.yml", f"flat: {flatten}\nmerged: {merge}\n")
+
+
+class Scenario(NamedTuple):
+    generator: Callable[..., Path]
+    params: dict
+    quick_params: dict
+
+
+SCENARIOS: dict[str, Scenario] = {
+    "deep_chain": Scenario(deep_chain, {"depth": 200}, {"depth": 20}),
+    "wide_fanout": Scenario(wide_fanout, {"files": 500}, {"files": 20}),
+    "diamond": Scenario(diamond, {"layers": 5, "width": 4}, {"layers": 2, "width": 3}),
+    "large_file": Scenario(large_file, {"keys": 10000}, {"keys": 500}),
+    "anchor_heavy": Scenario(anchor_heavy, {"anchors": 100}, {"anchors": 10}),
+    "alias_heavy": Scenario(
+        alias_heavy, {"anchors": 50, "aliases": 5000}, {"anchors": 5, "aliases": 100}
+    ),
+    "nested_flatten_merge": Scenario(
+        nested_flatten_merge, {"depth": 30, "width": 20}, {"depth": 5, "width": 5}
+    ),
+}
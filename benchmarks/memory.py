@@ -0,0 +1,213 @@
+"""Track the peak and retained memory of each stage of `load_yaml_with_references`.
+
+Every scenario from `generators.SCENARIOS` is loaded under tracemalloc. The stages are measured through the spans of a
+`LoadStats` collector: parse and location attribution of the root file, reference resolution (which parses every
+referenced file), pruning, flattening and merging, followed by serializing the result to JSON. For each stage the
+peak and retained memory are reported relative to the memory in use before the load started.
+
+The figure of merit is the ratio of the overall peak to the deep size of the final result: it counts how many copies
+of the data the pipeline holds at its worst moment. A warm-up load runs before the measured one, so that one-time
+allocations do not count. `--check` compares it with a baseline and fails when any scenario got worse by more than the
+tolerance.
+
+Usage:
+    python benchmarks/memory.py [--scenario NAME ...] [--quick] [--output results.json]
+    python benchmarks/memory.py --check benchmarks/memory_baseline.json [--tolerance 0.10]
+    python benchmarks/memory.py --write-baseline benchmarks/memory_baseline.json
+"""
+
+import argparse
+import json
+import platform
+import sys
+import tempfile
+import tracemalloc
+from collections.abc import Iterator
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Optional
+
+from generators import SCENARIOS
+
+from yaml_reference import LoadStats, load_yaml_with_references
+
+STAGES = ("parse", "attribute", "resolve", "prune", "flatten", "merge", "json")
+
+
+@dataclass
+class _StageMemory(LoadStats):
+    """A `LoadStats` collector which also measures tracemalloc peaks for the first span of every stage.
+
+    tracemalloc keeps a single peak counter, so nested stages (attribution runs inside the root file's parse) reset it
+    and hand their own peak back to the enclosing stage when they end.
+    """
+
+    base: int = 0
+    stages: dict[str, dict[str, int]] = field(default_factory=dict)
+    _open: list[list[int]] = field(default_factory=list, repr=False)
+
+    @contextmanager
+    def measure(self, stage: str) -> Iterator[None]:
+        if self._open:
+            self._open[-1][0] = max(
+                self._open[-1][0], tracemalloc.get_traced_memory()[1]
+            )
+        tracemalloc.reset_peak()
+        frame = [0]
+        self._open.append(frame)
+        try:
+            yield
+        finally:
+            current, peak = tracemalloc.get_traced_memory()
+            peak = max(peak, frame[0])
+            self._open.pop()
+            if self._open:
+                self._open[-1][0] = max(self._open[-1][0], peak)
+            tracemalloc.reset_peak()
+            self.stages[stage] = {
+                "peak_bytes": peak - self.base,
+                "retained_bytes": current - self.base,
+            }
+
+    @contextmanager
+    def span(
+        self, category: str, name: str, path: Optional[str] = None
+    ) -> Iterator[None]:
+        stage = name if category == "pass" else category
+        with super().span(category, name, path):
+            if stage in STAGES and stage not in self.stages:
+                with self.measure(stage):
+                    yield
+            else:
+                yield
+
+
+def _deep_sizeof(data: Any) -> int:
+    """Return the size of *data* and of every object it holds, counting objects held several times once."""
+    seen: set[int] = set()
+    stack = [data]
+    size = 0
+    while stack:
+        item = stack.pop()
+        if id(item) in seen:
+            continue
+        seen.add(id(item))
+        size += sys.getsizeof(item)
+        if isinstance(item, dict):
+            stack.extend(item.keys())
+            stack.extend(item.values())
+        elif isinstance(item, (list, tuple, set, frozenset)):
+            stack.extend(item)
+    return size
+
+
+def measure(main: Path, backend: str) -> dict:
+    # A first load pays for one-time allocations, such as the caches of ruamel.yaml and of the glob matcher, which
+    # would otherwise count towards the stages of whichever load runs first.
+    load_yaml_with_references(main, backend=backend)
+    tracemalloc.start()
+    try:
+        collector = _StageMemory(base=tracemalloc.get_traced_memory()[0])
+        data = load_yaml_with_references(main, backend=backend, stats=collector)
+        with collector.measure("json"):
+            output = json.dumps(data, sort_keys=True, indent=2)
+    finally:
+        tracemalloc.stop()
+    # Measured on the result itself: the traced memory left over after the load also holds whatever the load cached.
+    result_bytes = _deep_sizeof(data)
+    peak = max(stage["peak_bytes"] for stage in collector.stages.values())
+    return {
+        "stages": {
+            stage: collector.stages[stage]
+            for stage in STAGES
+            if stage in collector.stages
+        },
+        "peak_bytes": peak,
+        "result_bytes": result_bytes,
+        "json_bytes": len(output),
+        "peak_to_output": peak / max(result_bytes, 1),
+    }
+
+
+def run(names: list[str], quick: bool, backend: str) -> dict:
+    results = {}
+    for name in names:
+        scenario = SCENARIOS[name]
+        params = scenario.quick_params if quick else scenario.params
+        with tempfile.TemporaryDirectory() as tmp:
+            main = scenario.generator(Path(tmp), **params)
+            results[name] = {"params": params, **measure(main, backend)}
+        stages = ", ".join(
+            f"{stage}={values['peak_bytes'] / 2**20:.2f}"
+            for stage, values in results[name]["stages"].items()
+        )
+        print(
+            f"{name:>22}: peak/output {results[name]['peak_to_output']:5.2f}  (stage peaks, MiB: {stages})",
+            file=sys.stderr,
+        )
+    return {
+        "environment": {"python": platform.python_version(), "backend": backend},
+        "scenarios": results,
+    }
+
+
+def check(results: dict, baseline: dict, tolerance: float) -> list[str]:
+    """Return the scenarios whose peak-to-output ratio exceeds the baseline by more than *tolerance*."""
+    if results["environment"] != baseline["environment"]:
+        print(
+            f"Warning: baseline was recorded with {baseline['environment']}, this run uses {results['environment']}.",
+            file=sys.stderr,
+        )
+    regressions = []
+    for name, expected in baseline["scenarios"].items():
+        actual = results["scenarios"].get(name)
+        if actual is None or actual["params"] != expected["params"]:
+            continue
+        limit = expected["peak_to_output"] * (1 + tolerance)
+        if actual["peak_to_output"] > limit:
+            regressions.append(
+                f"{name}: peak/output {actual['peak_to_output']:.2f} > {limit:.2f}"
+                f" (baseline {expected['peak_to_output']:.2f})"
+            )
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--scenario", action="append", choices=sorted(SCENARIOS), dest="scenarios"
+    )
+    parser.add_argument("--quick", action="store_true", help="Use small graph sizes.")
+    parser.add_argument(
+        "--backend",
+        default="pure",
+        help="Parser backend; pure by default so that results do not depend on ruamel.yaml.clib.",
+    )
+    parser.add_argument("--output", help="Write the JSON results to this file.")
+    parser.add_argument(
+        "--check", metavar="BASELINE", help="Fail if a peak-to-output ratio regressed."
+    )
+    parser.add_argument("--tolerance", type=float, default=0.10)
+    parser.add_argument(
+        "--write-baseline",
+        metavar="BASELINE",
+        help="Save the results as the new baseline.",
+    )
+    args = parser.parse_args()
+
+    results = run(args.scenarios or list(SCENARIOS), args.quick, args.backend)
+    for path in filter(None, (args.output, args.write_baseline)):
+        Path(path).write_text(json.dumps(results, indent=2, sort_keys=True) + "\n")
+    if args.check:
+        regressions = check(
+            results, json.loads(Path(args.check).read_text()), args.tolerance
+        )
+        for regression in regressions:
+            print(f"REGRESSION {regression}", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""Compare the pure-Python and C (libyaml) parser backends on typical file sizes.
+
+A root file pulls in a directory of generated leaf files through `!reference-all`; each leaf is a configuration-style
+mapping of the requested size with a few nested references. The graph is loaded with every available backend and the
+best of several runs is reported.
+
+Usage:
+    python benchmarks/parser_backend.py [--files N] [--sizes KB,KB,...] [--repeat R]
+"""
+
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+from yaml_reference import PARSER_BACKENDS, CParser, load_yaml_with_references
+
+
+def _leaf(index: int, kilobytes: int) -> str:
+    lines = [f"name: leaf-{index}", "defaults: !reference ../shared.yml", "items:"]
+    while sum(len(line) + 1 for line in lines) < kilobytes * 1024:
+        item = len(lines)
+        lines.append(
+            f"  - {{id: {item}, label: 'item {item}', enabled: true, weight: {item * 0.5}}}"
+        )
+    return "\n".join(lines) + "\n"
+
+
+def _write_tree(root: Path, files: int, kilobytes: int) -> Path:
+    (root / "leaves").mkdir(parents=True)
+    (root / "shared.yml").write_text("timeout: 30\nretries: 3\n")
+    for index in range(files):
+        (root / "leaves" / f"leaf-{index:04d}.yml").write_text(_leaf(index, kilobytes))
+    main = root / "root.yml"
+    main.write_text("leaves: !reference-all leaves/*.yml\n")
+    return main
+
+
+def _best_of(main: Path, backend: str, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        load_yaml_with_references(main, backend=backend)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--files", type=int, default=50)
+    parser.add_argument("--sizes", default="1,16,128")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    backends = [backend for backend in PARSER_BACKENDS if backend != "auto"]
+    if CParser is None:
+        print("ruamel.yaml.clib is not installed; only the pure backend is measured.")
+        backends = ["pure"]
+
+    for kilobytes in (int(size) for size in args.sizes.split(",")):
+        with tempfile.TemporaryDirectory() as tmp:
+            main_file = _write_tree(Path(tmp), args.files, kilobytes)
+            timings = {
+                backend: _best_of(main_file, backend, args.repeat)
+                for backend in backends
+            }
+        row = ", ".join(
+            f"{backend}={elapsed * 1000:8.1f} ms"
+            for backend, elapsed in timings.items()
+        )
+        speedup = timings["pure"] / timings["c"] if "c" in timings else 1.0
+        print(
+            f"{args.files:4d} x {kilobytes:4d} KB: {row} (c is {speedup:.1f}x faster)"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""Run the synthetic reference-graph benchmarks and save the results as JSON.
+
+Each scenario from `generators.SCENARIOS` is written to a temporary directory and loaded with
+`load_yaml_with_references`. Wall time is the best of several runs; peak memory is measured by tracemalloc in a
+separate run, so that tracing overhead does not skew the timings. With `--in-memory`, the written files are loaded into
+an `InMemorySource` first, which leaves the parse and resolution cost without the filesystem cost.
+
+Usage:
+    python benchmarks/run.py [--output results.json] [--scenario NAME ...] [--repeat R] [--quick] [--in-memory]
+"""
+
+import argparse
+import json
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Optional
+
+import ruamel.yaml
+from generators import SCENARIOS
+
+from yaml_reference import CParser, InMemorySource, Source, load_yaml_with_references
+
+
+def _in_memory(root: Path) -> InMemorySource:
+    return InMemorySource(
+        {path: path.read_text() for path in root.resolve().rglob("*") if path.is_file()}
+    )
+
+
+def _measure(main: Path, repeat: int, source: Optional[Source] = None) -> dict:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        load_yaml_with_references(main, source=source)
+        timings.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    try:
+        load_yaml_with_references(main, source=source)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        "seconds": min(timings),
+        "mean_seconds": sum(timings) / len(timings),
+        "peak_bytes": peak,
+    }
+
+
+def run(names: list[str], repeat: int, quick: bool, in_memory: bool = False) -> dict:
+    results = {}
+    for name in names:
+        scenario = SCENARIOS[name]
+        params = scenario.quick_params if quick else scenario.params
+        with tempfile.TemporaryDirectory() as tmp:
+            main = scenario.generator(Path(tmp), **params)
+            source = _in_memory(Path(tmp)) if in_memory else None
+            results[name] = {
+                "params": params,
+                **_measure(main.resolve(), repeat, source),
+            }
+        print(
+            f"{name:>22}: {results[name]['seconds'] * 1000:10.1f} ms,"
+            f" peak {results[name]['peak_bytes'] / 2**20:8.2f} MiB",
+            file=sys.stderr,
+        )
+    return {
+        "environment": {
+            "python": platform.python_version(),
+            "implementation": platform.python_implementation(),
+            "ruamel.yaml": ruamel.yaml.__version__,
+            "c_parser": CParser is not None,
+            "source": "memory" if in_memory else "disk",
+        },
+        "scenarios": results,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--output", help="Write the JSON results to this file instead of stdout."
+    )
+    parser.add_argument(
+        "--scenario",
+        action="append",
+        choices=sorted(SCENARIOS),
+        dest="scenarios",
+        help="Scenario to run; may be repeated (default: all).",
+    )
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument(
+        "--quick",
+        action="store_true",
+        help="Use small graph sizes, for smoke-testing the suite.",
+    )
+    parser.add_argument(
+        "--in-memory",
+        action="store_true",
+        help="Load every scenario from an InMemorySource, to leave out the filesystem cost.",
+    )
+    args = parser.parse_args()
+
+    results = run(
+        args.scenarios or list(SCENARIOS), args.repeat, args.quick, args.in_memory
+    )
+    if args.output:
+        Path(args.output).write_text(
+            json.dumps(results, indent=2, sort_keys=True) + "\n"
+        )
+    else:
+        json.dump(results, sys.stdout, indent=2, sort_keys=True)
+        print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""Measure the filesystem syscalls saved by the per-resolution metadata cache.
+
+Every `os.stat`, `os.lstat` and `os.scandir` call is counted and artificially slowed down, standing in for a network
+filesystem where each metadata round-trip is expensive. The same reference graph is then loaded with the cache
+enabled and with every cache lookup forced to miss.
+
+Usage:
+    python benchmarks/stat_cache.py [--files N] [--latency-ms MS]
+"""
+
+import argparse
+import os
+import tempfile
+import time
+from collections import Counter
+from contextlib import contextmanager
+from pathlib import Path
+from unittest import mock
+
+from yaml_reference import load_yaml_with_references
+from yaml_reference._paths import _FileSystemCache
+
+
+def _write_tree(root: Path, files: int) -> Path:
+    """Write a fan-out / fan-in graph: every service references the same shared files, and is globbed twice."""
+    (root / "shared").mkdir(parents=True)
+    (root / "services").mkdir()
+    (root / "shared" / "defaults.yml").write_text("timeout: 30\nretries: 3\n")
+    (root / "shared" / "labels.yml").write_text("team: platform\n")
+    for index in range(files):
+        (root / "services" / f"service-{index:04d}.yml").write_text(
+            f"name: service-{index}\n"
+            "defaults: !reference ../shared/defaults.yml\n"
+            "labels: !reference ../shared/labels.yml\n"
+        )
+    main = root / "root.yml"
+    main.write_text(
+        "services: !reference-all services/*.yml\n"
+        "names: !reference-all { glob: services/*.yml }\n"
+        "defaults: !reference shared/defaults.yml\n"
+    )
+    return main
+
+
+@contextmanager
+def _slow_metadata_calls(latency: float, counts: Counter):
+    originals = {name: getattr(os, name) for name in ("stat", "lstat", "scandir")}
+
+    def _wrap(name):
+        original = originals[name]
+
+        def _slowed(*args, **kwargs):
+            counts[name] += 1
+            if latency:
+                time.sleep(latency)
+            return original(*args, **kwargs)
+
+        return _slowed
+
+    with mock.patch.multiple(os, **{name: _wrap(name) for name in originals}):
+        yield
+
+
+def _run(main: Path, latency: float, cached: bool) -> tuple[Counter, float]:
+    counts: Counter = Counter()
+    patches = []
+    if not cached:
+        patches.append(
+            mock.patch.object(
+                _FileSystemCache,
+                "_lookup",
+                lambda self, memo, path, compute: compute(path),
+            )
+        )
+    for patch in patches:
+        patch.start()
+    try:
+        with _slow_metadata_calls(latency, counts):
+            start = time.perf_counter()
+            load_yaml_with_references(main)
+            elapsed = time.perf_counter() - start
+    finally:
+        for patch in patches:
+            patch.stop()
+    return counts, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--files", type=int, default=200)
+    parser.add_argument("--latency-ms", type=float, default=0.2)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        main_file = _write_tree(Path(tmp), args.files)
+        latency = args.latency_ms / 1000
+        for label, cached in (("uncached", False), ("cached", True)):
+            counts, elapsed = _run(main_file, latency, cached)
+            calls = ", ".join(f"{name}={counts[name]}" for name in sorted(counts))
+            print(
+                f"{label:>9}: {sum(counts.values()):6d} syscalls ({calls}), {elapsed * 1000:8.1f} ms"
+            )
+
+
+if __name__ == "__main__":
+    main()
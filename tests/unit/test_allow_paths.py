@@ -0,0 +1,73 @@
+from pathlib import Path, PurePath
+
+import pytest
+
+from yaml_reference import load_yaml_with_references
+from yaml_reference._paths import (
+    _ALLOWED,
+    _DENIED,
+    _PARTIAL,
+    _AllowPathMatcher,
+)
+
+ALLOW_PATHS = [
+    Path("/srv/config"),
+    Path("/srv/shared/common"),
+    Path("/opt/app/../other"),
+    Path("/etc/single.yml"),
+]
+
+
+@pytest.mark.parametrize(
+    "candidate",
+    [
+        "/srv/config",
+        "/srv/config/a.yml",
+        "/srv/config/deep/nested/b.yml",
+        "/srv/configuration/a.yml",
+        "/srv/shared/a.yml",
+        "/srv/shared/common/a.yml",
+        "/opt/other/a.yml",
+        "/opt/app/../other/a.yml",
+        "/etc/single.yml",
+        "/etc/single.yml.bak",
+        "/",
+        "/srv",
+    ],
+)
+def test_allow_path_matcher_matches_is_relative_to(candidate):
+    matcher = _AllowPathMatcher(ALLOW_PATHS)
+    expected = any(PurePath(candidate).is_relative_to(p) for p in ALLOW_PATHS)
+    assert matcher.allows(candidate) is expected
+
+
+def test_allow_path_matcher_classifies_directories():
+    matcher = _AllowPathMatcher(ALLOW_PATHS)
+    assert matcher.classify_directory("/srv/config/deep") == _ALLOWED
+    assert matcher.classify_directory("/srv") == _PARTIAL
+    assert matcher.classify_directory("/srv/shared") == _PARTIAL
+    assert matcher.classify_directory("/var") == _DENIED
+
+
+def test_allow_path_matcher_behaves_like_its_paths():
+    matcher = _AllowPathMatcher(["/srv/config", Path("/srv/other")])
+    assert list(matcher) == [Path("/srv/config"), Path("/srv/other")]
+    assert len(matcher) == 2
+    assert Path("/srv/other") in matcher
+
+    empty = _AllowPathMatcher([])
+    assert not empty
+    assert empty.allows("/anything/at/all.yml")
+
+
+def test_many_allow_paths(stage_files):
+    """Only roots that actually contain the referenced files matter, however many others are allowed."""
+    files = {f"dir{index}/file.yml": f"value: {index}" for index in range(60)}
+    files["entry/main.yml"] = "items: !reference-all ../dir*/file.yml"
+    stg = stage_files(files)
+    allow_paths = [stg / f"dir{index}" for index in range(0, 60, 2)]
+    allow_paths += [stg / f"unrelated{index}" for index in range(60)]
+
+    data = load_yaml_with_references(stg / "entry/main.yml", allow_paths=allow_paths)
+
+    assert sorted(item["value"] for item in data["items"]) == list(range(0, 60, 2))
@@ -0,0 +1,76 @@
+import pytest
+from ruamel.yaml.composer import ComposerError
+from ruamel.yaml.error import ReusedAnchorWarning
+
+import yaml_reference
+from yaml_reference import load_yaml_with_references, parse_yaml_with_references
+
+requires_c_parser = pytest.mark.skipif(
+    yaml_reference.CParser is None, reason="ruamel.yaml.clib is not installed"
+)
+
+
+@pytest.fixture
+def backend_tree(stage_files):
+    return stage_files(
+        {
+            "root.yml": (
+                "leaf: !reference leaf.yml\n"
+                "anchored: !reference { path: anchors.yml, anchor: inner }\n"
+                "all: !reference-all parts/*.yml\n"
+                "flat: !flatten [[1, [2]], !reference-all { glob: parts/*.yml }]\n"
+                "merged: !merge [&base {a: 1, b: ''}, {b: !reference leaf.yml}]\n"
+                "alias: *base\n"
+                "dropped: !ignore {x: 1}\n"
+                "scalars: [null, ~, true, 0x1f, 1.5e3, 2024-01-02, '', \"q\"]\n"
+            ),
+            "leaf.yml": "x: {nested: [1, 2]}\n",
+            "anchors.yml": (
+                "outer:\n  inner: &inner\n    value: !reference {path: leaf.yml}\n    tag: !merge [{k: 1}]\n"
+            ),
+            "parts/a.yml": "- 1\n- !ignore 2\n",
+            "parts/b.yml": "--- {doc: 1}\n--- {doc: 2}\n",
+        }
+    )
+
+
+@requires_c_parser
+def test_c_backend_matches_pure_backend(backend_tree):
+    root = backend_tree / "root.yml"
+    pure = load_yaml_with_references(root, backend="pure")
+    assert load_yaml_with_references(root, backend="c") == pure
+    assert load_yaml_with_references(root, backend="auto") == pure
+
+
+@requires_c_parser
+def test_c_backend_constructs_composition_tags(backend_tree):
+    pure = parse_yaml_with_references(backend_tree / "root.yml", backend="pure")
+    c = parse_yaml_with_references(backend_tree / "root.yml", backend="c")
+    assert repr(c) == repr(pure)
+
+
+@requires_c_parser
+def test_backends_differ_on_a_redefined_anchor(stage_files):
+    root = stage_files({"root.yml": "a: &x 1\nb: &x 2\nc: *x\n"}) / "root.yml"
+    with pytest.warns(ReusedAnchorWarning):
+        assert load_yaml_with_references(root, backend="pure") == {
+            "a": 1,
+            "b": 2,
+            "c": 2,
+        }
+    with pytest.raises(ComposerError, match="duplicate anchor"):
+        load_yaml_with_references(root, backend="c")
+
+
+def test_unknown_backend_is_rejected(backend_tree):
+    with pytest.raises(ValueError, match="Unknown parser backend 'fast'"):
+        load_yaml_with_references(backend_tree / "root.yml", backend="fast")
+
+
+def test_c_backend_requires_clib(backend_tree, monkeypatch):
+    monkeypatch.setattr(yaml_reference, "CParser", None)
+    with pytest.raises(ImportError, match=r"ruamel\.yaml\.clib"):
+        load_yaml_with_references(backend_tree / "root.yml", backend="c")
+    assert load_yaml_with_references(backend_tree / "leaf.yml") == {
+        "x": {"nested": [1, 2]}
+    }
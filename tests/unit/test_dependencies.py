@@ -0,0 +1,134 @@
+import pytest
+
+from yaml_reference import (
+    GlobExpansion,
+    LoadDependencies,
+    iter_yaml_with_references,
+    load_yaml_with_references,
+)
+from yaml_reference._paths import glob_allowed_files
+from yaml_reference.cli import compile_main
+
+
+@pytest.fixture
+def tree(stage_files):
+    return stage_files(
+        {
+            "root.yml": (
+                "parts: !reference-all parts/*/*.yml\n"
+                "extra: !reference-all missing/*.yml\n"
+                "shared: !reference shared.yml\n"
+                "anchored: !reference {path: shared.yml, anchor: a}\n"
+                "dropped: !ignore {x: !reference unused.yml}\n"
+            ),
+            "parts/one/a.yml": "a: !reference ../../shared.yml",
+            "parts/two/b.yml": "b: 1",
+            "parts/readme.txt": "",
+            "shared.yml": "x: &a 1",
+            "unused.yml": "1",
+        }
+    )
+
+
+def test_dependencies_record_files_read_and_globs(tree):
+    dependencies = LoadDependencies()
+    load_yaml_with_references(tree / "root.yml", dependencies=dependencies)
+    assert dependencies.files == [
+        str(tree / "root.yml"),
+        str(tree / "parts/one/a.yml"),
+        str(tree / "shared.yml"),
+        str(tree / "parts/two/b.yml"),
+    ]
+    assert dependencies.globs == [
+        GlobExpansion(
+            base_directory=str(tree),
+            glob="parts/*/*.yml",
+            matches=[str(tree / "parts/one/a.yml"), str(tree / "parts/two/b.yml")],
+            directories=[
+                str(tree / "parts"),
+                str(tree / "parts/one"),
+                str(tree / "parts/two"),
+            ],
+        ),
+        GlobExpansion(
+            base_directory=str(tree),
+            glob="missing/*.yml",
+            matches=[],
+            directories=[str(tree)],
+        ),
+    ]
+    assert dependencies.directories() == [
+        str(tree),
+        str(tree / "parts"),
+        str(tree / "parts/one"),
+        str(tree / "parts/two"),
+    ]
+
+
+def test_dependencies_of_streamed_and_lazy_loads(tree):
+    expected = LoadDependencies()
+    load_yaml_with_references(tree / "root.yml", dependencies=expected)
+
+    lazy = LoadDependencies()
+    load_yaml_with_references(
+        tree / "root.yml", lazy=True, dependencies=lazy
+    ).materialize()
+    assert sorted(lazy.files) == sorted(expected.files)
+    assert lazy.directories() == expected.directories()
+
+    (tree / "multi.yml").write_text("--- !reference-all parts/*/*.yml\n--- 2\n")
+    streamed = LoadDependencies()
+    documents = iter_yaml_with_references(tree / "multi.yml", dependencies=streamed)
+    assert streamed.files == []
+    list(documents)
+    assert streamed.files[0] == str(tree / "multi.yml")
+    assert streamed.directories() == expected.directories()[1:]
+
+
+def test_glob_directories_follow_the_pattern(stage_files):
+    stg = stage_files({"a/b/c.yml": "", "a/x/d.yml": "", "a/b/e/f.yml": ""})
+    directories = []
+    glob_allowed_files(stg, "a/b/*.yml", [], directories=directories)
+    assert directories == [str(stg / "a/b")]
+
+    directories = []
+    glob_allowed_files(stg, "a/**/*.yml", [], directories=directories)
+    assert sorted(directories) == [
+        str(stg / "a"),
+        str(stg / "a/b"),
+        str(stg / "a/b/e"),
+        str(stg / "a/x"),
+    ]
+
+    directories = []
+    glob_allowed_files(stg, "a/nope/*.yml", [], directories=directories)
+    assert directories == [str(stg / "a")]
+
+
+def test_depfile_escapes_paths():
+    dependencies = LoadDependencies(files=["/in/a b.yml", "/in/$x#.yml"])
+    assert dependencies.depfile("out dir/out.json") == (
+        "out\\ dir/out.json: \\\n  /in/a\\ b.yml \\\n  /in/$$x\\#.yml\n"
+    )
+
+
+def test_cli_depfile(tree, tmp_path, capsys):
+    depfile = tmp_path / "out.json.d"
+    compile_main(str(tree / "root.yml"), depfile=str(depfile))
+    assert capsys.readouterr().out
+    lines = depfile.read_text().splitlines()
+    assert lines[0] == f"{tmp_path / 'out.json'}: \\"
+    assert lines[1] == f"  {tree / 'root.yml'} \\"
+    assert lines[-1] == f"  {tree / 'parts/two'}"
+    assert len(lines) == 9
+
+    compile_main(str(tree / "root.yml"), depfile=str(depfile), depfile_target="out")
+    assert depfile.read_text().startswith("out: \\\n")
+
+
+def test_cli_depfile_is_not_written_on_failure(tree, tmp_path):
+    (tree / "shared.yml").unlink()
+    depfile = tmp_path / "out.d"
+    with pytest.raises(SystemExit):
+        compile_main(str(tree / "root.yml"), depfile=str(depfile))
+    assert not depfile.exists()
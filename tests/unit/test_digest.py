@@ -0,0 +1,85 @@
+import datetime
+import sys
+
+import pytest
+
+from yaml_reference import Reference, digest_resolved, load_yaml_with_references
+from yaml_reference.cli import compile_main
+
+
+@pytest.mark.parametrize(
+    "left, right",
+    [
+        ({"a": 1, "b": [1, 2]}, {"b": [1, 2], "a": 1}),
+        ([{"x": [1, {"y": None}]}], iter([{"x": iter([1, {"y": None}])}])),
+        ([1, "a"], (1, "a")),
+        ({1, 2}, frozenset({2, 1})),
+    ],
+)
+def test_digest_ignores_key_order_and_container_classes(left, right):
+    assert digest_resolved(left) == digest_resolved(right)
+
+
+def test_digest_distinguishes_types_and_structure():
+    values = [
+        1,
+        1.0,
+        True,
+        "1",
+        None,
+        "",
+        [],
+        {},
+        [[]],
+        [[], []],
+        [[1], 2],
+        [1, [2]],
+        {"1": "a"},
+        {1: "a"},
+        {"a": "b"},
+        {"ab": ""},
+        ["a", "b"],
+        ["ab"],
+        b"1",
+        datetime.date(2024, 1, 1),
+        "2024-01-01",
+    ]
+    assert len({digest_resolved(value) for value in values}) == len(values)
+
+
+def test_digest_of_deep_and_shared_data():
+    nested: list = []
+    for _ in range(sys.getrecursionlimit() * 2):
+        nested = [nested]
+    assert digest_resolved(nested) != digest_resolved([])
+
+    shared = {"x": [1, 2]}
+    assert digest_resolved([shared, shared]) == digest_resolved(
+        [{"x": [1, 2]}, {"x": [1, 2]}]
+    )
+
+
+def test_digest_rejects_unresolved_and_recursive_data():
+    with pytest.raises(TypeError, match="Reference"):
+        digest_resolved({"a": Reference("a.yml")})
+    recursive: list = []
+    recursive.append(recursive)
+    with pytest.raises(ValueError):
+        digest_resolved(recursive)
+
+
+def test_cli_digest_matches_the_loaded_data(stage_files, capsys):
+    stg = stage_files(
+        {
+            "root.yml": "!reference-all parts/*.yml",
+            "parts/a.yml": "--- {a: !reference ../b.yml}\n--- !ignore 1\n",
+            "parts/c.yml": "[1, 2.5]",
+            "b.yml": "b: true",
+        }
+    )
+    compile_main(str(stg / "root.yml"), digest=True)
+    expected = digest_resolved(load_yaml_with_references(stg / "root.yml"))
+    assert capsys.readouterr().out == expected + "\n"
+
+    with pytest.raises(SystemExit):
+        compile_main(str(stg / "root.yml"), digest=True, ndjson=True)
@@ -1,5 +1,8 @@
+import sys
+
 from yaml_reference import (
     Flatten,
+    Merge,
     flatten_sequences,
     load_yaml_with_references,
     parse_yaml_with_references,
@@ -259,3 +262,24 @@ name: object-3
     ]
 
     assert data["CONTENTS"] == expected
+
+
+def test_flatten_inside_flattened_lists_and_mappings(stage_files):
+    """Test that !flatten tags nested in a list or a mapping inside a !flatten are applied too."""
+    files = {
+        "test.yml": "x: !flatten [{a: !flatten [[1], [2]]}, [!flatten [[3]]], !merge [{b: !flatten [[4]]}]]",
+    }
+    stg = stage_files(files)
+    data = load_yaml_with_references(stg / "test.yml")
+    assert data == {"x": [{"a": [1, 2]}, 3, {"b": [4]}]}
+
+
+def test_flatten_and_merge_deeper_than_the_recursion_limit():
+    """Test that flattening uses no recursion, so nesting depth is not bounded by the interpreter's recursion limit."""
+    depth = sys.getrecursionlimit() * 2
+    nested, mappings = [], []
+    for index in reversed(range(depth)):
+        nested = [index, Flatten([nested])]
+        mappings = [{"key": index}, mappings]
+    assert Flatten(nested).flattened() == list(range(depth))
+    assert Merge(mappings).merged() == {"key": depth - 1}
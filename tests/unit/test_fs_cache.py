@@ -0,0 +1,73 @@
+import os
+from collections import Counter
+
+from yaml_reference import load_yaml_with_references
+from yaml_reference._paths import _FileSystemCache
+
+
+def test_fs_cache_realpath_matches_os_realpath(stage_files):
+    stg = stage_files({"dir/file.yml": "a: 1", "other/x.yml": "x: 1"})
+    os.symlink(stg / "other", stg / "dir/link")
+    fs = _FileSystemCache()
+    for path in [
+        stg / "dir/file.yml",
+        stg / "dir/link/x.yml",
+        stg / "dir/link/../dir/file.yml",
+        stg / "dir/./missing/../file.yml",
+        stg / "missing/deeper.yml",
+        "relative/path.yml",
+    ]:
+        assert fs.realpath(path) == os.path.realpath(path)
+
+
+def test_fs_cache_records_negative_entries(stage_files, monkeypatch):
+    stg = stage_files({"present.yml": "a: 1"})
+    calls = Counter()
+    original_stat = os.stat
+
+    def _counting_stat(path, *args, **kwargs):
+        calls[os.fspath(path)] += 1
+        return original_stat(path, *args, **kwargs)
+
+    monkeypatch.setattr(os, "stat", _counting_stat)
+    fs = _FileSystemCache()
+    missing = stg / "missing.yml"
+    assert not fs.exists(missing)
+    assert not fs.is_file(missing)
+    assert fs.size(missing) is None
+    assert fs.is_file(stg / "present.yml")
+    assert fs.size(stg / "present.yml") == 4
+    assert fs.mtime_ns(stg / "present.yml") is not None
+    assert calls[str(missing)] == 1
+    assert calls[str(stg / "present.yml")] == 1
+    assert fs.misses == 2
+    assert fs.hits == 4
+
+
+def test_load_stats_each_file_once(stage_files, monkeypatch):
+    """Files reached several times in one resolution (fan-in, double globs) are only stat'ed once."""
+    stg = stage_files(
+        {
+            "root.yml": (
+                "all: !reference-all parts/*.yml\n"
+                "again: !reference-all parts/*.yml\n"
+                "shared: !reference shared.yml\n"
+            ),
+            "parts/a.yml": "shared: !reference ../shared.yml",
+            "parts/b.yml": "shared: !reference ../shared.yml",
+            "shared.yml": "value: 1",
+        }
+    )
+    calls = Counter()
+    original_stat = os.stat
+
+    def _counting_stat(path, *args, **kwargs):
+        calls[os.fspath(path)] += 1
+        return original_stat(path, *args, **kwargs)
+
+    monkeypatch.setattr(os, "stat", _counting_stat)
+    data = load_yaml_with_references(stg / "root.yml")
+
+    assert data["all"] == data["again"] == [{"shared": {"value": 1}}] * 2
+    assert calls[str(stg / "shared.yml")] == 1
+    assert calls[str(stg / "parts/a.yml")] == 1
@@ -0,0 +1,99 @@
+import os
+from pathlib import Path
+
+import pytest
+
+from yaml_reference import load_yaml_with_references
+from yaml_reference._paths import glob_allowed_files
+
+
+def _pathlib_glob_allowed_files(base: Path, pattern: str, allow_paths: list[Path]):
+    """The original `!reference-all` expansion, used as the oracle for the scandir-based engine."""
+
+    def _allowed(path: Path) -> bool:
+        if not path.exists() or not path.is_file():
+            return False
+        if not allow_paths:
+            return True
+        return any(path.is_relative_to(allow_path) for allow_path in allow_paths)
+
+    resolved = [path.resolve() for path in base.glob(pattern)]
+    return sorted((path for path in resolved if _allowed(path)), key=str)
+
+
+@pytest.fixture
+def glob_tree(stage_files):
+    stg = stage_files(
+        {
+            "a.yml": "a: 1",
+            ".hidden.yml": "hidden: 1",
+            "b.yaml": "b: 1",
+            "[x].yml": "x: 1",
+            "sub/c.yml": "c: 1",
+            "sub/deep/d.yml": "d: 1",
+            "sub/deep/e.txt": "e: 1",
+            "sub/.dot/f.yml": "f: 1",
+            "other/g.yml": "g: 1",
+            "allowed/h.yml": "h: 1",
+        }
+    )
+    outside = stg.parent / "outside"
+    outside.mkdir(exist_ok=True)
+    (outside / "o.yml").write_text("o: 1")
+    os.symlink(stg / "allowed/h.yml", stg / "other/link_to_allowed.yml")
+    os.symlink(outside / "o.yml", stg / "sub/link_outside.yml")
+    os.symlink(outside, stg / "sub/dir_link")
+    os.symlink(stg / "missing.yml", stg / "broken.yml")
+    return stg
+
+
+@pytest.mark.parametrize(
+    "pattern",
+    [
+        "*.yml",
+        "**/*.yml",
+        "**",
+        "**/**/*.yml",
+        "*/*.yml",
+        "./sub/../*.yml",
+        "sub/deep/*",
+        "sub/dir_link/*.yml",
+        "?.yml",
+        "[[]x].yml",
+        "[ab].y*",
+        "sub/",
+        "a.yml",
+        "broken.yml",
+        "nope/*.yml",
+        "../outside/*.yml",
+    ],
+)
+@pytest.mark.parametrize("allow", ["none", "root", "allowed", "sub", "other+outside"])
+def test_glob_engine_matches_pathlib(glob_tree, pattern, allow):
+    """The scandir-based engine returns exactly what resolving and filtering `Path.glob` returned."""
+    allow_paths = {
+        "none": [],
+        "root": [glob_tree],
+        "allowed": [glob_tree / "allowed"],
+        "sub": [glob_tree / "sub"],
+        "other+outside": [glob_tree / "other", glob_tree.parent / "outside"],
+    }[allow]
+    expected = _pathlib_glob_allowed_files(glob_tree, pattern, allow_paths)
+    assert glob_allowed_files(glob_tree, pattern, allow_paths) == expected
+
+
+def test_glob_engine_rejects_empty_pattern(tmp_path):
+    with pytest.raises(ValueError, match="Unacceptable pattern"):
+        glob_allowed_files(tmp_path, "", [])
+
+
+def test_reference_all_follows_symlink_into_allowed_root(glob_tree):
+    """A symlink living in a disallowed directory is kept when it resolves into an allowed root."""
+    (glob_tree / "entry").mkdir()
+    (glob_tree / "entry/main.yml").write_text(
+        "data: !reference-all { glob: ../other/*.yml }"
+    )
+    data = load_yaml_with_references(
+        glob_tree / "entry/main.yml", allow_paths=[glob_tree / "allowed"]
+    )
+    assert data == {"data": [{"h": 1}]}
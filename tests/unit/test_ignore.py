@@ -1,5 +1,6 @@
 from yaml_reference import (
     Ignore,
+    LoadStats,
     load_yaml_with_references,
     parse_yaml_with_references,
     prune_ignores,
@@ -182,3 +183,22 @@ dropped: !ignore something
     assert "also_present" in data
     assert data["also_present"] is None
     assert "dropped" not in data
+
+
+def test_ignore_content_references_are_not_followed(stage_files):
+    """Test that references under !ignore are never loaded, so broken ones in ignored content do not fail the load."""
+    files = {
+        "test.yml": """\
+kept: !reference used.yml
+dropped: !ignore {missing: !reference missing.yml, loop: !reference test.yml}
+items: [1, !ignore [!reference-all "unused/*.yml"]]
+""",
+        "used.yml": "value: 1",
+        "unused/a.yml": "a: 1",
+    }
+    stg = stage_files(files)
+    stats = LoadStats()
+    data = load_yaml_with_references(stg / "test.yml", stats=stats)
+    assert data == {"kept": {"value": 1}, "items": [1]}
+    assert sorted(stats.files) == [str(stg / "test.yml"), str(stg / "used.yml")]
+    assert stats.glob_expansions == 0
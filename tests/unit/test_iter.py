@@ -0,0 +1,89 @@
+import json
+
+import pytest
+
+from yaml_reference import (
+    LoadStats,
+    iter_yaml_with_references,
+    load_yaml_with_references,
+)
+from yaml_reference.cli import compile_main
+
+
+@pytest.fixture
+def manifests(stage_files):
+    return stage_files(
+        {
+            "root.yml": (
+                "--- {name: a, spec: !reference spec.yml}\n"
+                "--- !ignore {name: b}\n"
+                "--- !reference ignored.yml\n"
+                "--- null\n"
+                "--- {name: c, all: !reference-all parts/*.yml}\n"
+                "--- !merge [{name: d}, !reference spec.yml]\n"
+                "--- [1, !ignore 2, !flatten [[3], [4]]]\n"
+            ),
+            "spec.yml": "replicas: 2",
+            "ignored.yml": "!ignore {secret: 1}",
+            "parts/p1.yml": "--- {doc: 1}\n--- !ignore {doc: 2}\n",
+            "parts/p2.yml": "{doc: 3}",
+        }
+    )
+
+
+# The pure parser would corrupt a root stream suspended between documents if referenced files reused its loader.
+@pytest.mark.parametrize("backend", ["pure", "auto"])
+def test_iter_matches_load_for_multi_document_files(manifests, backend):
+    documents = list(iter_yaml_with_references(manifests / "root.yml", backend=backend))
+    assert documents == load_yaml_with_references(manifests / "root.yml")
+    assert documents[0] == {"name": "a", "spec": {"replicas": 2}}
+    assert len(documents) == 5
+
+
+@pytest.mark.parametrize(
+    "content, expected",
+    [
+        ("a: !reference spec.yml", [{"a": {"replicas": 2}}]),
+        ("!ignore {a: 1}", [None]),
+        ("!reference ignored.yml", [None]),
+        ("", []),
+    ],
+)
+def test_iter_single_document_and_empty_files(stage_files, content, expected):
+    stg = stage_files(
+        {
+            "root.yml": content,
+            "spec.yml": "replicas: 2",
+            "ignored.yml": "!ignore {b: 2}",
+        }
+    )
+    assert list(iter_yaml_with_references(stg / "root.yml")) == expected
+    if expected:
+        # A single document comes out as the eager load returns it, even when it is ignored.
+        assert expected == [load_yaml_with_references(stg / "root.yml")]
+
+
+def test_iter_resolves_one_document_at_a_time(stage_files):
+    stg = stage_files(
+        {
+            "root.yml": "--- !reference a.yml\n--- !reference missing.yml\n",
+            "a.yml": "ok: true",
+        }
+    )
+    stats = LoadStats()
+    documents = iter_yaml_with_references(stg / "root.yml", stats=stats)
+    assert next(documents) == {"ok": True}
+    assert str(stg / "a.yml") in stats.files
+    with pytest.raises(FileNotFoundError):
+        next(documents)
+    assert stats.files[str(stg / "root.yml")].loads == 1
+    assert stats._stack == []
+
+
+def test_cli_ndjson_prints_one_line_per_document(manifests, capsys):
+    compile_main(str(manifests / "root.yml"), ndjson=True)
+    lines = capsys.readouterr().out.splitlines()
+    assert [json.loads(line) for line in lines] == load_yaml_with_references(
+        manifests / "root.yml"
+    )
+    assert lines[0] == '{"name": "a", "spec": {"replicas": 2}}'
@@ -0,0 +1,137 @@
+import pytest
+
+from yaml_reference import (
+    LazyMapping,
+    LazySequence,
+    LoadStats,
+    load_yaml_with_references,
+)
+
+
+def _materialize(value):
+    if isinstance(value, (LazyMapping, LazySequence)):
+        return value.materialize()
+    return value
+
+
+@pytest.mark.parametrize(
+    "files",
+    [
+        {
+            "root.yml": (
+                "a: !reference a.yml\n"
+                "all: !reference-all parts/*.yml\n"
+                "plain: {x: [1, 2]}\n"
+                "dropped: !ignore {x: 1}\n"
+                "ref_ignored: !reference ignored.yml\n"
+                "items: [1, !ignore 2, !reference ignored.yml, !reference a.yml]\n"
+            ),
+            "a.yml": "b: !reference b.yml\nc: [!reference b.yml]\n",
+            "b.yml": "leaf: true",
+            "ignored.yml": "!ignore {secret: 1}",
+            "parts/p1.yml": "--- {doc: 1}\n--- !ignore {doc: 2}\n--- {doc: 3}\n",
+            "parts/p2.yml": "!reference ../b.yml",
+        },
+        {
+            "root.yml": (
+                "flat: !flatten [[1, [2]], !reference-all parts/*.yml, !reference list.yml]\n"
+                "merged: !merge [{a: 1}, !reference map.yml, {nested: !reference map.yml}]\n"
+                "deep: {x: {y: !merge [{k: !flatten [[1], [2]]}, {z: !ignore 1}]}}\n"
+            ),
+            "list.yml": "- !ignore 0\n- [3, 4]\n",
+            "map.yml": "b: 2\nc: !reference list.yml\n",
+            "parts/p1.yml": "- 5\n- 6\n",
+        },
+        {
+            "root.yml": "--- !reference a.yml\n--- !ignore 1\n--- null\n--- [1, !ignore 2]\n",
+            "a.yml": "!reference b.yml",
+            "b.yml": "value: !reference-all { glob: 'c*.yml', anchor: x }",
+            "c1.yml": "other: 0\nhere: &x {k: 1}\n",
+        },
+        {"root.yml": "!reference ignored.yml", "ignored.yml": "!ignore 1"},
+        {"root.yml": "!reference scalar.yml", "scalar.yml": "42"},
+    ],
+)
+def test_lazy_load_materializes_to_eager_result(stage_files, files):
+    stg = stage_files(files)
+    eager = load_yaml_with_references(stg / "root.yml")
+    lazy = load_yaml_with_references(stg / "root.yml", lazy=True)
+    assert _materialize(lazy) == eager
+
+
+def test_lazy_load_only_parses_accessed_files(stage_files):
+    stg = stage_files(
+        {
+            "root.yml": (
+                "wanted: !reference wanted.yml\n"
+                "sibling: !reference sibling.yml\n"
+                "others: !reference-all others/*.yml\n"
+            ),
+            "wanted.yml": "inner: !reference inner.yml\nskipped: !reference skipped.yml\n",
+            "inner.yml": "value: 1",
+            "skipped.yml": "value: 2",
+            "sibling.yml": "deep: !reference skipped.yml",
+            "others/o.yml": "value: 3",
+        }
+    )
+    stats = LoadStats()
+    config = load_yaml_with_references(stg / "root.yml", stats=stats, lazy=True)
+    assert isinstance(config, LazyMapping)
+    assert config["wanted"]["inner"] == {"value": 1}
+    assert config["wanted"]["inner"] is config["wanted"]["inner"]
+    assert sorted(stats.files) == [
+        str(stg / name) for name in ("inner.yml", "root.yml", "wanted.yml")
+    ]
+
+    # Listing keys parses the directly-referenced files to find ignored ones, but resolves nothing below them.
+    assert list(config) == ["wanted", "sibling", "others"]
+    assert str(stg / "sibling.yml") in stats.files
+    assert str(stg / "skipped.yml") not in stats.files
+    assert str(stg / "others/o.yml") not in stats.files
+
+
+def test_lazy_load_ignored_values_are_absent(stage_files):
+    stg = stage_files(
+        {
+            "root.yml": "keep: 1\ndrop: !reference ignored.yml\nitems: [!ignore 0, 1, !reference ignored.yml, 2]\n",
+            "ignored.yml": "!ignore {secret: 1}",
+        }
+    )
+    config = load_yaml_with_references(stg / "root.yml", lazy=True)
+    assert "drop" not in config and len(config) == 2
+    with pytest.raises(KeyError):
+        config["drop"]
+    assert list(config["items"]) == [1, 2]
+    assert config["items"][-1] == 2
+    assert config["items"][0:1] == [1]
+    with pytest.raises(IndexError):
+        config["items"][2]
+
+
+def test_lazy_load_detects_cycles_on_access(stage_files):
+    stg = stage_files(
+        {
+            "root.yml": "ok: 1\nloop: !reference a.yml\n",
+            "a.yml": "b: !reference b.yml",
+            "b.yml": "a: !reference a.yml",
+        }
+    )
+    config = load_yaml_with_references(stg / "root.yml", lazy=True)
+    assert config["ok"] == 1
+    with pytest.raises(ValueError, match="Circular reference detected"):
+        config["loop"]["b"]["a"]
+    with pytest.raises(ValueError, match="Circular reference detected"):
+        config.materialize()
+
+
+def test_lazy_load_enforces_allow_paths_on_access(stage_files):
+    stg = stage_files(
+        {
+            "app/root.yml": "ok: 1\nsecret: !reference ../secret/s.yml\n",
+            "secret/s.yml": "password: hunter2",
+        }
+    )
+    config = load_yaml_with_references(stg / "app/root.yml", lazy=True)
+    assert config["ok"] == 1
+    with pytest.raises(PermissionError):
+        config["secret"]
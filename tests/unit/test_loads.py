@@ -0,0 +1,76 @@
+import io
+import json
+
+import pytest
+
+from yaml_reference import (
+    InMemorySource,
+    LoadDependencies,
+    load_yaml_with_references,
+    loads_yaml_with_references,
+)
+from yaml_reference.cli import compile_main
+
+ROOT = "shared: !reference shared.yml\nparts: !reference-all parts/*.yml\n"
+
+
+@pytest.fixture
+def tree(stage_files):
+    return stage_files(
+        {
+            "root.yml": ROOT,
+            "shared.yml": "x: 1",
+            "parts/a.yml": "a: 1",
+        }
+    )
+
+
+@pytest.mark.parametrize("text", [ROOT, ROOT.encode(), io.StringIO(ROOT)])
+def test_loads_matches_loading_the_file(tree, text):
+    expected = load_yaml_with_references(tree / "root.yml")
+    assert loads_yaml_with_references(text, base_path=tree) == expected
+
+
+def test_loads_resolves_against_the_current_directory(tree, monkeypatch):
+    monkeypatch.chdir(tree)
+    dependencies = LoadDependencies()
+    loads_yaml_with_references(
+        io.BytesIO(ROOT.encode()), name="api.yml", dependencies=dependencies
+    )
+    assert dependencies.files[0] == str(tree.resolve() / "api.yml")
+    assert str(tree.resolve() / "shared.yml") in dependencies.files
+
+
+def test_loads_applies_path_rules_to_the_virtual_root(tree):
+    (tree.parent / "outside.yml").write_text("a: 1")
+    with pytest.raises(PermissionError):
+        loads_yaml_with_references("a: !reference ../outside.yml", base_path=tree)
+    with pytest.raises(ValueError, match="Circular reference"):
+        loads_yaml_with_references(
+            "a: !reference-all '*.yml'", base_path=tree, name="virtual.yml"
+        )
+    with pytest.raises(ValueError, match="Circular reference"):
+        loads_yaml_with_references(
+            "a: !reference loop.yml",
+            base_path="/bundle",
+            name="loop.yml",
+            source=InMemorySource({"/bundle/loop.yml": "shadowed: 1"}),
+        )
+
+
+def test_cli_reads_stdin(tree, monkeypatch, capsys):
+    monkeypatch.chdir(tree)
+    monkeypatch.setattr("sys.stdin", io.StringIO(ROOT))
+    compile_main("-")
+    assert json.loads(capsys.readouterr().out) == load_yaml_with_references(
+        tree / "root.yml"
+    )
+
+    monkeypatch.setattr("sys.stdin", io.StringIO("a: !reference missing.yml"))
+    with pytest.raises(SystemExit):
+        compile_main("-", check=True)
+    assert "<stdin>" in capsys.readouterr().err
+
+    with pytest.raises(SystemExit):
+        compile_main("-", depfile="out.d")
+    assert "stdin" in capsys.readouterr().err
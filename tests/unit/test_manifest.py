@@ -0,0 +1,161 @@
+import json
+import os
+
+import pytest
+
+import yaml_reference.cli
+from yaml_reference import load_yaml_with_references
+from yaml_reference.cli import compile_main
+from yaml_reference.manifest import read_manifest
+
+
+@pytest.fixture
+def tree(stage_files):
+    return stage_files(
+        {
+            "root.yml": "parts: !reference-all parts/*.yml\nshared: !reference shared.yml\n",
+            "parts/a.yml": "a: 1",
+            "shared.yml": "x: 1",
+        }
+    )
+
+
+@pytest.fixture
+def compile_tree(tree, tmp_path, monkeypatch):
+    """Compile the tree with --if-changed and return whether the input was parsed."""
+    output, manifest = tmp_path / "out.json", tmp_path / "out.manifest.json"
+    calls = []
+
+    def _load(*args, **kwargs):
+        calls.append(args[0])
+        return load_yaml_with_references(*args, **kwargs)
+
+    monkeypatch.setattr("yaml_reference.cli.load_yaml_with_references", _load)
+
+    def _compile(**kwargs) -> bool:
+        del calls[:]
+        compile_main(
+            str(tree / "root.yml"),
+            output=str(output),
+            manifest=str(manifest),
+            if_changed=True,
+            **kwargs,
+        )
+        return bool(calls)
+
+    return _compile
+
+
+def test_output_and_manifest(tree, tmp_path, capsys, compile_tree):
+    assert compile_tree()
+    assert capsys.readouterr().out == ""
+    output = tmp_path / "out.json"
+    assert json.loads(output.read_text()) == {"parts": [{"a": 1}], "shared": {"x": 1}}
+
+    manifest = read_manifest(tmp_path / "out.manifest.json")
+    assert sorted(manifest["inputs"]) == sorted(
+        str(tree / name) for name in ("root.yml", "parts/a.yml", "shared.yml")
+    )
+    assert list(manifest["outputs"]) == [str(output)]
+    assert manifest["globs"] == [
+        {
+            "base_directory": str(tree),
+            "glob": "parts/*.yml",
+            "matches": [str(tree / "parts/a.yml")],
+            "directories": {str(tree / "parts"): os.stat(tree / "parts").st_mtime_ns},
+        }
+    ]
+
+
+def test_if_changed_skips_unchanged_compilations(tree, compile_tree):
+    assert compile_tree()
+    assert not compile_tree()
+
+    # Touching a file without changing it falls back to its hash.
+    os.utime(tree / "shared.yml", ns=(0, 0))
+    assert not compile_tree()
+    # So does a new file the glob does not match.
+    (tree / "parts/readme.txt").write_text("")
+    assert not compile_tree()
+
+
+@pytest.mark.parametrize(
+    "change",
+    [
+        lambda tree, tmp_path: (tree / "shared.yml").write_text("x: 2"),
+        lambda tree, tmp_path: (tree / "parts/b.yml").write_text("b: 1"),
+        lambda tree, tmp_path: (tree / "parts/a.yml").unlink(),
+        lambda tree, tmp_path: (tmp_path / "out.json").write_text("{}"),
+        lambda tree, tmp_path: (tmp_path / "out.manifest.json").write_text("{"),
+    ],
+)
+def test_if_changed_recompiles_on_changes(tree, tmp_path, compile_tree, change):
+    assert compile_tree()
+    change(tree, tmp_path)
+    assert compile_tree()
+    assert not compile_tree()
+
+
+@pytest.mark.parametrize(
+    "change",
+    [
+        lambda tree: (tree / "shared.yml").write_text("x: 2"),
+        lambda tree: (tree / "parts/b.yml").write_text("b: 1"),
+    ],
+)
+def test_manifest_records_inputs_as_they_were_read(
+    tree, compile_tree, monkeypatch, change
+):
+    load = yaml_reference.cli.load_yaml_with_references
+
+    def _load_then_change(*args, **kwargs):
+        data = load(*args, **kwargs)
+        # Changed between the parse and the manifest write, with mtimes that a record taken afterwards would match.
+        change(tree)
+        os.utime(tree / "shared.yml", ns=(1, 1))
+        os.utime(tree / "parts", ns=(1, 1))
+        return data
+
+    monkeypatch.setattr(
+        "yaml_reference.cli.load_yaml_with_references", _load_then_change
+    )
+    assert compile_tree()
+    monkeypatch.setattr("yaml_reference.cli.load_yaml_with_references", load)
+    assert compile_tree()
+    assert not compile_tree()
+
+
+def test_if_changed_recompiles_with_other_options(compile_tree):
+    assert compile_tree()
+    assert compile_tree(select="shared")
+    assert not compile_tree(select="shared")
+
+
+def test_failed_compilation_removes_the_manifest(tree, tmp_path, compile_tree):
+    assert compile_tree()
+    (tree / "shared.yml").unlink()
+    with pytest.raises(SystemExit):
+        compile_tree()
+    assert not (tmp_path / "out.manifest.json").exists()
+
+
+@pytest.mark.parametrize(
+    "kwargs, message",
+    [
+        ({"manifest": "m.json"}, "--manifest requires --output"),
+        ({"output": "o.json", "if_changed": True}, "--if-changed requires --manifest"),
+    ],
+)
+def test_manifest_option_errors(tree, capsys, kwargs, message):
+    with pytest.raises(SystemExit):
+        compile_main(str(tree / "root.yml"), **kwargs)
+    assert message in capsys.readouterr().err
+
+
+def test_depfile_targets_the_output(tree, tmp_path):
+    compile_main(
+        str(tree / "root.yml"),
+        output=str(tmp_path / "out.json"),
+        depfile=str(tmp_path / "deps.d"),
+    )
+    assert (tmp_path / "deps.d").read_text().startswith(f"{tmp_path / 'out.json'}: ")
@@ -0,0 +1,91 @@
+import pytest
+
+from yaml_reference import (
+    Flatten,
+    Merge,
+    Reference,
+    ReferenceAll,
+    load_yaml_with_references,
+)
+
+
+@pytest.fixture
+def layered(stage_files):
+    return stage_files(
+        {
+            "root.yml": (
+                "a: !reference a.yml\n"
+                "parts: !reference-all parts/*.yml\n"
+                "flat: !flatten [[0], !reference list.yml]\n"
+                "merged: !merge [{x: 0}, !reference map.yml]\n"
+                "local: !merge [{x: 0}, {y: !reference a.yml}]\n"
+                "dropped: !ignore {secret: !reference a.yml}\n"
+            ),
+            "a.yml": "b: !reference b.yml",
+            "b.yml": "c: !reference c.yml",
+            "c.yml": "leaf: true",
+            "parts/p.yml": "p: !reference ../c.yml",
+            "list.yml": "[1, !reference b.yml]",
+            "map.yml": "y: 1",
+        }
+    )
+
+
+def test_max_depth_zero_resolves_no_references(layered):
+    data = load_yaml_with_references(layered / "root.yml", max_depth=0)
+    assert isinstance(data["a"], Reference)
+    assert data["a"].location == str(layered / "root.yml")
+    assert isinstance(data["parts"], ReferenceAll)
+    assert isinstance(data["flat"], Flatten)
+    assert isinstance(data["merged"], Merge)
+    # Operators whose operands are all in place still apply; references nested in a mapping operand do not matter.
+    assert data["local"]["x"] == 0 and isinstance(data["local"]["y"], Reference)
+    assert "dropped" not in data
+
+
+def test_max_depth_resolves_the_requested_layers(layered):
+    data = load_yaml_with_references(layered / "root.yml", max_depth=1)
+    assert isinstance(data["a"]["b"], Reference)
+    assert data["a"]["b"].location == str(layered / "a.yml")
+    assert isinstance(data["parts"][0]["p"], Reference)
+    assert data["merged"] == {"x": 0, "y": 1}
+    # list.yml is in place, but the reference inside it still decides what gets flattened.
+    assert isinstance(data["flat"], Flatten)
+    assert data["flat"].sequence[1][1].location == str(layered / "list.yml")
+
+    data = load_yaml_with_references(layered / "root.yml", max_depth=2)
+    assert isinstance(data["a"]["b"]["c"], Reference)
+    assert data["parts"] == [{"p": {"leaf": True}}]
+
+
+def test_max_depth_beyond_the_graph_matches_a_full_load(layered):
+    full = load_yaml_with_references(layered / "root.yml")
+    assert load_yaml_with_references(layered / "root.yml", max_depth=3) == full
+
+
+def test_max_depth_keeps_a_flatten_with_an_unresolved_nested_operand(stage_files):
+    stg = stage_files(
+        {
+            "root.yml": "flat: !flatten [[1, [2, !reference a.yml]], !flatten [[3]]]\n",
+            "a.yml": "[4]",
+        }
+    )
+    data = load_yaml_with_references(stg / "root.yml", max_depth=0)
+    assert isinstance(data["flat"], Flatten)
+    assert data["flat"].sequence[1] == [3]
+    assert load_yaml_with_references(stg / "root.yml", max_depth=1) == {
+        "flat": [1, 2, 4, 3]
+    }
+
+
+@pytest.mark.parametrize(
+    "kwargs",
+    [
+        {"max_depth": -1},
+        {"max_depth": 1, "lazy": True},
+        {"max_depth": 1, "select": "a"},
+    ],
+)
+def test_max_depth_rejects_invalid_arguments(layered, kwargs):
+    with pytest.raises(ValueError, match="max_depth"):
+        load_yaml_with_references(layered / "root.yml", **kwargs)
@@ -1,4 +1,11 @@
-from yaml_reference import Merge, load_yaml_with_references, parse_yaml_with_references
+import pytest
+
+from yaml_reference import (
+    LoadStats,
+    Merge,
+    load_yaml_with_references,
+    parse_yaml_with_references,
+)
 
 # Tests demonstrating parsing behavior with Merge objects
 
@@ -189,3 +196,83 @@ result: !merge
         "version": 2,
         "feature": "enabled",
     }
+
+
+def test_merge_does_not_resolve_overridden_keys(stage_files):
+    """Test that a value which a later !merge operand overrides is never resolved, while the rest are."""
+    files = {
+        "test.yml": """
+result: !merge
+  - {db: !reference missing.yml, cache: !reference cache.yml, shared: !reference base.yml}
+  - !reference overrides.yml
+  - {shared: !reference-all "layers/*.yml"}
+""",
+        "cache.yml": "size: 1",
+        "base.yml": "unused: true",
+        "overrides.yml": "db: {host: prod}\ncache: !ignore {size: 2}\n",
+        "layers/a.yml": "layer: a",
+    }
+    stg = stage_files(files)
+    stats = LoadStats()
+    data = load_yaml_with_references(stg / "test.yml", stats=stats)
+    # An ignored override is pruned, so the earlier value still shows through and must be resolved.
+    assert data["result"] == {
+        "db": {"host": "prod"},
+        "cache": {"size": 1},
+        "shared": [{"layer": "a"}],
+    }
+    assert str(stg / "base.yml") not in stats.files
+
+
+def test_merge_overrides_from_reference_all_and_nested_operands(stage_files):
+    """Test that keys set through !reference-all documents and nested lists also shadow earlier operands."""
+    files = {
+        "test.yml": """
+result: !merge
+  - {a: !reference missing.yml, b: !reference missing.yml, c: 0}
+  - [[{b: 2}]]
+  - !reference-all "patches/*.yml"
+""",
+        "patches/p.yml": "---\na: 1\n---\n!ignore {c: 3}\n",
+    }
+    stg = stage_files(files)
+    data = load_yaml_with_references(stg / "test.yml")
+    assert data["result"] == {"a": 1, "b": 2, "c": 0}
+
+
+def test_merge_still_detects_cycles_in_used_values(stage_files):
+    files = {
+        "test.yml": "result: !merge [{a: 0}, {a: !reference loop.yml}]",
+        "loop.yml": "again: !reference test.yml",
+    }
+    stg = stage_files(files)
+    with pytest.raises(ValueError, match="Circular reference detected"):
+        load_yaml_with_references(stg / "test.yml")
+
+
+def test_merge_directly_nested_merges(stage_files):
+    """Test that a !merge operand which is itself a !merge, directly or through a reference, is spliced in place."""
+    files = {
+        "test.yml": """
+result: !merge
+  - !merge [{a: 1, b: 1}, !merge [{c: 1}, {b: 2}]]
+  - !reference mid.yml
+  - {e: 3}
+""",
+        "mid.yml": "!merge [{a: 2}, {d: !merge [{x: 1}, {x: 2}]}]",
+    }
+    stg = stage_files(files)
+    data = load_yaml_with_references(stg / "test.yml")
+    assert data["result"] == {"a": 2, "b": 2, "c": 1, "d": {"x": 2}, "e": 3}
+    assert list(data["result"]) == ["a", "b", "c", "d", "e"]
+
+
+def test_merge_layers_are_not_copied():
+    """Test that Merge.layers() splices nested merges and returns the mappings themselves."""
+    base = {"a": 1, "b": 1, "c": 1}
+    merge = Merge([base, Merge([{"d": 2}, {"b": 2}]), [{"a": 3}]])
+    layers = merge.layers()
+    assert layers[0] is base
+    assert layers[1:] == [{"d": 2}, {"b": 2}, {"a": 3}]
+    assert merge.merged() == {"a": 3, "b": 2, "c": 1, "d": 2}
+    assert base == {"a": 1, "b": 1, "c": 1}
@@ -0,0 +1,68 @@
+import os
+
+import pytest
+
+from yaml_reference.cli import compile_main
+
+
+@pytest.fixture
+def root(stage_files):
+    return stage_files({"root.yml": "a: !reference a.yml", "a.yml": "1"}) / "root.yml"
+
+
+def test_output_is_left_untouched_when_identical(root, tmp_path):
+    output = tmp_path / "out.json"
+    compile_main(str(root), output=str(output))
+    assert output.read_text() == '{\n  "a": 1\n}'
+    os.utime(output, ns=(0, 0))
+    inode = output.stat().st_ino
+
+    compile_main(str(root), output=str(output))
+    assert output.stat().st_mtime_ns == 0 and output.stat().st_ino == inode
+
+    (root.parent / "a.yml").write_text("2")
+    compile_main(str(root), output=str(output))
+    assert output.read_text() == '{\n  "a": 2\n}'
+    assert output.stat().st_mtime_ns != 0
+    assert sorted(os.listdir(tmp_path)) == ["out.json", "staged"]
+
+
+def test_output_keeps_its_mode_and_follows_symlinks(root, tmp_path):
+    output = tmp_path / "out.json"
+    output.write_text("old")
+    output.chmod(0o640)
+    link = tmp_path / "link.json"
+    link.symlink_to(output)
+
+    compile_main(str(root), output=str(link))
+    assert link.is_symlink()
+    assert output.read_text() == '{\n  "a": 1\n}'
+    assert output.stat().st_mode & 0o777 == 0o640
+
+
+def test_failed_compilation_leaves_the_output_untouched(root, tmp_path):
+    output = tmp_path / "out.json"
+    output.write_text("previous")
+    (root.parent / "a.yml").unlink()
+    with pytest.raises(SystemExit):
+        compile_main(str(root), output=str(output))
+    assert output.read_text() == "previous"
+    assert sorted(os.listdir(tmp_path)) == ["out.json", "staged"]
+
+
+def test_unwritable_output_is_reported(root, tmp_path, capsys):
+    missing = tmp_path / "missing" / "out.json"
+    with pytest.raises(SystemExit) as exit_info:
+        compile_main(str(root), output=str(missing))
+    assert exit_info.value.code == 1
+    assert capsys.readouterr().err.startswith(f'Error: Failed to write "{missing}":\n')
+
+    directory = tmp_path / "out.json"
+    directory.mkdir()
+    with pytest.raises(SystemExit) as exit_info:
+        compile_main(str(root), output=str(directory))
+    assert exit_info.value.code == 1
+    assert capsys.readouterr().err.startswith(
+        f'Error: Failed to write "{directory}":\n'
+    )
+    assert sorted(os.listdir(tmp_path)) == ["out.json", "staged"]
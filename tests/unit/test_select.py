@@ -0,0 +1,79 @@
+import json
+
+import pytest
+
+from yaml_reference import LoadStats, load_yaml_with_references
+from yaml_reference.cli import compile_main
+
+
+@pytest.fixture
+def services_tree(stage_files):
+    return stage_files(
+        {
+            "root.yml": (
+                "services: !reference-all services/*.yml\n"
+                "other: !reference other.yml\n"
+                "1: integer key\n"
+                "a/b: {c~d: escaped}\n"
+            ),
+            "services/s0.yml": "name: s0\ndatabase: !reference ../db/db0.yml\n",
+            "services/s1.yml": "!ignore {name: s1}",
+            "services/s2.yml": "name: s2\ndatabase: !reference ../db/db2.yml\nextra: !reference ../db/db0.yml\n",
+            "db/db0.yml": "host: db0",
+            "db/db2.yml": "host: db2\nport: !merge [{a: 1}, {b: 2}]\n",
+            "other.yml": "unrelated: true",
+        }
+    )
+
+
+def test_select_resolves_only_the_path_to_the_node(services_tree):
+    stats = LoadStats()
+    selected = load_yaml_with_references(
+        services_tree / "root.yml", select="services/1/database", stats=stats
+    )
+    assert selected == {"host": "db2", "port": {"a": 1, "b": 2}}
+    parsed = {path.replace(str(services_tree) + "/", "") for path in stats.files}
+    # Sibling services are parsed (their roots decide which index is which), but nothing below them is.
+    assert parsed == {
+        "root.yml",
+        "services/s0.yml",
+        "services/s1.yml",
+        "services/s2.yml",
+        "db/db2.yml",
+    }
+
+
+@pytest.mark.parametrize(
+    "pointer, expected",
+    [
+        ("", None),
+        ("/", None),
+        ("/other", {"unrelated": True}),
+        ("services/0/name", "s0"),
+        ("1", "integer key"),
+        ("a~1b/c~0d", "escaped"),
+    ],
+)
+def test_select_matches_full_load(services_tree, pointer, expected):
+    full = load_yaml_with_references(services_tree / "root.yml")
+    selected = load_yaml_with_references(services_tree / "root.yml", select=pointer)
+    assert selected == (full if expected is None else expected)
+
+
+@pytest.mark.parametrize(
+    "pointer", ["missing", "services/2", "services/x", "other/unrelated/deeper"]
+)
+def test_select_missing_node_raises_key_error(services_tree, pointer):
+    with pytest.raises(KeyError, match="not found"):
+        load_yaml_with_references(services_tree / "root.yml", select=pointer)
+
+
+def test_cli_select(services_tree, capsys):
+    compile_main(str(services_tree / "root.yml"), select="services/0")
+    assert json.loads(capsys.readouterr().out) == {
+        "database": {"host": "db0"},
+        "name": "s0",
+    }
+    with pytest.raises(SystemExit):
+        compile_main(str(services_tree / "root.yml"), select="nope")
+    assert "not found" in capsys.readouterr().err
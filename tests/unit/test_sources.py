@@ -0,0 +1,222 @@
+import io
+import tarfile
+import zipfile
+
+import pytest
+
+from yaml_reference import (
+    ArchiveSource,
+    InMemorySource,
+    LocalSource,
+    iter_yaml_with_references,
+    load_yaml_with_references,
+    parse_yaml_with_references,
+    validate_yaml_references,
+)
+
+FILES = {
+    "root.yml": (
+        "services: !reference-all services/**/*.yml\n"
+        "db: !reference {path: shared/db.yml, anchor: primary}\n"
+        "merged: !merge [!reference shared/base.yml, {b: 2}]\n"
+        "flat: !flatten [[1], !reference shared/list.yml]\n"
+    ),
+    "services/a.yml": "name: a\nbase: !reference ../shared/base.yml\n",
+    "services/nested/b.yml": "--- {name: b}\n--- !ignore {name: hidden}\n",
+    "services/notes.txt": "not yaml",
+    "shared/db.yml": "primary: &primary {host: db}\nreplica: {host: db2}\n",
+    "shared/base.yml": "a: 1\nb: 1\n",
+    "shared/list.yml": "[2, 3]",
+}
+
+
+@pytest.fixture
+def memory():
+    return InMemorySource({f"/bundle/{name}": text for name, text in FILES.items()})
+
+
+@pytest.mark.parametrize("backend", ["pure", "auto"])
+def test_in_memory_source_matches_the_disk(stage_files, memory, backend):
+    on_disk = load_yaml_with_references(stage_files(FILES) / "root.yml")
+    assert (
+        load_yaml_with_references("/bundle/root.yml", backend=backend, source=memory)
+        == on_disk
+    )
+    assert on_disk["services"] == [
+        {"name": "a", "base": {"a": 1, "b": 1}},
+        {"name": "b"},
+    ]
+
+
+def test_in_memory_source_in_every_entry_point(memory):
+    assert list(
+        iter_yaml_with_references("/bundle/services/nested/b.yml", source=memory)
+    ) == [{"name": "b"}]
+    assert parse_yaml_with_references("/bundle/shared/list.yml", source=memory) == [
+        2,
+        3,
+    ]
+    lazy = load_yaml_with_references("/bundle/root.yml", lazy=True, source=memory)
+    assert lazy["db"] == {"host": "db"}
+    assert validate_yaml_references("/bundle/root.yml", source=memory) == []
+
+
+def test_in_memory_source_applies_path_rules():
+    memory = InMemorySource(
+        {
+            "/bundle/root.yml": "a: !reference ../secrets/key.yml",
+            "/bundle/loop.yml": "a: !reference loop.yml",
+            "/bundle/globbed.yml": "all: !reference-all ../secrets/*.yml",
+            "/secrets/key.yml": "key: 1",
+        }
+    )
+    with pytest.raises(PermissionError):
+        load_yaml_with_references("/bundle/root.yml", source=memory)
+    assert load_yaml_with_references(
+        "/bundle/root.yml", allow_paths=["/secrets"], source=memory
+    ) == {"a": {"key": 1}}
+    assert load_yaml_with_references("/bundle/globbed.yml", source=memory) == {
+        "all": []
+    }
+    with pytest.raises(ValueError, match="Circular reference"):
+        load_yaml_with_references("/bundle/loop.yml", source=memory)
+    with pytest.raises(FileNotFoundError):
+        load_yaml_with_references("/bundle/missing.yml", source=memory)
+
+
+PARENT_GLOBS = {
+    "cfg/root.yml": (
+        "all: !reference-all ../shared/*.yml\n"
+        "literal: !reference-all ../shared/a.yml\n"
+        "one: !reference ../shared/a.yml\n"
+    ),
+    "shared/a.yml": "x: 1\n",
+}
+
+
+def test_in_memory_source_globs_through_parent_directories(stage_files):
+    stg = stage_files(PARENT_GLOBS)
+    on_disk = load_yaml_with_references(
+        stg / "cfg/root.yml", allow_paths=[stg / "shared"]
+    )
+    assert on_disk == {"all": [{"x": 1}], "literal": [{"x": 1}], "one": {"x": 1}}
+    memory = InMemorySource({f"/{name}": text for name, text in PARENT_GLOBS.items()})
+    assert (
+        load_yaml_with_references(
+            "/cfg/root.yml", allow_paths=["/shared"], source=memory
+        )
+        == on_disk
+    )
+
+
+def test_custom_source_sees_every_file_access(stage_files):
+    stg = stage_files(FILES)
+
+    class RecordingSource(LocalSource):
+        def __init__(self):
+            self.opened = []
+            self.listed = []
+
+        def open(self, path):
+            self.opened.append(path)
+            return super().open(path)
+
+        def scandir(self, path):
+            self.listed.append(path)
+            return super().scandir(path)
+
+    source = RecordingSource()
+    load_yaml_with_references(stg / "root.yml", source=source)
+    assert sorted(set(source.opened)) == sorted(
+        str(stg / name) for name in FILES if name.endswith(".yml")
+    )
+    assert str(stg / "services/nested") in source.listed
+
+
+def _write_zip(path, files):
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as archive:
+        for name, text in files.items():
+            archive.writestr(name, text)
+    return path
+
+
+def _write_tar(path, files, mode="w:gz"):
+    with tarfile.open(path, mode) as archive:
+        for name, text in files.items():
+            data = text.encode()
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            archive.addfile(info, io.BytesIO(data))
+    return path
+
+
+@pytest.mark.parametrize("kind", ["zip", "tar.gz", "tar"])
+def test_archive_source_matches_the_disk(stage_files, tmp_path, kind):
+    on_disk = load_yaml_with_references(stage_files(FILES) / "root.yml")
+    if kind == "zip":
+        archive = _write_zip(tmp_path / "bundle.zip", FILES)
+    else:
+        archive = _write_tar(tmp_path / f"bundle.{kind}", FILES, f"w:{kind[4:]}")
+    with ArchiveSource(archive) as source:
+        root = archive / "root.yml"
+        assert load_yaml_with_references(root, source=source) == on_disk
+        assert validate_yaml_references(root, source=source) == []
+
+
+@pytest.mark.parametrize("kind", ["zip", "tar"])
+def test_archive_source_globs_through_parent_directories(stage_files, tmp_path, kind):
+    stg = stage_files(PARENT_GLOBS)
+    on_disk = load_yaml_with_references(stg / "cfg/root.yml", allow_paths=[stg])
+    if kind == "zip":
+        archive = _write_zip(tmp_path / "bundle.zip", PARENT_GLOBS)
+    else:
+        archive = _write_tar(tmp_path / "bundle.tar", PARENT_GLOBS, "w")
+    with ArchiveSource(archive, root="/bundle") as source:
+        assert (
+            load_yaml_with_references(
+                "/bundle/cfg/root.yml", allow_paths=["/bundle"], source=source
+            )
+            == on_disk
+        )
+
+
+def test_archive_source_keeps_members_inside_the_root(tmp_path):
+    archive = _write_tar(
+        tmp_path / "bundle.tar",
+        {
+            "root.yml": "all: !reference-all 'sub/*.yml'",
+            "../escape.yml": "a: 1",
+            "/absolute.yml": "a: 1",
+            "sub/ok.yml": "a: 1",
+            "sub/up/up.yml": "a: !reference ../ok.yml",
+        },
+        "w",
+    )
+    with tarfile.open(archive, "a") as tar:
+        link = tarfile.TarInfo("sub/link.yml")
+        link.type = tarfile.SYMTYPE
+        link.linkname = "/etc/passwd"
+        tar.addfile(link)
+
+    with ArchiveSource(archive, root="/mnt/bundle") as source:
+        assert load_yaml_with_references("/mnt/bundle/root.yml", source=source) == {
+            "all": [{"a": 1}]
+        }
+        with pytest.raises(PermissionError):
+            load_yaml_with_references("/mnt/bundle/sub/up/up.yml", source=source)
+        assert load_yaml_with_references(
+            "/mnt/bundle/sub/up/up.yml", allow_paths=["/mnt/bundle"], source=source
+        ) == {"a": {"a": 1}}
+
+
+def test_archive_source_from_a_file_object(tmp_path):
+    data = io.BytesIO()
+    _write_zip(data, {"root.yml": "a: !reference b.yml", "b.yml": "b: 1"})
+    with pytest.raises(ValueError, match="root"):
+        ArchiveSource(data)
+    source = ArchiveSource(data, root="/virtual")
+    assert load_yaml_with_references("/virtual/root.yml", source=source) == {
+        "a": {"b": 1}
+    }
+    with pytest.raises(ValueError, match="neither a zip nor a tar"):
+        ArchiveSource(io.BytesIO(b"plain text"), root="/virtual")
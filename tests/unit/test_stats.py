@@ -0,0 +1,105 @@
+import json
+
+import pytest
+
+from yaml_reference import (
+    LoadStats,
+    load_yaml_with_references,
+    parse_yaml_with_references,
+)
+from yaml_reference.cli import compile_main
+
+
+def test_load_stats_records_files_passes_globs_and_cache(stage_files):
+    stg = stage_files(
+        {
+            "root.yml": (
+                "parts: !reference-all parts/*.yml\n"
+                "shared: !reference shared.yml\n"
+                "anchored: !reference { path: anchors.yml, anchor: inner }\n"
+            ),
+            "parts/a.yml": "shared: !reference ../shared.yml",
+            "parts/b.yml": "b: 1",
+            "shared.yml": "value: 1",
+            "anchors.yml": "outer:\n  inner: &inner {x: 1}\n",
+        }
+    )
+    stats = LoadStats()
+    data = load_yaml_with_references(stg / "root.yml", stats=stats)
+    assert data["anchored"] == {"x": 1}
+
+    root, shared, anchors = (
+        stats.files[str(stg / name)]
+        for name in ("root.yml", "shared.yml", "anchors.yml")
+    )
+    assert (root.loads, root.references) == (1, 0)
+    assert (shared.loads, shared.references) == (2, 2)
+    assert shared.bytes_read == 2 * len("value: 1")
+    assert anchors.anchor_seconds > 0
+    assert root.parse_seconds > 0 and root.construct_seconds > 0
+    assert stats.files[str(stg / "parts/a.yml")].references == 1
+
+    assert set(stats.passes) == {"attribute", "resolve", "prune", "flatten", "merge"}
+    assert (stats.glob_expansions, stats.glob_matches) == (1, 2)
+    assert stats.cache_hits > 0 and stats.cache_misses > 0
+    assert stats.total_seconds >= stats.passes["resolve"]
+
+    report = stats.report()
+    json.dumps(report)
+    assert report["files_loaded"] == 5
+    assert report["globs"] == {"expansions": 1, "matches": 2}
+    assert {entry["path"] for entry in report["files"]} == set(stats.files)
+
+
+def test_load_stats_accumulate_across_calls(stage_files):
+    stg = stage_files({"root.yml": "a: !reference leaf.yml", "leaf.yml": "b: 1"})
+    stats = LoadStats()
+    parse_yaml_with_references(stg / "root.yml", stats=stats)
+    load_yaml_with_references(stg / "root.yml", stats=stats)
+    assert stats.files[str(stg / "root.yml")].loads == 2
+    assert stats.files[str(stg / "leaf.yml")].loads == 1
+    assert stats._stack == []
+
+
+def test_profile_trace_nests_spans_along_the_reference_chain(stage_files, capsys):
+    stg = stage_files(
+        {
+            "root.yml": "a: !reference a.yml\nall: !reference-all parts/*.yml\n",
+            "a.yml": "b: !reference b.yml",
+            "b.yml": "c: 1",
+            "parts/p.yml": "p: 1",
+        }
+    )
+    profile = stg / "profile.json"
+    compile_main(str(stg / "root.yml"), profile=str(profile))
+    assert json.loads(capsys.readouterr().out)["a"] == {"b": {"c": 1}}
+
+    events = json.loads(profile.read_text())["traceEvents"]
+    assert all(event["ph"] == "X" for event in events)
+    assert events[0]["cat"] == "load" and events[0]["ts"] == 0
+
+    def _span(category, name):
+        return next(e for e in events if (e["cat"], e["name"]) == (category, name))
+
+    def _contains(outer, inner):
+        return (
+            outer["ts"] <= inner["ts"]
+            and inner["ts"] + inner["dur"] <= outer["ts"] + outer["dur"]
+        )
+
+    reference_a, reference_b = _span("reference", "a.yml"), _span("reference", "b.yml")
+    assert _contains(reference_a, reference_b)
+    assert _contains(reference_b, _span("parse", "b.yml"))
+    assert _contains(_span("pass", "resolve"), _span("glob", "parts/*.yml"))
+    assert {"prune", "flatten", "merge"} <= {
+        event["name"] for event in events if event["cat"] == "pass"
+    }
+    assert _span("output", "json")["ts"] >= _span("pass", "merge")["ts"]
+
+
+def test_profile_is_written_when_compilation_fails(stage_files, capsys):
+    stg = stage_files({"root.yml": "a: !reference missing.yml"})
+    profile = stg / "profile.json"
+    with pytest.raises(SystemExit):
+        compile_main(str(stg / "root.yml"), profile=str(profile))
+    assert json.loads(profile.read_text())["traceEvents"][0]["cat"] == "load"
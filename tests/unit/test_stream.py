@@ -0,0 +1,122 @@
+import json
+from collections.abc import Iterator
+
+import pytest
+
+import yaml_reference
+from yaml_reference import LoadStats, load_yaml_with_references
+from yaml_reference.cli import compile_main
+
+
+@pytest.fixture
+def services(stage_files):
+    return stage_files(
+        {
+            "root.yml": "!reference-all services/*.yml",
+            "services/a.yml": "name: a\ndb: !reference ../db.yml\n",
+            "services/b.yml": "--- {name: b}\n--- !ignore {name: hidden}\n--- [1, !flatten [[2]]]\n",
+            "services/c.yml": "!ignore {name: c}",
+            "services/d.yml": '!merge [{name: d}, {text: "two\\nlines"}]',
+            "db.yml": "host: db",
+        }
+    )
+
+
+def test_stream_resolves_root_reference_all_one_file_at_a_time(services):
+    stats = LoadStats()
+    items = load_yaml_with_references(services / "root.yml", stream=True, stats=stats)
+    assert isinstance(items, Iterator)
+    assert stats.files.keys() == {str(services / "root.yml")}
+
+    assert next(items) == {"name": "a", "db": {"host": "db"}}
+    assert str(services / "services/b.yml") not in stats.files
+    assert list(items) == load_yaml_with_references(services / "root.yml")[1:]
+    assert stats.glob_expansions == 1 and stats._stack == []
+
+
+@pytest.mark.parametrize(
+    "files",
+    [
+        {
+            "root.yml": "--- {a: !reference x.yml}\n--- !ignore 1\n--- null\n",
+            "x.yml": "1",
+        },
+        {"root.yml": "!reference-all none/*.yml"},
+        {"root.yml": "a: !reference-all services/*.yml"},
+        {"root.yml": "!ignore 1"},
+        {"root.yml": ""},
+    ],
+)
+def test_stream_matches_eager_load(stage_files, files):
+    stg = stage_files({**files, "services/s.yml": "s: 1"})
+    eager = load_yaml_with_references(stg / "root.yml")
+    streamed = load_yaml_with_references(stg / "root.yml", stream=True)
+    assert (list(streamed) if isinstance(streamed, Iterator) else streamed) == eager
+
+
+@pytest.mark.parametrize(
+    "root",
+    [
+        "!reference-all services/*.yml",
+        "!reference-all services/none-*.yml",
+        "--- !reference-all services/*.yml\n--- {b: 1}\n",
+        "services: !reference-all services/*.yml",
+    ],
+)
+def test_cli_streamed_output_is_identical_to_buffered_output(
+    services, capsys, tmp_path, root
+):
+    (services / "root.yml").write_text(root)
+    expected = json.dumps(
+        load_yaml_with_references(services / "root.yml"), sort_keys=True, indent=2
+    )
+    compile_main(str(services / "root.yml"))
+    assert capsys.readouterr().out == expected
+    compile_main(str(services / "root.yml"), output=str(tmp_path / "out.json"))
+    assert (tmp_path / "out.json").read_text() == expected
+
+
+@pytest.mark.parametrize(
+    "root",
+    ["!reference-all services/*.yml", "--- {a: 1}\n--- !reference missing.yml\n"],
+)
+def test_cli_prints_nothing_when_a_later_item_fails(services, capsys, root):
+    (services / "root.yml").write_text(root)
+    (services / "services/b.yml").write_text("b: !reference missing.yml")
+    with pytest.raises(SystemExit) as exit_info:
+        compile_main(str(services / "root.yml"))
+    assert exit_info.value.code == 1
+    captured = capsys.readouterr()
+    assert captured.out == ""
+    assert "does not exist" in captured.err
+
+
+def test_cli_ndjson_prints_one_line_per_root_reference_all_item(services, capsys):
+    compile_main(str(services / "root.yml"), ndjson=True)
+    lines = capsys.readouterr().out.splitlines()
+    assert [json.loads(line) for line in lines] == load_yaml_with_references(
+        services / "root.yml"
+    )
+    assert len(lines) == 4
+
+
+@pytest.mark.parametrize("stream", [True, False])
+def test_stream_keeps_the_read_ahead_document_tag_free(
+    stage_files, monkeypatch, stream
+):
+    stg = stage_files({"root.yml": "--- {a: [1]}\n--- {b: [2]}\n--- {c: [3]}\n"})
+    registered = []
+
+    def _post_process(resolved, context):
+        registered.append(id(resolved) in context.tag_free)
+        return post_process(resolved, context)
+
+    post_process = yaml_reference._post_process
+    monkeypatch.setattr(yaml_reference, "_post_process", _post_process)
+    if stream:
+        documents = list(load_yaml_with_references(stg / "root.yml", stream=True))
+    else:
+        documents = list(yaml_reference.iter_yaml_with_references(stg / "root.yml"))
+    assert documents == [{"a": [1]}, {"b": [2]}, {"c": [3]}]
+    # The second document is parsed before the first is yielded, and must keep its registry entries.
+    assert registered == [True, True, True]
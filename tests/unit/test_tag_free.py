@@ -0,0 +1,87 @@
+from yaml_reference import (
+    _parse_yaml_documents,
+    _ResolutionContext,
+    load_yaml_with_references,
+    merge_mappings,
+    prune_ignores,
+)
+
+
+def test_tag_free_subtrees_are_registered_during_construction(stage_files):
+    stg = stage_files(
+        {
+            "root.yml": (
+                "plain:\n  a: [1, 2]\n  b: {c: 3}\n"
+                "mixed:\n  keep: [4]\n  ref: !reference leaf.yml\n"
+                "shared: &s {d: 5}\n"
+                "alias: *s\n"
+            ),
+            "leaf.yml": "x: 1",
+        }
+    )
+    context = _ResolutionContext()
+    parsed = _parse_yaml_documents(stg / "root.yml", context=context)
+    document = parsed.documents[0]
+
+    assert id(document) not in context.tag_free
+    assert id(document["mixed"]) not in context.tag_free
+    for subtree in (
+        document["plain"],
+        document["plain"]["a"],
+        document["plain"]["b"],
+        document["mixed"]["keep"],
+    ):
+        assert context.tag_free[id(subtree)] is subtree
+    # Aliased containers are constructed once, so the passes copy them at every place they appear at.
+    assert id(document["shared"]) not in context.tag_free
+    assert document["alias"] == document["shared"]
+    assert document["alias"] is not document["shared"]
+
+
+def test_passes_return_tag_free_subtrees_unchanged():
+    plain = {"a": [1, {"b": 2}]}
+    tag_free = {id(plain): plain}
+    assert merge_mappings({"plain": plain}, tag_free)["plain"] is plain
+    assert prune_ignores([plain], tag_free)[0] is plain
+    assert merge_mappings({"plain": plain})["plain"] is not plain
+
+
+def test_load_keeps_plain_leaf_files_intact(stage_files):
+    stg = stage_files(
+        {
+            "root.yml": (
+                "leaf: !reference leaf.yml\n"
+                "all: !flatten [!reference-all parts/*.yml, [9]]\n"
+                "merged: !merge [!reference leaf.yml, {extra: !ignore 1, y: 2}]\n"
+            ),
+            "leaf.yml": "x: {nested: [1, 2]}\ny: 1\n",
+            "parts/a.yml": "- 1\n- [2, 3]\n",
+            "parts/b.yml": "- !ignore 4\n- 5\n",
+        }
+    )
+    assert load_yaml_with_references(stg / "root.yml") == {
+        "leaf": {"x": {"nested": [1, 2]}, "y": 1},
+        "all": [1, 2, 3, 5, 9],
+        "merged": {"x": {"nested": [1, 2]}, "y": 2},
+    }
+
+
+def test_load_returns_independent_copies_of_aliased_subtrees(stage_files):
+    stg = stage_files(
+        {
+            "tagged.yml": (
+                "a: &s {d: {e: 1}, l: [1]}\nb: *s\nc: [*s]\nleaf: !reference plain.yml\n"
+            ),
+            "plain.yml": "a: &s {d: {e: 1}, l: [1]}\nb: *s\nc: [*s]\n",
+        }
+    )
+    for data in (
+        load_yaml_with_references(stg / "tagged.yml"),
+        load_yaml_with_references(stg / "plain.yml"),
+        load_yaml_with_references(stg / "tagged.yml")["leaf"],
+    ):
+        data["b"]["d"]["e"] = 2
+        data["c"][0]["l"].append(2)
+        assert data["a"] == {"d": {"e": 1}, "l": [1]}
+        assert data["b"] == {"d": {"e": 2}, "l": [1]}
+        assert data["c"] == [{"d": {"e": 1}, "l": [1, 2]}]
@@ -0,0 +1,186 @@
+import pytest
+
+from yaml_reference import (
+    ValidationIssue,
+    load_yaml_with_references,
+    validate_yaml_references,
+)
+from yaml_reference.cli import compile_main
+
+
+@pytest.fixture
+def broken(stage_files):
+    return stage_files(
+        {
+            "root.yml": (
+                "a: !reference missing.yml\n"
+                "b: !reference {anchor: x}\n"
+                "c: !reference {path: anchors.yml, anchor: nope}\n"
+                "d: !reference-all ''\n"
+                "e: !reference multi.yml\n"
+                "f: !reference loop.yml\n"
+                "g: !reference bad.yml\n"
+                "h: !reference ../outside/o.yml\n"
+                "ok: !reference {path: anchors.yml, anchor: here}\n"
+                "ignored: !ignore {x: !reference missing.yml}\n"
+            ),
+            "anchors.yml": "here: &here 1\n",
+            "multi.yml": "--- 1\n--- 2\n",
+            "loop.yml": "!reference root.yml",
+            "bad.yml": "a: [1\n",
+        }
+    )
+
+
+@pytest.mark.parametrize("backend", ["pure", "auto"])
+def test_validate_reports_every_problem_in_one_run(broken, backend):
+    root = broken / "root.yml"
+    (broken.parent / "outside").mkdir()
+    (broken.parent / "outside" / "o.yml").write_text("o: 1")
+
+    issues = validate_yaml_references(root, backend=backend)
+    assert [(issue.path, issue.line) for issue in issues] == [
+        (str(root), 1),
+        (str(root), 2),
+        (str(root), 3),
+        (str(root), 4),
+        (str(root), 5),
+        (str(broken / "loop.yml"), 1),
+        (str(broken / "bad.yml"), None),
+        (str(root), 8),
+    ]
+    messages = [issue.message for issue in issues]
+    assert "does not exist" in messages[0]
+    assert messages[1] == "!reference requires a 'path' key."
+    assert messages[2] == f"Anchor 'nope' not found in '{broken / 'anchors.yml'}'."
+    assert messages[3].startswith("Unacceptable pattern")
+    assert "multiple YAML documents" in messages[4]
+    assert messages[5] == (
+        f"Circular reference detected: {root} -> {broken / 'loop.yml'} -> {root}"
+    )
+    assert messages[6].startswith("Failed to parse")
+    assert "is not allowed" in messages[7]
+
+
+def test_validate_accepts_a_tree_that_loads(stage_files):
+    stg = stage_files(
+        {
+            "root.yml": (
+                "base: &base {x: !reference x.yml}\n"
+                "copy: *base\n"
+                "parts: !reference-all {glob: 'parts/*.yml', anchor: p}\n"
+                "merged: !merge [*base, {x: 2}]\n"
+            ),
+            "x.yml": "1",
+            "parts/a.yml": "--- {p: &p 1}\n--- {p: &p 2}\n",
+        }
+    )
+    assert validate_yaml_references(stg / "root.yml") == []
+    load_yaml_with_references(stg / "root.yml")
+
+
+def test_validate_reports_each_tag_reaching_a_bad_file(stage_files):
+    stg = stage_files(
+        {
+            "root.yml": "a: !reference-all '*.multi.yml'\nb: !reference m.multi.yml\n",
+            "m.multi.yml": "--- {x: !reference gone.yml}\n--- 2\n",
+        }
+    )
+    issues = validate_yaml_references(stg / "root.yml")
+    assert [(issue.path, issue.line) for issue in issues] == [
+        (str(stg / "m.multi.yml"), 1),
+        (str(stg / "root.yml"), 2),
+    ]
+
+
+def test_validate_skips_overridden_merge_values(stage_files):
+    stg = stage_files(
+        {
+            "root.yml": (
+                "a: !merge\n"
+                "  - db: !reference gone.yml\n"
+                "    port: !reference gone.yml\n"
+                "  - !reference override.yml\n"
+                "  - {port: !ignore 1}\n"
+                "b: !merge [!reference base.yml, [{db: 2}]]\n"
+            ),
+            "override.yml": "db: local\n",
+            "base.yml": "name: base\ndb: !reference gone.yml\n",
+        }
+    )
+    issues = validate_yaml_references(stg / "root.yml")
+    # An `!ignore`d override is pruned before the merge, so the value it would override is still resolved.
+    assert [(issue.path, issue.line) for issue in issues] == [
+        (str(stg / "root.yml"), 3)
+    ]
+
+    (stg / "root.yml").write_text(
+        (stg / "root.yml").read_text().replace("{port: !ignore 1}", "{port: 1}")
+    )
+    assert validate_yaml_references(stg / "root.yml") == []
+    assert load_yaml_with_references(stg / "root.yml") == {
+        "a": {"db": "local", "port": 1},
+        "b": {"name": "base", "db": 2},
+    }
+
+
+def test_validate_reports_the_first_of_several_cycles(stage_files):
+    stg = stage_files(
+        {
+            "root.yml": "a: !reference a.yml\nb: !reference b.yml\n",
+            "a.yml": "!reference root.yml",
+            "b.yml": "!reference a.yml",
+        }
+    )
+    issues = validate_yaml_references(stg / "root.yml")
+    assert [issue.message for issue in issues] == [
+        f"Circular reference detected: {stg / 'root.yml'} -> {stg / 'a.yml'} -> {stg / 'root.yml'}"
+    ]
+
+
+def test_validate_missing_root(tmp_path):
+    assert validate_yaml_references(tmp_path / "nope.yml") == [
+        ValidationIssue(
+            str(tmp_path / "nope.yml"),
+            None,
+            f"File '{tmp_path / 'nope.yml'}' does not exist.",
+        )
+    ]
+
+
+def test_cli_check(broken, capsys):
+    compile_main(str(broken / "anchors.yml"), check=True)
+    assert capsys.readouterr().out == ""
+
+    with pytest.raises(SystemExit) as exit_info:
+        compile_main(str(broken / "root.yml"), check=True)
+    assert exit_info.value.code == 1
+    captured = capsys.readouterr()
+    assert captured.out == ""
+    assert captured.err.splitlines()[0].startswith(f"Error: {broken / 'root.yml'}:1: ")
+
+
+@pytest.mark.parametrize(
+    "kwargs",
+    [
+        {"select": "a"},
+        {"ndjson": True},
+        {"digest": True},
+        {"output": "out.json"},
+        {"depfile": "out.d"},
+        {"manifest": "out.manifest.json"},
+        {"profile": "profile.json"},
+    ],
+)
+def test_cli_check_rejects_output_options(broken, tmp_path, capsys, kwargs):
+    kwargs = {
+        name: str(tmp_path / value)
+        if isinstance(value, str) and name != "select"
+        else value
+        for name, value in kwargs.items()
+    }
+    with pytest.raises(SystemExit) as exit_info:
+        compile_main(str(broken / "anchors.yml"), check=True, **kwargs)
+    assert exit_info.value.code == 1
+    assert "--check cannot be combined with" in capsys.readouterr().err
+    assert sorted(path.name for path in tmp_path.iterdir()) == ["staged"]
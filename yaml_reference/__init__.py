@@ -1,13 +1,37 @@
 import io
+import itertools
 import os
-from collections import defaultdict
-from dataclasses import dataclass
+from collections import abc, defaultdict
+from collections.abc import Callable, Iterator, Mapping, Sequence
+from contextlib import contextmanager
+from dataclasses import dataclass, field
 from pathlib import Path
-from typing import IO, Any, Optional, Sequence, Union
+from typing import IO, Any, Optional, Union
 
-from ruamel.yaml import YAML, events
+from ruamel.yaml import YAML, events, nodes
+from ruamel.yaml.constructor import SafeConstructor
+from ruamel.yaml.error import YAMLError
+from ruamel.yaml.main import CParser
 from ruamel.yaml.tag import Tag
 
+from yaml_reference._paths import (
+    _AllowPathMatcher,
+    _compile_allow_paths,
+    _FileSystemCache,
+    glob_allowed_files,
+)
+from yaml_reference.dependencies import GlobExpansion, LoadDependencies
+from yaml_reference.digest import digest_resolved
+from yaml_reference.sources import (
+    ArchiveSource,
+    InMemorySource,
+    LocalSource,
+    Source,
+    SourceStat,
+    _VirtualFileSource,
+)
+from yaml_reference.stats import FileStats, LoadStats, _span
+
 
 class Reference:
     """Represents a reference to another YAML file.
@@ -164,32 +188,8 @@ class Flatten:
         Returns:
             Sequence[Any]: The flattened sequence.
         """
-
-        def _flatten_list(lst: list) -> list:
-            """Helper method to recursively flatten a list."""
-            flattened = []
-            for item in lst:
-                if isinstance(item, list):
-                    flattened.extend(_flatten_list(item))
-                else:
-                    flattened.append(item)
-            return flattened
-
-        # Recursively flatten nested sequences
-        result = []
-        for item in self.sequence:
-            if isinstance(item, Flatten):
-                # Recursively flatten nested Flatten objects
-                result.extend(item.flattened())
-            elif isinstance(item, Merge):
-                # Keep merges intact - they will be evaluated later.
-                result.append(item)
-            elif isinstance(item, list):
-                # Recursively flatten nested lists
-                result.extend(_flatten_list(item))
-            else:
-                result.append(item)
-        return result
+        # Merges are kept intact - they will be evaluated later.
+        return list(_iter_flattened(self.sequence))
 
     @classmethod
     def from_yaml(cls, constructor, node):
@@ -219,6 +219,27 @@ class Merge:
     def __repr__(self):
         return f"Merge(sequence={self.sequence})"
 
+    def layers(self) -> list[dict]:
+        """Return the mappings this merge combines, in order, without copying them.
+
+        Flattens nested sequences first. The layers of nested Merge objects are spliced in at their position, so a
+        merge of merges is only ever copied once, when it is materialized.
+
+        Returns:
+            list[dict]: The mappings to merge; later ones override keys from earlier ones.
+
+        Raises:
+            ValueError: If the sequence contains non-mapping items after flattening.
+        """
+        layers = []
+        for item in _iter_flattened(self.sequence, into_merges=True):
+            if not isinstance(item, dict):
+                raise ValueError(
+                    f"All items in the sequence for !merge must be mappings. Got: {item}"
+                )
+            layers.append(item)
+        return layers
+
     def merged(self) -> dict:
         """Recursively merge all mappings in this sequence.
 
@@ -232,19 +253,9 @@ class Merge:
         Raises:
             ValueError: If the sequence contains non-mapping items after flattening.
         """
-        # First, flatten the sequence to ensure all items are at the same level
-        flattened_sequence = flatten_sequences(Flatten(self.sequence))
         merged_dict = {}
-        for item in flattened_sequence:
-            if isinstance(item, Merge):
-                # Recursively merge nested Merge objects
-                item |= item.merged()
-            if isinstance(item, dict):
-                merged_dict |= item
-            else:
-                raise ValueError(
-                    f"All items in the sequence for !merge must be mappings. Got: {item}"
-                )
+        for layer in self.layers():
+            merged_dict |= layer
         return merged_dict
 
     @classmethod
@@ -253,6 +264,29 @@ class Merge:
         return cls(seq)
 
 
+def _iter_flattened(
+    sequence: Sequence[Any], into_merges: bool = False
+) -> Iterator[Any]:
+    """Yield the items of *sequence* depth-first, descending into nested lists and Flatten objects.
+
+    With *into_merges*, the operands of nested Merge objects are spliced in as well. An explicit stack of iterators
+    replaces recursion, so no intermediate list is built at any nesting level and depth is not limited by the
+    recursion limit.
+    """
+    stack = [iter(sequence)]
+    while stack:
+        for item in stack[-1]:
+            if isinstance(item, list):
+                stack.append(iter(item))
+                break
+            if isinstance(item, Flatten) or (into_merges and isinstance(item, Merge)):
+                stack.append(iter(item.sequence))
+                break
+            yield item
+        else:
+            stack.pop()
+
+
 @dataclass
 class MultiDocument:
     documents: list[Any]
@@ -268,9 +302,154 @@ class MultiDocument:
 
 PathLike = Union[str, Path, os.PathLike]
 
+PARSER_BACKENDS = ("auto", "pure", "c")
+
+_COMPOSITION_TAGS = frozenset(
+    cls.yaml_tag for cls in (Reference, ReferenceAll, Flatten, Merge, Ignore)
+)
+
+
+def _register_tag_free_containers(
+    root: nodes.Node, constructed: dict, tag_free: dict[int, Any]
+) -> None:
+    """Record every constructed container of a document whose subtree holds no composition tag.
+
+    Walks the composed node graph once (aliases are visited once) and stores the matching dicts and lists in *tag_free*, keyed by
+    `id()`. The registry keeps a reference to each object so that its id cannot be reused while it is in use.
+
+    Containers reached through an alias, everything inside them and every container around an alias are left out:
+    the constructor builds an aliased node once for all the places it appears at, and the passes copy it at each of
+    them, so that the result holds independent copies rather than one shared object.
+    """
+    tagged: dict[int, bool] = {}
+    aliased: list[nodes.Node] = []
+
+    def _visit(node: nodes.Node) -> bool:
+        key = id(node)
+        if key in tagged:
+            # An alias: the containers around it must be copied too, so they count as tagged.
+            aliased.append(node)
+            return True
+        tagged[key] = True
+        if isinstance(node, nodes.MappingNode):
+            children = [child for pair in node.value for child in pair]
+        elif isinstance(node, nodes.SequenceNode):
+            children = node.value
+        else:
+            children = ()
+        has_tag = node.tag in _COMPOSITION_TAGS
+        for child in children:
+            # Visit every child, even after a tag is found, so that tag-free siblings are registered too.
+            has_tag = _visit(child) or has_tag
+        tagged[key] = has_tag
+        if not has_tag:
+            data = constructed.get(node)
+            if type(data) is dict or type(data) is list:
+                tag_free[id(data)] = data
+        return has_tag
+
+    _visit(root)
+    unregistered: set[int] = set()
+    while aliased:
+        node = aliased.pop()
+        if id(node) in unregistered:
+            continue
+        unregistered.add(id(node))
+        data = constructed.get(node)
+        if type(data) is dict or type(data) is list:
+            tag_free.pop(id(data), None)
+        if isinstance(node, nodes.MappingNode):
+            aliased.extend(child for pair in node.value for child in pair)
+        elif isinstance(node, nodes.SequenceNode):
+            aliased.extend(node.value)
+
+
+class _CompositionConstructor(SafeConstructor):
+    """Safe constructor which records, per document, the containers that hold no composition tags.
+
+    Post-processing passes return such containers unchanged instead of walking and copying them.
+    """
+
+    tag_free: Optional[dict[int, Any]] = None
+    stats: Optional[LoadStats] = None
+
+    def construct_document(self, node: nodes.Node) -> Any:
+        with _span(self.stats, "construct", "construct"):
+            # The base implementation replaces `constructed_objects` once the document is built; keep the filled one.
+            constructed = self.constructed_objects
+            data = super().construct_document(node)
+            if self.tag_free is not None:
+                _register_tag_free_containers(node, constructed, self.tag_free)
+        return data
+
+
+@dataclass
+class _ResolutionContext:
+    """State shared by every step of a single resolution.
+
+    Args:
+        fs (_FileSystemCache): Filesystem metadata cache used by every path check, so that the same file is never
+            resolved or stat'ed twice while loading one reference graph.
+        tag_free (dict[int, Any]): Containers known to hold no composition tags, keyed by `id()`. Filled while
+            parsing and consulted by every pass, which returns those subtrees as-is.
+        backend (str): Parser backend used to read every file, one of `PARSER_BACKENDS`.
+        stats (LoadStats, optional): Collector for timings and counters, or None to skip all bookkeeping.
+        max_depth (int, optional): Number of reference layers to resolve below the root file, or None for all of them.
+        dependencies (LoadDependencies, optional): Collector for the files read and globs expanded, or None.
+    """
+
+    fs: _FileSystemCache = field(default_factory=_FileSystemCache)
+    tag_free: dict[int, Any] = field(default_factory=dict, repr=False)
+    backend: str = "auto"
+    stats: Optional[LoadStats] = None
+    max_depth: Optional[int] = None
+    dependencies: Optional[LoadDependencies] = None
+    _yaml: Optional[YAML] = field(default=None, repr=False)
+
+    def __post_init__(self):
+        _check_parser_backend(self.backend)
+        if self.max_depth is not None and self.max_depth < 0:
+            raise ValueError(f"max_depth must not be negative. Got: {self.max_depth}")
+
+    def yaml_loader(self) -> YAML:
+        """Return the YAML loader of this resolution, building it on first use.
+
+        Building a loader is not free (ruamel.yaml scans its plug-in directory every time), and files are always
+        fully parsed before any of their references are followed, so one loader serves the whole resolution.
+        """
+        if self._yaml is None:
+            self._yaml = _build_yaml_loader(
+                backend=self.backend, tag_free=self.tag_free, stats=self.stats
+            )
+        return self._yaml
+
+
+def _check_parser_backend(backend: str) -> None:
+    if backend not in PARSER_BACKENDS:
+        raise ValueError(
+            f"Unknown parser backend '{backend}'. Expected one of: {', '.join(PARSER_BACKENDS)}."
+        )
+    if backend == "c" and CParser is None:
+        raise ImportError(
+            "The 'c' parser backend requires the ruamel.yaml.clib extension, which is not installed."
+        )
+
 
-def _build_yaml_loader() -> YAML:
-    yaml = YAML(typ="safe")
+def _build_yaml_loader(
+    backend: str = "auto",
+    tag_free: Optional[dict[int, Any]] = None,
+    stats: Optional[LoadStats] = None,
+) -> YAML:
+    _check_parser_backend(backend)
+    # `auto` lets ruamel.yaml pick its C parser whenever ruamel.yaml.clib is installed.
+    yaml = YAML(typ="safe", pure=backend == "pure")
+    # The C parser builds a fresh loader object from `yaml.Constructor` on every load, so the registry and collector
+    # are bound to a per-loader subclass rather than to the constructor instance.
+    yaml.Constructor = type(
+        _CompositionConstructor.__name__,
+        (_CompositionConstructor,),
+        {"tag_free": tag_free, "stats": stats},
+    )
     yaml.register_class(Reference)
     yaml.register_class(ReferenceAll)
     yaml.register_class(Flatten)
@@ -279,21 +458,20 @@ def _build_yaml_loader() -> YAML:
     return yaml
 
 
-def _check_file_path(path: PathLike, allow_paths: Sequence[PathLike]) -> Path:
-    if not isinstance(path, Path):
-        path = Path(path)
-    path = path.resolve()
-    if not path.exists():
+def _check_file_path(
+    path: PathLike,
+    allow_paths: Sequence[PathLike],
+    fs: Optional[_FileSystemCache] = None,
+) -> Path:
+    if fs is None:
+        fs = _FileSystemCache()
+    path = Path(fs.realpath(path))
+    if not fs.exists(path):
         raise FileNotFoundError(f"File '{path}' does not exist.")
-    if not path.is_file():
+    if not fs.is_file(path):
         raise ValueError(f"'{path}' is not a file.")
-    if not allow_paths:
+    if _compile_allow_paths(allow_paths).allows(path):
         return path
-    for allow_path in allow_paths:
-        if not isinstance(allow_path, Path):
-            allow_path = Path(allow_path)
-        if path.is_relative_to(allow_path):
-            return path
     raise PermissionError(f"File '{path}' is not allowed.")
 
 
@@ -395,6 +573,9 @@ def _extract_anchor_from_parser_events(
         ):
             event.ctag = _str_tag
             event.implicit = (True, True)
+        elif isinstance(getattr(event, "ctag", None), str):
+            # The C parser reports tags as plain strings, while the emitter expects `Tag` objects.
+            event.ctag = Tag(suffix=event.ctag)
 
     strio = io.StringIO()
     try:
@@ -408,41 +589,63 @@ def _extract_anchor_from_parser_events(
         )
         raise ValueError(msg)
     strio.seek(0)
-    document = _build_yaml_loader().load(strio)
+    document = yaml.load(strio)
     return document
 
 
+def _trim_doc_infos(yaml: YAML) -> None:
+    # ruamel.yaml appends an entry to `doc_infos` for every document it parses, and only ever reads the last one.
+    del getattr(yaml, "doc_infos", [])[:-1]
+
+
 def _parse_yaml_documents(
     file_path: PathLike,
     anchor: Optional[str] = None,
     allow_paths: Optional[Sequence[PathLike]] = None,
+    context: Optional[_ResolutionContext] = None,
 ) -> MultiDocument:
+    if context is None:
+        context = _ResolutionContext()
     if not allow_paths:
         allow_paths = [Path(file_path).parent.absolute()]
-    path: Path = _check_file_path(file_path, allow_paths=allow_paths)
+    path: Path = _check_file_path(file_path, allow_paths=allow_paths, fs=context.fs)
 
-    if anchor is None:
-        yaml = _build_yaml_loader()
-        with path.open("r") as f:
-            parsed_documents = list(yaml.load_all(f))
-    else:
-        yaml = _build_yaml_loader()
-        with path.open("r") as f:
-            document_streams = _collect_document_event_streams(yaml, f)
-        if not document_streams:
-            raise ValueError(f"Anchor '{anchor}' not found in the YAML document.")
-        parsed_documents = [
-            _extract_anchor_from_parser_events(yaml, document_stream, anchor)
-            for document_stream in document_streams
-        ]
+    yaml = context.yaml_loader()
+    if context.dependencies is not None:
+        context.dependencies.add_file(
+            str(path), context.fs.size(path), context.fs.mtime_ns(path)
+        )
+    stats = context.stats
+    if stats is not None:
+        file_stats = stats.file(str(path))
+        file_stats.loads += 1
+        file_stats.bytes_read += context.fs.size(path) or 0
+    with _span(stats, "parse", path.name, str(path)):
+        if anchor is None:
+            with context.fs.open(path) as f:
+                parsed_documents = list(yaml.load_all(f))
+        else:
+            with context.fs.open(path) as f:
+                document_streams = _collect_document_event_streams(yaml, f)
+            if not document_streams:
+                raise ValueError(f"Anchor '{anchor}' not found in the YAML document.")
+            with _span(stats, "anchor", anchor):
+                parsed_documents = [
+                    _extract_anchor_from_parser_events(yaml, document_stream, anchor)
+                    for document_stream in document_streams
+                ]
 
-    if not parsed_documents:
-        parsed_documents = [None]
+        _trim_doc_infos(yaml)
+        if not parsed_documents:
+            parsed_documents = [None]
 
-    parsed_documents = [
-        _recursively_attribute_location_to_references(document, path)
-        for document in parsed_documents
-    ]
+        with _span(stats, "pass", "attribute"):
+            parsed_documents = [
+                _recursively_attribute_location_to_references(
+                    document, path, context.tag_free
+                )
+                for document in parsed_documents
+            ]
     return MultiDocument(
         documents=parsed_documents,
         is_multi_document=len(parsed_documents) > 1,
@@ -453,6 +656,9 @@ def parse_yaml_with_references(
     file_path: PathLike,
     anchor: Optional[str] = None,
     allow_paths: Optional[Sequence[PathLike]] = None,
+    backend: str = "auto",
+    stats: Optional[LoadStats] = None,
+    source: Optional[Source] = None,
 ) -> Any:
     """
     Interface method for reading a YAML file into memory which contains references. References are not resolved in the
@@ -462,30 +668,50 @@ def parse_yaml_with_references(
         file_path (str | Path | os.PathLike): The path to the YAML file which contains references.
         anchor (str, optional): The anchor to use for the YAML references.
         allow_paths (list[str | Path | os.PathLike]): List of paths that are allowed to be referenced.
+        backend (str): Parser backend: "pure" for ruamel.yaml's Python parser, "c" for its libyaml-based C parser, or
+            "auto" (default) for the C parser when ruamel.yaml.clib is installed. The C parser is stricter on some
+            invalid YAML: an anchor defined twice raises a `ComposerError` with "c", while "pure" warns and lets later
+            aliases refer to the last definition.
+        stats (LoadStats, optional): Collector to record per-file timings and counters into.
+        source (Source, optional): Where to read files from, e.g. an `InMemorySource` or an `ArchiveSource`.
+            Defaults to the local filesystem.
 
     Returns:
         Any: The parsed YAML data with references maintained as `Reference`/`ReferenceAll` objects.
 
     Raises:
         FileNotFoundError: If the specified file does not exist.
-        ValueError: If the file is not a valid YAML file.
+        ValueError: If the file is not a valid YAML file, or if the parser backend is unknown.
+        ImportError: If the "c" backend is requested but ruamel.yaml.clib is not installed.
 
     """
-    parsed = _parse_yaml_documents(
-        file_path,
-        anchor=anchor,
-        allow_paths=allow_paths,
+    context = _ResolutionContext(
+        fs=_FileSystemCache(source), backend=backend, stats=stats
     )
+    with _span(stats, "load", Path(file_path).name):
+        parsed = _parse_yaml_documents(
+            file_path,
+            anchor=anchor,
+            allow_paths=allow_paths,
+            context=context,
+        )
+    if stats is not None:
+        stats.cache_hits += context.fs.hits
+        stats.cache_misses += context.fs.misses
     if not parsed.is_multi_document and len(parsed.documents) == 1:
         return parsed.documents[0]
     return parsed
 
 
-def _recursively_attribute_location_to_references(data: Any, base_path: Path):
+def _recursively_attribute_location_to_references(
+    data: Any, base_path: Path, tag_free: Optional[Mapping[int, Any]] = None
+):
+    if tag_free is not None and id(data) in tag_free:
+        return data
     if isinstance(data, MultiDocument):
         return MultiDocument(
             documents=[
-                _recursively_attribute_location_to_references(item, base_path)
+                _recursively_attribute_location_to_references(item, base_path, tag_free)
                 for item in data.documents
             ],
             is_multi_document=data.is_multi_document,
@@ -493,20 +719,20 @@ def _recursively_attribute_location_to_references(data: Any, base_path: Path):
     if isinstance(data, Flatten):
         return Flatten(
             sequence=[
-                _recursively_attribute_location_to_references(item, base_path)
+                _recursively_attribute_location_to_references(item, base_path, tag_free)
                 for item in data.sequence
             ]
         )
     if isinstance(data, Ignore):
         return Ignore(
             content=_recursively_attribute_location_to_references(
-                data.content, base_path
+                data.content, base_path, tag_free
             )
         )
     if isinstance(data, Merge):
         return Merge(
             sequence=[
-                _recursively_attribute_location_to_references(item, base_path)
+                _recursively_attribute_location_to_references(item, base_path, tag_free)
                 for item in data.sequence
             ]
         )
@@ -518,43 +744,19 @@ def _recursively_attribute_location_to_references(data: Any, base_path: Path):
             data.location = str(base_path)
     elif isinstance(data, list):
         return [
-            _recursively_attribute_location_to_references(item, base_path)
+            _recursively_attribute_location_to_references(item, base_path, tag_free)
             for item in data
         ]
     elif isinstance(data, dict):
         return {
-            key: _recursively_attribute_location_to_references(value, base_path)
+            key: _recursively_attribute_location_to_references(
+                value, base_path, tag_free
+            )
             for key, value in data.items()
         }
     return data
 
 
-def _is_path_allowed(path: Path, allow_paths: Sequence[Path]) -> bool:
-    """Check whether a resolved path is accessible given the allow_paths configuration.
-
-    Unlike `_check_file_path`, this never raises; it returns `False` for paths that
-    do not exist, are not regular files, or fall outside every entry in *allow_paths*.
-    An empty *allow_paths* sequence means "no directory restrictions" (all existing files
-    are considered allowed).
-
-    Args:
-        path: Resolved, absolute path to check.
-        allow_paths: List of allowed directory paths.
-
-    Returns:
-        True if the path is an accessible file within an allowed directory (or no
-        restrictions are in place). False otherwise.
-    """
-    if not path.exists() or not path.is_file():
-        return False
-    if not allow_paths:
-        return True
-    for allow_path in allow_paths:
-        if path.is_relative_to(allow_path):
-            return True
-    return False
-
-
 def _check_and_track_path(path: Path, visited_paths: set[Path]) -> None:
     """
     Check for circular reference and add path to visited set.
@@ -575,7 +777,10 @@ def _check_and_track_path(path: Path, visited_paths: set[Path]) -> None:
 
 
 def _recursively_resolve_references(
-    data: Any, allow_paths: Sequence[Path], visited_paths: Optional[set[Path]] = None
+    data: Any,
+    allow_paths: Sequence[Path],
+    visited_paths: Optional[set[Path]] = None,
+    context: Optional[_ResolutionContext] = None,
 ) -> Any:
     """
     Recursively resolve references in YAML data.
@@ -585,6 +790,7 @@ def _recursively_resolve_references(
         allow_paths: List of allowed paths for file access.
         visited_paths: Set of file paths that have been visited during resolution.
                       Used to detect circular references.
+        context: State shared across the resolution, such as the filesystem metadata cache.
 
     Returns:
         The resolved YAML data with all references expanded.
@@ -594,12 +800,26 @@ def _recursively_resolve_references(
     """
     if visited_paths is None:
         visited_paths = set()
+    if context is None:
+        context = _ResolutionContext()
+    if id(data) in context.tag_free:
+        return data
+    if (
+        isinstance(data, (Reference, ReferenceAll))
+        and context.max_depth is not None
+        and len(visited_paths) > context.max_depth
+    ):
+        # The chain of files being resolved, root included, is as long as the reference layer this tag would open.
+        return data
 
     if isinstance(data, MultiDocument):
         return MultiDocument(
             documents=[
                 _recursively_resolve_references(
-                    item, allow_paths=allow_paths, visited_paths=visited_paths
+                    item,
+                    allow_paths=allow_paths,
+                    visited_paths=visited_paths,
+                    context=context,
                 )
                 for item in data.documents
             ],
@@ -610,37 +830,107 @@ def _recursively_resolve_references(
         return Flatten(
             sequence=[
                 _recursively_resolve_references(
-                    item, allow_paths=allow_paths, visited_paths=visited_paths
+                    item,
+                    allow_paths=allow_paths,
+                    visited_paths=visited_paths,
+                    context=context,
                 )
                 for item in data.sequence
             ]
         )
 
     if isinstance(data, Ignore):
-        return Ignore(
-            content=_recursively_resolve_references(
-                data.content, allow_paths=allow_paths, visited_paths=visited_paths
-            )
-        )
+        # Ignored content is dropped by `prune_ignores`, so the references inside it are never followed.
+        return data
 
     if isinstance(data, Merge):
         return Merge(
-            sequence=[
-                _recursively_resolve_references(
-                    item, allow_paths=allow_paths, visited_paths=visited_paths
-                )
-                for item in data.sequence
-            ]
+            sequence=_resolve_merge_operands(
+                data.sequence,
+                set(),
+                allow_paths=allow_paths,
+                visited_paths=visited_paths,
+                context=context,
+            )
         )
 
     if isinstance(data, Reference):
-        abs_path = (Path(data.location).parent / data.path).resolve()
+        return _resolve_reference(
+            data,
+            lambda document: _recursively_resolve_references(
+                document,
+                allow_paths=allow_paths,
+                visited_paths=visited_paths,
+                context=context,
+            ),
+            allow_paths=allow_paths,
+            visited_paths=visited_paths,
+            context=context,
+        )
 
-        # Check for circular reference and track path
-        _check_and_track_path(abs_path, visited_paths)
+    elif isinstance(data, ReferenceAll):
+        return list(
+            _iter_reference_all(
+                data,
+                allow_paths=allow_paths,
+                visited_paths=visited_paths,
+                context=context,
+            )
+        )
+
+    elif isinstance(data, list):
+        return [
+            _recursively_resolve_references(
+                item,
+                allow_paths=allow_paths,
+                visited_paths=visited_paths,
+                context=context,
+            )
+            for item in data
+        ]
+    elif isinstance(data, dict):
+        return {
+            key: _recursively_resolve_references(
+                value,
+                allow_paths=allow_paths,
+                visited_paths=visited_paths,
+                context=context,
+            )
+            for key, value in data.items()
+        }
+    else:
+        return data
+
+
+def _has_unresolved_operand(sequence: Sequence[Any], into_merges: bool) -> bool:
+    """Whether a `!flatten` (or, with *into_merges*, a `!merge`) over *sequence* depends on an unresolved reference.
 
+    Only the sequence structure is inspected: references nested inside mapping operands do not affect the outcome.
+    """
+    return any(
+        isinstance(item, (Reference, ReferenceAll))
+        for item in _iter_flattened(sequence, into_merges)
+    )
+
+
+def _resolve_reference(
+    data: Reference,
+    resolve: Callable[[Any], Any],
+    allow_paths: Sequence[Path],
+    visited_paths: set[Path],
+    context: _ResolutionContext,
+) -> Any:
+    """Parse the file a `!reference` points to and return its document, resolved by *resolve*."""
+    abs_path = Path(context.fs.realpath(Path(data.location).parent / data.path))
+
+    # Check for circular reference and track path
+    _check_and_track_path(abs_path, visited_paths)
+
+    if context.stats is not None:
+        context.stats.file(str(abs_path)).references += 1
+    with _span(context.stats, "reference", data.path, str(abs_path)):
         parsed = _parse_yaml_documents(
-            abs_path, anchor=data.anchor, allow_paths=allow_paths
+            abs_path, anchor=data.anchor, allow_paths=allow_paths, context=context
         )
 
         if len(parsed.documents) != 1:
@@ -649,133 +939,287 @@ def _recursively_resolve_references(
                 f"Referenced file '{abs_path}' contains multiple YAML documents and cannot be used with !reference."
             )
 
-        resolved = _recursively_resolve_references(
-            parsed.documents[0], allow_paths=allow_paths, visited_paths=visited_paths
-        )
+        resolved = resolve(parsed.documents[0])
 
-        # Remove current path from visited set after processing
-        visited_paths.remove(abs_path)
+    # Remove current path from visited set after processing
+    visited_paths.remove(abs_path)
 
-        return resolved
+    return resolved
 
-    elif isinstance(data, ReferenceAll):
-        glob_results = Path(data.location).parent.glob(data.glob)
-        abs_paths = [path.resolve() for path in glob_results]
 
-        # Empty glob match -> silent omission, return empty list.
-        if not abs_paths:
-            return []
+def _resolve_merge_operands(
+    sequence: Sequence[Any],
+    shadowed: set[Any],
+    allow_paths: Sequence[Path],
+    visited_paths: set[Path],
+    context: _ResolutionContext,
+) -> list[Any]:
+    """
+    Resolve the operands of a `!merge` from the last to the first, leaving the values of keys that a later operand sets
+    unresolved: the merge overwrites them, so the references inside them are never followed. *shadowed* holds the keys
+    set by the operands already resolved, and is updated in place.
+    """
+    resolved = [
+        _resolve_merge_operand(
+            item,
+            shadowed,
+            allow_paths=allow_paths,
+            visited_paths=visited_paths,
+            context=context,
+        )
+        for item in reversed(sequence)
+    ]
+    resolved.reverse()
+    return resolved
 
-        # Precompute allowed paths sequence once to avoid repeated list()
-        # construction in the comprehension below.
-        allowed_paths_seq = list(allow_paths)
 
-        # Security invariant: filter out disallowed / nonexistent paths *before*
-        # opening any file.  Relative-path violations are silently omitted here;
-        # absolute-path violations are caught earlier in ReferenceAll.__init__.
-        abs_paths = [p for p in abs_paths if _is_path_allowed(p, allowed_paths_seq)]
+def _resolve_merge_operand(
+    item: Any,
+    shadowed: set[Any],
+    allow_paths: Sequence[Path],
+    visited_paths: set[Path],
+    context: _ResolutionContext,
+) -> Any:
+    if isinstance(item, dict):
+        if id(item) in context.tag_free:
+            shadowed.update(item)
+            return item
+        resolved = {
+            key: value
+            if key in shadowed
+            else _recursively_resolve_references(
+                value,
+                allow_paths=allow_paths,
+                visited_paths=visited_paths,
+                context=context,
+            )
+            for key, value in item.items()
+        }
+        _shadow_merge_keys(resolved, shadowed)
+        return resolved
+    # Lists, `!flatten` and nested `!merge` operands are flattened into the merge, in order.
+    if isinstance(item, list):
+        return _resolve_merge_operands(
+            item,
+            shadowed,
+            allow_paths=allow_paths,
+            visited_paths=visited_paths,
+            context=context,
+        )
+    if isinstance(item, (Flatten, Merge)):
+        return type(item)(
+            sequence=_resolve_merge_operands(
+                item.sequence,
+                shadowed,
+                allow_paths=allow_paths,
+                visited_paths=visited_paths,
+                context=context,
+            )
+        )
+    if isinstance(item, Reference) and not (
+        context.max_depth is not None and len(visited_paths) > context.max_depth
+    ):
+        return _resolve_reference(
+            item,
+            lambda document: _resolve_merge_operand(
+                document,
+                shadowed,
+                allow_paths=allow_paths,
+                visited_paths=visited_paths,
+                context=context,
+            ),
+            allow_paths=allow_paths,
+            visited_paths=visited_paths,
+            context=context,
+        )
+    # Anything else, such as the documents matched by a `!reference-all`, is resolved in full.
+    resolved = _recursively_resolve_references(
+        item, allow_paths=allow_paths, visited_paths=visited_paths, context=context
+    )
+    _shadow_merge_keys(resolved, shadowed)
+    return resolved
+
+
+def _shadow_merge_keys(resolved: Any, shadowed: set[Any]) -> None:
+    """Add the keys that the resolved `!merge` operand *resolved* sets to *shadowed*."""
+    if isinstance(resolved, dict):
+        # A key only overrides earlier operands if it survives pruning, and unresolved (depth-limited) references
+        # might still turn out to be ignored.
+        shadowed.update(
+            key
+            for key, value in resolved.items()
+            if not isinstance(value, (Ignore, Reference, ReferenceAll))
+        )
+    elif isinstance(resolved, list):
+        for item in resolved:
+            _shadow_merge_keys(item, shadowed)
+    elif isinstance(resolved, (Flatten, Merge)):
+        for item in resolved.sequence:
+            _shadow_merge_keys(item, shadowed)
+
+
+def _expand_glob(
+    data: ReferenceAll, allow_paths: Sequence[Path], context: _ResolutionContext
+) -> list[Path]:
+    """Return the resolved paths of the allowed files matched by the glob of a `!reference-all`, sorted."""
+    base_directory = Path(data.location).parent
+    directories = None if context.dependencies is None else []
+    with _span(context.stats, "glob", data.glob):
+        abs_paths = glob_allowed_files(
+            base_directory,
+            data.glob,
+            allow_paths,
+            fs=context.fs,
+            directories=directories,
+            directory_mtimes=None
+            if context.dependencies is None
+            else context.dependencies.directory_mtimes,
+        )
+    if context.stats is not None:
+        context.stats.glob_expansions += 1
+        context.stats.glob_matches += len(abs_paths)
+    if context.dependencies is not None:
+        context.dependencies.globs.append(
+            GlobExpansion(
+                base_directory=context.fs.realpath(base_directory),
+                glob=data.glob,
+                matches=[str(path) for path in abs_paths],
+                directories=directories,
+            )
+        )
+    return abs_paths
 
-        # All matched paths were disallowed → silent omission, return empty list.
-        if not abs_paths:
-            return []
 
-        # Sort only the allowed paths to avoid sorting entries that will be dropped.
-        abs_paths = sorted(abs_paths, key=lambda x: str(x))
-        resolved_items = []
-        for path in abs_paths:
-            # Check for circular reference and track path
-            _check_and_track_path(path, visited_paths)
+def _iter_reference_all(
+    data: ReferenceAll,
+    allow_paths: Sequence[Path],
+    visited_paths: set[Path],
+    context: _ResolutionContext,
+) -> Iterator[Any]:
+    """
+    Yield the resolved documents of the files matched by a `!reference-all`, in order, resolving each matched file only
+    when the previous one's documents have been consumed. Documents are not post-processed: ignored ones are yielded
+    as `Ignore` objects.
+    """
+    # Security invariant: the glob engine filters out disallowed / nonexistent paths *before* any file is
+    # opened, and returns the remaining resolved paths sorted by their string form. Relative-path violations
+    # are silently omitted here; absolute-path violations are caught earlier in ReferenceAll.__init__.
+    abs_paths = _expand_glob(data, allow_paths, context)
+
+    # Empty glob match, or all matched paths disallowed -> silent omission, yield nothing.
+    for path in abs_paths:
+        # Check for circular reference and track path
+        _check_and_track_path(path, visited_paths)
 
+        if context.stats is not None:
+            context.stats.file(str(path)).references += 1
+        with _span(context.stats, "reference", path.name, str(path)):
             parsed = _parse_yaml_documents(
-                path, anchor=data.anchor, allow_paths=allow_paths
+                path, anchor=data.anchor, allow_paths=allow_paths, context=context
             )
             resolved = _recursively_resolve_references(
-                parsed, allow_paths=allow_paths, visited_paths=visited_paths
+                parsed,
+                allow_paths=allow_paths,
+                visited_paths=visited_paths,
+                context=context,
             )
-            if isinstance(resolved, MultiDocument):
-                resolved_items.extend(resolved.documents)
-            else:
-                resolved_items.append(resolved)
-
-            # Remove current path from visited set after processing
-            visited_paths.remove(path)
-
-        return resolved_items
+        # Remove current path from visited set after processing
+        visited_paths.remove(path)
 
-    elif isinstance(data, list):
-        return [
-            _recursively_resolve_references(
-                item, allow_paths=allow_paths, visited_paths=visited_paths
-            )
-            for item in data
-        ]
-    elif isinstance(data, dict):
-        return {
-            key: _recursively_resolve_references(
-                value, allow_paths=allow_paths, visited_paths=visited_paths
-            )
-            for key, value in data.items()
-        }
-    else:
-        return data
+        if isinstance(resolved, MultiDocument):
+            yield from resolved.documents
+        else:
+            yield resolved
 
 
-def flatten_sequences(data: Any) -> Any:
+def flatten_sequences(data: Any, tag_free: Optional[Mapping[int, Any]] = None) -> Any:
     """
     Given an object which may contain Flatten(...) objects which was parsed from a YAML document containing !flatten
     tags, return the object without any Flatten(...) objects, but having flattened all sequences marked with them.
+    Containers whose `id()` is a key of *tag_free* are known to hold no tags and are returned as-is.
     """
+    if tag_free is not None and id(data) in tag_free:
+        return data
     if isinstance(data, MultiDocument):
         return MultiDocument(
-            documents=[flatten_sequences(item) for item in data.documents],
+            documents=[flatten_sequences(item, tag_free) for item in data.documents],
             is_multi_document=data.is_multi_document,
         )
     if isinstance(data, Flatten):
-        return data.flattened()
+        if _has_unresolved_operand(data.sequence, into_merges=False):
+            return Flatten(
+                sequence=[flatten_sequences(item, tag_free) for item in data.sequence]
+            )
+        # Flattened items can be mappings or merges that hold further !flatten tags of their own.
+        return [
+            flatten_sequences(item, tag_free) for item in _iter_flattened(data.sequence)
+        ]
     if isinstance(data, Merge):
         # Recursively flatten sequences in Merge objects as well
-        return Merge(sequence=[flatten_sequences(item) for item in data.sequence])
+        return Merge(
+            sequence=[flatten_sequences(item, tag_free) for item in data.sequence]
+        )
     if isinstance(data, list):
-        return [flatten_sequences(item) for item in data]
+        return [flatten_sequences(item, tag_free) for item in data]
     elif isinstance(data, dict):
-        return {key: flatten_sequences(value) for key, value in data.items()}
+        return {key: flatten_sequences(value, tag_free) for key, value in data.items()}
     else:
         return data
 
 
-def merge_mappings(data: Any) -> Any:
+def merge_mappings(data: Any, tag_free: Optional[Mapping[int, Any]] = None) -> Any:
     """
     Given an object which may contain Merge(...) objects which was parsed from a YAML document containing !merge
     tags, return the object without any Merge(...) objects, but having merged all mappings marked with them.
+    Containers whose `id()` is a key of *tag_free* are known to hold no tags and are returned as-is.
     """
+    if tag_free is not None and id(data) in tag_free:
+        return data
     if isinstance(data, MultiDocument):
         return MultiDocument(
-            documents=[merge_mappings(item) for item in data.documents],
+            documents=[merge_mappings(item, tag_free) for item in data.documents],
             is_multi_document=data.is_multi_document,
         )
     if isinstance(data, Merge):
-        return merge_mappings(data.merged())
+        if _has_unresolved_operand(data.sequence, into_merges=True):
+            return Merge(
+                sequence=[merge_mappings(item, tag_free) for item in data.sequence]
+            )
+        # The merged dict is new, so its values are processed in place instead of copying it once more.
+        merged = data.merged()
+        for key, value in merged.items():
+            if isinstance(value, (dict, list, Merge, Flatten)):
+                merged[key] = merge_mappings(value, tag_free)
+        return merged
+    if isinstance(data, Flatten):
+        # Only left by `flatten_sequences` when one of its operands is an unresolved reference.
+        return Flatten(
+            sequence=[merge_mappings(item, tag_free) for item in data.sequence]
+        )
     if isinstance(data, list):
-        return [merge_mappings(item) for item in data]
+        return [merge_mappings(item, tag_free) for item in data]
     elif isinstance(data, dict):
-        return {key: merge_mappings(value) for key, value in data.items()}
+        return {key: merge_mappings(value, tag_free) for key, value in data.items()}
     else:
         return data
 
 
-def prune_ignores(data: Any) -> Any:
+def prune_ignores(data: Any, tag_free: Optional[Mapping[int, Any]] = None) -> Any:
     """
     Given an object which may contain Ignore(...) objects which was parsed from a YAML document containing !ignore
     tags, return the object with all Ignore(...) objects removed. If an Ignore(...) object is found in a list, it is
     removed from the list. If an Ignore(...) object is found as a value in a dict, the key-value pair is removed from
     the dict. If an Ignore(...) object is found as a value which is not in a list or dict, it is replaced with None.
+    Containers whose `id()` is a key of *tag_free* are known to hold no tags and are returned as-is.
     """
+    if tag_free is not None and id(data) in tag_free:
+        return data
     if isinstance(data, MultiDocument):
         if not data.is_multi_document:
             if not data.documents:
                 return MultiDocument(documents=[None], is_multi_document=False)
             return MultiDocument(
-                documents=[prune_ignores(data.documents[0])],
+                documents=[prune_ignores(data.documents[0], tag_free)],
                 is_multi_document=False,
             )
 
@@ -786,7 +1230,7 @@ def prune_ignores(data: Any) -> Any:
             # so that document count and ordering remain stable.
             if isinstance(item, Ignore):
                 continue
-            pruned_item = prune_ignores(item)
+            pruned_item = prune_ignores(item, tag_free)
             pruned_documents.append(pruned_item)
         return MultiDocument(documents=pruned_documents, is_multi_document=True)
     if isinstance(data, Ignore):
@@ -794,7 +1238,7 @@ def prune_ignores(data: Any) -> Any:
     if isinstance(data, Flatten):
         return Flatten(
             sequence=[
-                prune_ignores(item)
+                prune_ignores(item, tag_free)
                 for item in data.sequence
                 if not isinstance(item, Ignore)
             ]
@@ -802,16 +1246,20 @@ def prune_ignores(data: Any) -> Any:
     if isinstance(data, Merge):
         return Merge(
             sequence=[
-                prune_ignores(item)
+                prune_ignores(item, tag_free)
                 for item in data.sequence
                 if not isinstance(item, Ignore)
             ]
         )
     if isinstance(data, list):
-        return [prune_ignores(item) for item in data if not isinstance(item, Ignore)]
+        return [
+            prune_ignores(item, tag_free)
+            for item in data
+            if not isinstance(item, Ignore)
+        ]
     elif isinstance(data, dict):
         return {
-            key: prune_ignores(value)
+            key: prune_ignores(value, tag_free)
             for key, value in data.items()
             if not isinstance(value, Ignore)
         }
@@ -819,8 +1267,262 @@ def prune_ignores(data: Any) -> Any:
         return data
 
 
+_IGNORED = object()
+
+
+def _shallow_resolve(
+    value: Any,
+    chain: frozenset[Path],
+    allow_paths: Sequence[Path],
+    context: _ResolutionContext,
+) -> tuple[Any, frozenset[Path]]:
+    """Follow the `!reference` tags at the root of *value*, parsing only the referenced files themselves.
+
+    Returns:
+        tuple[Any, frozenset[Path]]: The first value which is not a `Reference`, and the reference chain leading to it.
+    """
+    while isinstance(value, Reference):
+        abs_path = Path(context.fs.realpath(Path(value.location).parent / value.path))
+        _check_and_track_path(abs_path, set(chain))
+        with _span(context.stats, "reference", value.path, str(abs_path)):
+            parsed = _parse_yaml_documents(
+                abs_path, anchor=value.anchor, allow_paths=allow_paths, context=context
+            )
+        if len(parsed.documents) != 1:
+            raise ValueError(
+                f"Referenced file '{abs_path}' contains multiple YAML documents and cannot be used with !reference."
+            )
+        value, chain = parsed.documents[0], chain | {abs_path}
+    return value, chain
+
+
+def _lazy_value(
+    value: Any,
+    chain: frozenset[Path],
+    allow_paths: Sequence[Path],
+    context: _ResolutionContext,
+) -> Any:
+    """Turn an already shallowly-resolved value into what `load_yaml_with_references(lazy=True)` exposes for it."""
+    if isinstance(value, Ignore):
+        return _IGNORED
+    if id(value) in context.tag_free:
+        return value
+    if isinstance(value, dict):
+        return LazyMapping(value, chain, allow_paths, context)
+    if isinstance(value, list):
+        return LazySequence([(item, chain) for item in value], allow_paths, context)
+    if isinstance(value, ReferenceAll):
+        abs_paths = _expand_glob(value, allow_paths, context)
+        items = []
+        for path in abs_paths:
+            _check_and_track_path(path, set(chain))
+            with _span(context.stats, "reference", path.name, str(path)):
+                parsed = _parse_yaml_documents(
+                    path, anchor=value.anchor, allow_paths=allow_paths, context=context
+                )
+            items.extend((document, chain | {path}) for document in parsed.documents)
+        return LazySequence(items, allow_paths, context)
+    if isinstance(value, (Flatten, Merge)):
+        # Flattening and merging need every operand, so the whole tagged subtree is resolved at once.
+        resolved = _recursively_resolve_references(
+            value, allow_paths=allow_paths, visited_paths=set(chain), context=context
+        )
+        pruned = prune_ignores(resolved, context.tag_free)
+        flattened = flatten_sequences(pruned, context.tag_free)
+        return merge_mappings(flattened, context.tag_free)
+    return value
+
+
+def _materialize(value: Any) -> Any:
+    if isinstance(value, (LazyMapping, LazySequence)):
+        return value.materialize()
+    return value
+
+
+class LazyMapping(abc.Mapping):
+    """Read-only mapping returned by `load_yaml_with_references(lazy=True)`, resolving its values on access.
+
+    A value's references are followed, and `!ignore`/`!flatten`/`!merge` applied, the first time it is read; the
+    result is memoized. Listing the keys only parses the files referenced directly by the values, to find out which of
+    them are ignored. Values without composition tags are plain `dict`/`list` objects.
+    """
+
+    def __init__(
+        self,
+        data: dict,
+        chain: frozenset[Path],
+        allow_paths: Sequence[Path],
+        context: _ResolutionContext,
+    ):
+        self._data = data
+        self._chain = chain
+        self._allow_paths = allow_paths
+        self._context = context
+        self._shallow: dict[Any, tuple[Any, frozenset[Path]]] = {}
+        self._values: dict[Any, Any] = {}
+
+    def __repr__(self):
+        return f"LazyMapping({self._data})"
+
+    def _shallow_value(self, key: Any) -> tuple[Any, frozenset[Path]]:
+        try:
+            return self._shallow[key]
+        except KeyError:
+            shallow = self._shallow[key] = _shallow_resolve(
+                self._data[key], self._chain, self._allow_paths, self._context
+            )
+            return shallow
+
+    def __getitem__(self, key: Any) -> Any:
+        try:
+            value = self._values[key]
+        except KeyError:
+            value = self._values[key] = _lazy_value(
+                *self._shallow_value(key), self._allow_paths, self._context
+            )
+        if value is _IGNORED:
+            raise KeyError(key)
+        return value
+
+    def __iter__(self):
+        for key in self._data:
+            if not isinstance(self._shallow_value(key)[0], Ignore):
+                yield key
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+    def materialize(self) -> dict:
+        """Resolve every value and return the result as a plain `dict`, as `load_yaml_with_references` would."""
+        return {key: _materialize(self[key]) for key in self}
+
+
+class LazySequence(abc.Sequence):
+    """Read-only sequence returned by `load_yaml_with_references(lazy=True)`, resolving its items on access.
+
+    Items behave like the values of `LazyMapping`. Since ignored items are dropped, indexing parses the files that the
+    items reference directly, but does not resolve anything below them.
+    """
+
+    def __init__(
+        self,
+        items: list[tuple[Any, frozenset[Path]]],
+        allow_paths: Sequence[Path],
+        context: _ResolutionContext,
+    ):
+        self._items = items
+        self._allow_paths = allow_paths
+        self._context = context
+        self._shallow: Optional[list[tuple[Any, frozenset[Path]]]] = None
+        self._values: dict[int, Any] = {}
+
+    def __repr__(self):
+        return f"LazySequence({[item for item, _ in self._items]})"
+
+    def _shallow_items(self) -> list[tuple[Any, frozenset[Path]]]:
+        if self._shallow is None:
+            shallow = (
+                _shallow_resolve(item, chain, self._allow_paths, self._context)
+                for item, chain in self._items
+            )
+            self._shallow = [
+                entry for entry in shallow if not isinstance(entry[0], Ignore)
+            ]
+        return self._shallow
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        entries = self._shallow_items()
+        if index < 0:
+            index += len(entries)
+        if not 0 <= index < len(entries):
+            raise IndexError("LazySequence index out of range")
+        try:
+            return self._values[index]
+        except KeyError:
+            value = self._values[index] = _lazy_value(
+                *entries[index], self._allow_paths, self._context
+            )
+            return value
+
+    def __len__(self) -> int:
+        return len(self._shallow_items())
+
+    def __eq__(self, other):
+        if isinstance(other, (LazySequence, list, tuple)):
+            return list(self) == list(other)
+        return NotImplemented
+
+    def materialize(self) -> list:
+        """Resolve every item and return the result as a plain `list`, as `load_yaml_with_references` would."""
+        return [_materialize(item) for item in self]
+
+
+def _select(value: Any, pointer: str) -> Any:
+    """Walk *value* along a JSON-pointer-style path such as "services/3/database" (the leading "/" is optional).
+
+    Tokens are unescaped as in JSON pointers ("~1" for "/", "~0" for "~"). Mapping keys are matched as strings first,
+    then as integers; sequence items are addressed by their zero-based index.
+
+    Raises:
+        KeyError: If a token does not address an existing key or item.
+    """
+    if pointer.startswith("/"):
+        pointer = pointer[1:]
+    if not pointer:
+        return value
+    walked = []
+    for token in pointer.split("/"):
+        token = token.replace("~1", "/").replace("~0", "~")
+        walked.append(token)
+        if isinstance(value, abc.Mapping):
+            if token in value:
+                value = value[token]
+                continue
+            if token.lstrip("-").isdigit() and int(token) in value:
+                value = value[int(token)]
+                continue
+        elif isinstance(value, abc.Sequence) and not isinstance(value, str):
+            if token.isdigit() and int(token) < len(value):
+                value = value[int(token)]
+                continue
+        raise KeyError(
+            f"Selected path '{pointer}' not found: no item '{'/'.join(walked)}'."
+        )
+    return value
+
+
+def _lazy_root(
+    parsed: MultiDocument,
+    path: Path,
+    allow_paths: Sequence[Path],
+    context: _ResolutionContext,
+) -> Any:
+    chain = frozenset({path})
+    if parsed.is_multi_document:
+        return LazySequence(
+            [(document, chain) for document in parsed.documents], allow_paths, context
+        )
+    value = _lazy_value(
+        *_shallow_resolve(parsed.documents[0], chain, allow_paths, context),
+        allow_paths,
+        context,
+    )
+    return None if value is _IGNORED else value
+
+
 def load_yaml_with_references(
-    file_path: PathLike, allow_paths: Sequence[PathLike] = []
+    file_path: PathLike,
+    allow_paths: Sequence[PathLike] = [],
+    backend: str = "auto",
+    stats: Optional[LoadStats] = None,
+    lazy: bool = False,
+    select: Optional[str] = None,
+    max_depth: Optional[int] = None,
+    stream: bool = False,
+    dependencies: Optional[LoadDependencies] = None,
+    source: Optional[Source] = None,
 ) -> Any:
     """
     Interface method for reading a YAML file into memory which contains references. References are resolved recursively
@@ -829,6 +1531,30 @@ def load_yaml_with_references(
     Args:
         file_path (str | Path | os.PathLike): The path to the YAML file which contains references.
         allow_paths (list[str | Path | os.PathLike]): List of paths to allow references from.
+        backend (str): Parser backend: "pure" for ruamel.yaml's Python parser, "c" for its libyaml-based C parser, or
+            "auto" (default) for the C parser when ruamel.yaml.clib is installed. The C parser is stricter on some
+            invalid YAML: an anchor defined twice raises a `ComposerError` with "c", while "pure" warns and lets later
+            aliases refer to the last definition.
+        stats (LoadStats, optional): Collector to record per-file timings, per-pass timings, glob matches and cache
+            hits and misses into.
+        lazy (bool): If True, return `LazyMapping`/`LazySequence` proxies which only resolve the values that are
+            actually read. Cycle detection and `allow_paths` apply on access, so errors surface there. Call
+            `materialize()` on a proxy to resolve everything.
+        select (str, optional): JSON-pointer-style path of the only node to return, e.g. "services/3/database".
+            Only the files on the path to that node and the references inside it are resolved; sibling branches stay
+            unparsed unless `!merge`/`!flatten` needs them, or a sequence needs their roots to number its items.
+        max_depth (int, optional): Number of reference layers to resolve: 0 resolves none, 1 only the references in
+            `file_path` itself, and so on. Deeper `!reference`/`!reference-all` tags are returned as
+            `Reference`/`ReferenceAll` objects with their `location` set, and a `!flatten` or `!merge` is only applied
+            once none of its operands is such an object. Cannot be combined with `lazy` or `select`.
+        stream (bool): If True, a root-level list is returned as a generator which resolves its items one at a time:
+            the documents of a multi-document file, or the documents matched by a root `!reference-all`, in the usual
+            order and without the ignored ones. Errors in later items surface while iterating. Has no effect together
+            with `lazy` or `select`.
+        dependencies (LoadDependencies, optional): Collector to record every file read and every `!reference-all`
+            glob expanded into, e.g. to write a Makefile-format depfile with `LoadDependencies.write_depfile`.
+        source (Source, optional): Where to read files from, e.g. an `InMemorySource` or an `ArchiveSource`.
+            Defaults to the local filesystem.
 
     Returns:
         Any: The parsed YAML data with references recursively resolved.
@@ -838,31 +1564,311 @@ def load_yaml_with_references(
         PermissionError: If a referenced file is not readable or not in an allowed path.
         ValueError: If a referenced file is not a valid YAML file.
         ValueError: If a circular reference is detected.
+        ValueError: If the parser backend is unknown.
+        ValueError: If `max_depth` is negative, or combined with `lazy` or `select`.
+        ImportError: If the "c" backend is requested but ruamel.yaml.clib is not installed.
+        KeyError: If `select` does not address an existing node.
+
+    """
+    if max_depth is not None and (lazy or select is not None):
+        raise ValueError("max_depth cannot be combined with lazy or select.")
+    context = _ResolutionContext(
+        fs=_FileSystemCache(source),
+        backend=backend,
+        stats=stats,
+        max_depth=max_depth,
+        dependencies=dependencies,
+    )
+    with _span(stats, "load", Path(file_path).name):
+        try:
+            return _load_yaml_with_context(
+                file_path, allow_paths, context, lazy=lazy, select=select, stream=stream
+            )
+        finally:
+            if stats is not None:
+                stats.cache_hits += context.fs.hits
+                stats.cache_misses += context.fs.misses
+
+
+def _virtual_root(
+    text: Union[str, bytes, IO],
+    base_path: PathLike,
+    name: str,
+    source: Optional[Source] = None,
+) -> tuple[str, Source]:
+    """Return the path and the source to load the root document *text* from, as if it were the file *name* inside
+    *base_path*."""
+    if not isinstance(text, (str, bytes)):
+        text = text.read()
+    if isinstance(text, bytes):
+        text = text.decode("utf-8")
+    if source is None:
+        source = LocalSource()
+    path = os.path.join(source.realpath(os.path.abspath(base_path)), name)
+    return path, _VirtualFileSource(source, path, text)
+
+
+def loads_yaml_with_references(
+    text: Union[str, bytes, IO],
+    base_path: PathLike = ".",
+    name: str = "<string>",
+    allow_paths: Sequence[PathLike] = [],
+    backend: str = "auto",
+    stats: Optional[LoadStats] = None,
+    lazy: bool = False,
+    select: Optional[str] = None,
+    max_depth: Optional[int] = None,
+    stream: bool = False,
+    dependencies: Optional[LoadDependencies] = None,
+    source: Optional[Source] = None,
+) -> Any:
+    """
+    Like `load_yaml_with_references`, for a root YAML document held in a string or read from a stream instead of a
+    file. Nothing is written to disk.
+
+    The document behaves as if it were the file *name* inside the directory *base_path*: its relative references are
+    resolved against *base_path*, which is allowed like the directory of a root file, a reference back to the virtual
+    file is a circular reference, and a `!reference-all` glob over *base_path* matches it like any other file.
+
+    Args:
+        text (str | bytes | IO): The root YAML document, or a text or binary stream to read it from. Bytes are decoded
+            as UTF-8.
+        base_path (str | Path | os.PathLike): Directory the document virtually lives in. Defaults to the current
+            directory.
+        name (str): File name of the document inside *base_path*, as shown in error messages. Defaults to "<string>".
+        allow_paths, backend, stats, lazy, select, max_depth, stream, dependencies, source: As for
+            `load_yaml_with_references`. The document is recorded in `dependencies` under its virtual path.
+
+    Returns:
+        Any: The parsed YAML data with references recursively resolved.
 
+    Raises:
+        FileNotFoundError: If a referenced file does not exist.
+        PermissionError: If a referenced file is not readable or not in an allowed path.
+        ValueError: If the document or a referenced file is not valid YAML, or a circular reference is detected.
     """
+    path, source = _virtual_root(text, base_path, name, source)
+    return load_yaml_with_references(
+        path,
+        allow_paths=allow_paths,
+        backend=backend,
+        stats=stats,
+        lazy=lazy,
+        select=select,
+        max_depth=max_depth,
+        stream=stream,
+        dependencies=dependencies,
+        source=source,
+    )
+
+
+def _root_allow_paths(
+    file_path: PathLike, allow_paths: Sequence[PathLike]
+) -> _AllowPathMatcher:
+    """Return the allow-list of a load from *file_path*: *allow_paths* plus the directory of the root file."""
     if allow_paths:
         allow_paths = [Path(path).absolute() for path in allow_paths]
     else:
         allow_paths = []
     allow_paths += [Path(file_path).parent.absolute()]
-    path = _check_file_path(file_path, allow_paths=allow_paths)
-    parsed = _parse_yaml_documents(path, allow_paths=allow_paths)
+    # Compile the allow-list once; every path check of this load reuses the same prefix trie.
+    return _AllowPathMatcher(allow_paths)
 
+
+def _resolve_root(
+    data: Any, path: Path, allow_paths: Sequence[Path], context: _ResolutionContext
+) -> Any:
+    """Run the resolution pass over *data*, parsed from the root file *path*."""
     # Initialize visited paths with the root file to detect self-references
-    visited_paths = {path.resolve()}
+    visited_paths = {path}
+
+    with _span(context.stats, "pass", "resolve"):
+        return _recursively_resolve_references(
+            data,
+            allow_paths=allow_paths,
+            visited_paths=visited_paths,
+            context=context,
+        )
 
-    resolved = _recursively_resolve_references(
-        parsed,
-        allow_paths=allow_paths,  # type: ignore
-        visited_paths=visited_paths,
-    )
+
+def _post_process(resolved: Any, context: _ResolutionContext) -> Any:
+    """Run the prune, flatten and merge passes over fully resolved data."""
     # Prune ignores after full resolution so that Ignore wrappers introduced by
     # referenced files propagate up to their parent containers, allowing keys and
     # list items whose resolved value is !ignore to be dropped entirely rather
     # than replaced with null.
-    pruned = prune_ignores(resolved)
-    flattened = flatten_sequences(pruned)
-    merged = merge_mappings(flattened)
+    with _span(context.stats, "pass", "prune"):
+        pruned = prune_ignores(resolved, context.tag_free)
+    with _span(context.stats, "pass", "flatten"):
+        flattened = flatten_sequences(pruned, context.tag_free)
+    with _span(context.stats, "pass", "merge"):
+        return merge_mappings(flattened, context.tag_free)
+
+
+_EXHAUSTED = object()
+
+
+@contextmanager
+def _load_step(context: _ResolutionContext, name: str) -> Iterator[None]:
+    """Account for one step of a streaming load, which runs after the call that started it returned."""
+    hits, misses = context.fs.hits, context.fs.misses
+    try:
+        with _span(context.stats, "load", name):
+            yield
+    finally:
+        if context.stats is not None:
+            context.stats.cache_hits += context.fs.hits - hits
+            context.stats.cache_misses += context.fs.misses - misses
+
+
+def _iter_root_documents(path: Path, context: _ResolutionContext) -> Iterator[Any]:
+    """Yield the documents of the root file *path* one at a time, with the location of their references set."""
+    if context.dependencies is not None:
+        context.dependencies.add_file(
+            str(path), context.fs.size(path), context.fs.mtime_ns(path)
+        )
+    stats = context.stats
+    if stats is not None:
+        file_stats = stats.file(str(path))
+        file_stats.loads += 1
+        file_stats.bytes_read += context.fs.size(path) or 0
+
+    # The pure parser keeps its state on the `YAML` object, so the root stream, suspended between documents, gets its
+    # own loader rather than the one that parses referenced files.
+    root_yaml = _build_yaml_loader(
+        backend=context.backend, tag_free=context.tag_free, stats=stats
+    )
+    with context.fs.open(path) as f:
+        documents = root_yaml.load_all(f)
+        while True:
+            with _span(stats, "parse", path.name, str(path)):
+                document = next(documents, _EXHAUSTED)
+                if document is _EXHAUSTED:
+                    return
+                with _span(stats, "pass", "attribute"):
+                    document = _recursively_attribute_location_to_references(
+                        document, path, context.tag_free
+                    )
+            _trim_doc_infos(root_yaml)
+            yield document
+
+
+def _resolve_each(
+    documents: Iterator[Any],
+    path: Path,
+    allow_paths: Sequence[Path],
+    context: _ResolutionContext,
+) -> Iterator[Any]:
+    for document in documents:
+        yield _recursively_resolve_references(
+            document,
+            allow_paths=allow_paths,
+            visited_paths={path},
+            context=context,
+        )
+
+
+def _read_ahead(
+    documents: Iterator[Any], context: _ResolutionContext
+) -> tuple[Any, Any, dict[int, Any]]:
+    """Read the first two documents of a root file, to tell a single document from a stream of them.
+
+    Returns:
+        tuple[Any, Any, dict[int, Any]]: The two documents, either of which may be `_EXHAUSTED`, and the entries of the
+        tag-free registry recorded while parsing the second one.
+    """
+    first = next(documents, _EXHAUSTED)
+    registered = len(context.tag_free)
+    second = next(documents, _EXHAUSTED)
+    # The registry is a dict, so the entries of the second document are the last ones inserted.
+    return (
+        first,
+        second,
+        dict(itertools.islice(context.tag_free.items(), registered, None)),
+    )
+
+
+def _stream_resolved(
+    items: Iterator[Any],
+    name: str,
+    context: _ResolutionContext,
+    read_ahead: Optional[dict[int, Any]] = None,
+) -> Iterator[Any]:
+    """Post-process and yield the resolved values produced by *items* one at a time, skipping ignored ones.
+
+    *read_ahead* holds the tag-free registry entries of a document already parsed for the second item, which are kept
+    when the entries of the first item are dropped.
+    """
+    while True:
+        with _load_step(context, name):
+            with _span(context.stats, "pass", "resolve"):
+                resolved = next(items, _EXHAUSTED)
+            if resolved is _EXHAUSTED:
+                return
+            ignored = isinstance(resolved, Ignore)
+            if not ignored:
+                value = _post_process(resolved, context)
+            # The registry pins every container it records; drop this value's entries before resolving the next one.
+            context.tag_free.clear()
+            if read_ahead:
+                context.tag_free.update(read_ahead)
+                read_ahead = None
+        if not ignored:
+            yield value
+
+
+def _stream_root(
+    path: Path, allow_paths: Sequence[Path], context: _ResolutionContext
+) -> Any:
+    """Load the root file *path* for `load_yaml_with_references(stream=True)`.
+
+    Returns:
+        Any: A generator over the documents of a multi-document file or the items of a root-level `!reference-all`;
+        the resolved document of any other file.
+    """
+    documents = _iter_root_documents(path, context)
+    first, second, read_ahead = _read_ahead(documents, context)
+    if second is not _EXHAUSTED:
+        return _stream_resolved(
+            _resolve_each(
+                itertools.chain((first, second), documents), path, allow_paths, context
+            ),
+            path.name,
+            context,
+            read_ahead,
+        )
+    if first is _EXHAUSTED:
+        return None
+    if isinstance(first, ReferenceAll):
+        items = _iter_reference_all(
+            first, allow_paths=allow_paths, visited_paths={path}, context=context
+        )
+        return _stream_resolved(items, path.name, context)
+    resolved = _resolve_root(first, path, allow_paths, context)
+    return _post_process(resolved, context)
+
+
+def _load_yaml_with_context(
+    file_path: PathLike,
+    allow_paths: Sequence[PathLike],
+    context: _ResolutionContext,
+    lazy: bool = False,
+    select: Optional[str] = None,
+    stream: bool = False,
+) -> Any:
+    allow_paths = _root_allow_paths(file_path, allow_paths)
+    path = _check_file_path(file_path, allow_paths=allow_paths, fs=context.fs)
+    if stream and not lazy and select is None:
+        return _stream_root(path, allow_paths, context)
+    parsed = _parse_yaml_documents(path, allow_paths=allow_paths, context=context)
+    if select is not None:
+        selected = _select(_lazy_root(parsed, path, allow_paths, context), select)
+        return selected if lazy else _materialize(selected)
+    if lazy:
+        return _lazy_root(parsed, path, allow_paths, context)
+
+    resolved = _resolve_root(parsed, path, allow_paths, context)
+    merged = _post_process(resolved, context)
     if isinstance(merged, MultiDocument):
         if merged.is_multi_document:
             return merged.documents
@@ -874,9 +1880,454 @@ def load_yaml_with_references(
     return merged
 
 
+def iter_yaml_with_references(
+    file_path: PathLike,
+    allow_paths: Sequence[PathLike] = [],
+    backend: str = "auto",
+    stats: Optional[LoadStats] = None,
+    dependencies: Optional[LoadDependencies] = None,
+    source: Optional[Source] = None,
+) -> Iterator[Any]:
+    """
+    Interface method for reading a multi-document YAML file which contains references, one document at a time. Each
+    document is parsed, resolved and post-processed only when the previous one has been consumed, so memory use is
+    bounded by the largest document (and the files it references) rather than by the whole file.
+
+    Documents tagged `!ignore`, directly or through a reference, are skipped; for a file of two or more documents the
+    generated values are the items of the list `load_yaml_with_references` returns. A single-document file yields its
+    one document as `load_yaml_with_references` returns it, None if it is ignored, and an empty file yields nothing.
+
+    Args:
+        file_path (str | Path | os.PathLike): The path to the YAML file which contains references.
+        allow_paths (list[str | Path | os.PathLike]): List of paths to allow references from.
+        backend (str): Parser backend: "pure" for ruamel.yaml's Python parser, "c" for its libyaml-based C parser, or
+            "auto" (default) for the C parser when ruamel.yaml.clib is installed. The C parser is stricter on some
+            invalid YAML: an anchor defined twice raises a `ComposerError` with "c", while "pure" warns and lets later
+            aliases refer to the last definition.
+        stats (LoadStats, optional): Collector to record per-file timings, per-pass timings, glob matches and cache
+            hits and misses into.
+        dependencies (LoadDependencies, optional): Collector to record every file read and every `!reference-all`
+            glob expanded into.
+        source (Source, optional): Where to read files from, e.g. an `InMemorySource` or an `ArchiveSource`.
+            Defaults to the local filesystem.
+
+    Yields:
+        Any: Each document of the file with references recursively resolved.
+
+    Raises:
+        FileNotFoundError: If the file or a referenced file does not exist.
+        PermissionError: If a referenced file is not readable or not in an allowed path.
+        ValueError: If a referenced file is not a valid YAML file, or if a circular reference is detected.
+        ValueError: If the parser backend is unknown.
+        ImportError: If the "c" backend is requested but ruamel.yaml.clib is not installed.
+
+    """
+    context = _ResolutionContext(
+        fs=_FileSystemCache(source),
+        backend=backend,
+        stats=stats,
+        dependencies=dependencies,
+    )
+    allow_paths = _root_allow_paths(file_path, allow_paths)
+    path = _check_file_path(file_path, allow_paths=allow_paths, fs=context.fs)
+    documents = _iter_root_documents(path, context)
+    with _load_step(context, path.name):
+        first, second, read_ahead = _read_ahead(documents, context)
+        if second is _EXHAUSTED and first is not _EXHAUSTED:
+            value = _post_process(
+                _resolve_root(first, path, allow_paths, context), context
+            )
+    if first is _EXHAUSTED:
+        return
+    if second is _EXHAUSTED:
+        yield value
+        return
+    yield from _stream_resolved(
+        _resolve_each(
+            itertools.chain((first, second), documents), path, allow_paths, context
+        ),
+        path.name,
+        context,
+        read_ahead,
+    )
+
+
+@dataclass
+class ValidationIssue:
+    """A problem found by `validate_yaml_references`.
+
+    Args:
+        path (str): Absolute path of the file in which the problem was found.
+        line (int, optional): 1-based line of the offending tag, or None for a problem with the file as a whole.
+        message (str): Description of the problem.
+    """
+
+    path: str
+    line: Optional[int]
+    message: str
+
+    def __str__(self):
+        location = self.path if self.line is None else f"{self.path}:{self.line}"
+        return f"{location}: {self.message}"
+
+
+def _reference_arguments(node: nodes.Node, required: str) -> tuple[str, Optional[str]]:
+    """Return the *required* argument (`path` or `glob`) and the optional anchor of a composed reference tag."""
+    if isinstance(node, nodes.ScalarNode):
+        return node.value, None
+    arguments = {}
+    if isinstance(node, nodes.MappingNode):
+        for key, value in node.value:
+            if isinstance(key, nodes.ScalarNode) and isinstance(
+                value, nodes.ScalarNode
+            ):
+                arguments[key.value] = value.value
+    if required not in arguments:
+        raise ValueError(f"{node.tag} requires a '{required}' key.")
+    return arguments[required], arguments.get("anchor")
+
+
+def _find_anchored_node(root: nodes.Node, anchor: str) -> Optional[nodes.Node]:
+    """Return the node of *root*'s document which carries *anchor*, the last one if the anchor is redefined."""
+    found = None
+    seen = set()
+    stack = [root]
+    while stack:
+        node = stack.pop()
+        if id(node) in seen:
+            continue
+        seen.add(id(node))
+        if node.anchor is not None and str(node.anchor) == anchor:
+            found = node
+        if isinstance(node, nodes.MappingNode):
+            stack.extend(
+                item for pair in reversed(node.value) for item in reversed(pair)
+            )
+        elif isinstance(node, nodes.SequenceNode):
+            stack.extend(reversed(node.value))
+    return found
+
+
+def _merge_key(node: nodes.Node) -> Any:
+    """Return what identifies the key *node* among the keys of `!merge` operands; only equal scalars are the same key."""
+    if isinstance(node, nodes.ScalarNode):
+        return node.tag, node.value
+    return id(node)
+
+
+def _merge_operand_keys(node: nodes.Node) -> set[Any]:
+    """Return the keys that the composed `!merge` operand *node* sets, like `_shadow_merge_keys` on its resolution."""
+    if node.tag in (Ignore.yaml_tag, Reference.yaml_tag, ReferenceAll.yaml_tag):
+        return set()
+    if isinstance(node, nodes.MappingNode):
+        # Keys whose value is a reference might still turn out to be ignored, so they do not count.
+        return {
+            _merge_key(key)
+            for key, value in node.value
+            if value.tag
+            not in (Ignore.yaml_tag, Reference.yaml_tag, ReferenceAll.yaml_tag)
+        }
+    if isinstance(node, nodes.SequenceNode):
+        return {key for item in node.value for key in _merge_operand_keys(item)}
+    return set()
+
+
+class _ReferenceGraphValidator:
+    """Walk the reference graph of a root file over composed nodes, collecting every problem instead of raising."""
+
+    def __init__(self, allow_paths: _AllowPathMatcher, context: _ResolutionContext):
+        self.allow_paths = allow_paths
+        self.context = context
+        self.issues: list[ValidationIssue] = []
+        # Number of documents of each validated file and anchor, and whether the anchor is in every one of them.
+        self._shapes: dict[tuple[Path, Optional[str]], Optional[tuple[int, bool]]] = {}
+        # Keys that each validated file and anchor sets when used as a `!merge` operand.
+        self._keys: dict[tuple[Path, Optional[str]], set[Any]] = {}
+        # Files and anchors already walked, with the keys shadowed when they were reached as a `!merge` operand.
+        self._walked: set[tuple[Path, Optional[str], Optional[frozenset[Any]]]] = set()
+        # Where each problem was found, so that walking a file again does not report its problems twice.
+        self._reported: set[tuple[str, Optional[int], Optional[int], str]] = set()
+        self._anchor_yaml: Optional[YAML] = None
+
+    def _report(self, path: Path, node: Optional[nodes.Node], message: str) -> None:
+        line = None if node is None else node.start_mark.line + 1
+        column = None if node is None else node.start_mark.column
+        if (str(path), line, column, message) in self._reported:
+            return
+        self._reported.add((str(path), line, column, message))
+        self.issues.append(ValidationIssue(str(path), line, message))
+
+    def _compose(self, path: Path, anchor: Optional[str]) -> list[nodes.Node]:
+        if anchor is None:
+            yaml = self.context.yaml_loader()
+        else:
+            # The C parser does not keep anchors on the nodes it composes, so anchored files are read with the pure one.
+            if self._anchor_yaml is None:
+                self._anchor_yaml = YAML(typ="safe", pure=True)
+            yaml = self._anchor_yaml
+        with self.context.fs.open(path) as f:
+            documents = list(yaml.compose_all(f))
+        _trim_doc_infos(yaml)
+        return documents
+
+    def _find(
+        self, documents: list[nodes.Node], anchor: Optional[str]
+    ) -> list[nodes.Node]:
+        if anchor is None:
+            return documents
+        found = [_find_anchored_node(document, anchor) for document in documents]
+        return [node for node in found if node is not None]
+
+    def validate_file(
+        self,
+        path: Path,
+        anchor: Optional[str],
+        chain: tuple[Path, ...],
+        origin: tuple[Path, Optional[nodes.Node]],
+        single: bool = False,
+        shadowed: Optional[frozenset[Any]] = None,
+    ) -> None:
+        """Validate the file *path*, reached from the tag *origin* through the files in *chain*.
+
+        Each file is walked once per anchor, and once more for every set of *shadowed* keys it is reached with as a
+        `!merge` operand; the problems of the tag that reached it are reported on every visit. As a file is not walked
+        again when another chain reaches it, of several circular chains through the same files only the first one found
+        is reported.
+        """
+        key = (path, anchor)
+        if key not in self._shapes:
+            self._shapes[key] = None
+            try:
+                documents = self._compose(path, anchor)
+            except (OSError, YAMLError) as err:
+                self._report(path, None, f"Failed to parse: {err}")
+                return
+            found = self._find(documents, anchor)
+            self._shapes[key] = (len(documents), len(found) == len(documents) > 0)
+            self._keys[key] = {
+                merge_key for node in found for merge_key in _merge_operand_keys(node)
+            }
+        elif self._shapes[key] is not None and (*key, shadowed) not in self._walked:
+            found = self._find(self._compose(path, anchor), anchor)
+        else:
+            found = []
+        shape = self._shapes[key]
+        if shape is None:
+            return
+        if (*key, shadowed) not in self._walked:
+            self._walked.add((*key, shadowed))
+            for node in found:
+                if shadowed is None:
+                    self._walk(node, path, (*chain, path))
+                else:
+                    self._merge_operand(
+                        node, path, (*chain, path), set(shadowed), set()
+                    )
+        count, anchored = shape
+        if single and count > 1:
+            self._report(
+                *origin,
+                f"Referenced file '{path}' contains multiple YAML documents and cannot be used with !reference.",
+            )
+        if anchor is not None and not anchored:
+            self._report(*origin, f"Anchor '{anchor}' not found in '{path}'.")
+
+    def _walk(
+        self,
+        root: nodes.Node,
+        path: Path,
+        chain: tuple[Path, ...],
+        seen: Optional[set[int]] = None,
+    ) -> None:
+        if seen is None:
+            seen = set()
+        stack = [root]
+        while stack:
+            node = stack.pop()
+            # Aliases compose to the very same node, which only needs checking once.
+            if id(node) in seen:
+                continue
+            seen.add(id(node))
+            if node.tag == Ignore.yaml_tag:
+                continue
+            if node.tag == Reference.yaml_tag:
+                self._reference(node, path, chain)
+            elif node.tag == ReferenceAll.yaml_tag:
+                self._reference_all(node, path, chain)
+            elif node.tag == Merge.yaml_tag and isinstance(node, nodes.SequenceNode):
+                self._merge_operands(node.value, path, chain, set(), seen)
+            elif isinstance(node, nodes.MappingNode):
+                stack.extend(
+                    item for pair in reversed(node.value) for item in reversed(pair)
+                )
+            elif isinstance(node, nodes.SequenceNode):
+                stack.extend(reversed(node.value))
+
+    def _merge_operands(
+        self,
+        operands: list[nodes.Node],
+        path: Path,
+        chain: tuple[Path, ...],
+        shadowed: set[Any],
+        seen: set[int],
+    ) -> None:
+        """Walk the operands of a `!merge` from the last to the first, like `_resolve_merge_operands`, skipping the values
+        of keys that a later operand sets. *shadowed* holds the keys set by the operands already walked, and is updated
+        in place.
+        """
+        for node in reversed(operands):
+            self._merge_operand(node, path, chain, shadowed, seen)
+
+    def _merge_operand(
+        self,
+        node: nodes.Node,
+        path: Path,
+        chain: tuple[Path, ...],
+        shadowed: set[Any],
+        seen: set[int],
+    ) -> None:
+        if node.tag == Reference.yaml_tag:
+            self._reference(node, path, chain, shadowed)
+        elif node.tag == ReferenceAll.yaml_tag:
+            self._reference_all(node, path, chain, shadowed)
+        elif node.tag == Ignore.yaml_tag:
+            return
+        elif isinstance(node, nodes.MappingNode):
+            for key, value in node.value:
+                self._walk(key, path, chain, seen)
+                if _merge_key(key) not in shadowed:
+                    self._walk(value, path, chain, seen)
+            shadowed.update(_merge_operand_keys(node))
+        elif isinstance(node, nodes.SequenceNode):
+            # Lists, `!flatten` and nested `!merge` operands are flattened into the merge, in order.
+            self._merge_operands(node.value, path, chain, shadowed, seen)
+
+    def _reference(
+        self,
+        node: nodes.Node,
+        path: Path,
+        chain: tuple[Path, ...],
+        shadowed: Optional[set[Any]] = None,
+    ) -> None:
+        try:
+            reference = Reference(*_reference_arguments(node, "path"))
+            target = _check_file_path(
+                path.parent / reference.path,
+                allow_paths=self.allow_paths,
+                fs=self.context.fs,
+            )
+        except (FileNotFoundError, PermissionError, ValueError) as err:
+            self._report(path, node, str(err))
+            return
+        if shadowed is None:
+            self._follow(target, reference.anchor, chain, (path, node), single=True)
+            return
+        self._follow(
+            target,
+            reference.anchor,
+            chain,
+            (path, node),
+            single=True,
+            shadowed=frozenset(shadowed),
+        )
+        shadowed.update(self._keys.get((target, reference.anchor), ()))
+
+    def _reference_all(
+        self,
+        node: nodes.Node,
+        path: Path,
+        chain: tuple[Path, ...],
+        shadowed: Optional[set[Any]] = None,
+    ) -> None:
+        try:
+            reference = ReferenceAll(*_reference_arguments(node, "glob"))
+            targets = glob_allowed_files(
+                path.parent, reference.glob, self.allow_paths, fs=self.context.fs
+            )
+        except ValueError as err:
+            self._report(path, node, str(err))
+            return
+        for target in targets:
+            self._follow(target, reference.anchor, chain, (path, node))
+        # The documents a `!reference-all` operand matches are resolved in full, and set their keys afterwards.
+        if shadowed is not None:
+            for target in targets:
+                shadowed.update(self._keys.get((target, reference.anchor), ()))
+
+    def _follow(
+        self,
+        target: Path,
+        anchor: Optional[str],
+        chain: tuple[Path, ...],
+        origin: tuple[Path, nodes.Node],
+        single: bool = False,
+        shadowed: Optional[frozenset[Any]] = None,
+    ) -> None:
+        if target in chain:
+            cycle = " -> ".join(
+                str(path) for path in (*chain[chain.index(target) :], target)
+            )
+            self._report(*origin, f"Circular reference detected: {cycle}")
+            return
+        self.validate_file(
+            target, anchor, chain, origin, single=single, shadowed=shadowed
+        )
+
+
+def validate_yaml_references(
+    file_path: PathLike,
+    allow_paths: Sequence[PathLike] = [],
+    backend: str = "auto",
+    source: Optional[Source] = None,
+) -> list[ValidationIssue]:
+    """
+    Check that a YAML file with references would load, without loading it. Every file of the reference graph is only
+    composed into YAML nodes, never constructed into Python objects, and the graph is walked to the end so that all of
+    its problems are reported at once: missing files and files outside `allow_paths`, absolute paths and globs,
+    illegal glob patterns, missing `path`/`glob` arguments, missing anchors, multi-document `!reference` targets,
+    circular references and YAML syntax errors.
+
+    Content under `!ignore` is skipped, as it is when loading, and so are the `!merge` values that a later operand
+    overrides, which are never resolved. The structure of `!flatten` and `!merge` operands is not checked. Of several
+    circular chains through the same files, only the first one found is reported; the others show up once it is fixed.
+
+    Args:
+        file_path (str | Path | os.PathLike): The path to the YAML file which contains references.
+        allow_paths (list[str | Path | os.PathLike]): List of paths to allow references from.
+        backend (str): Parser backend: "pure" for ruamel.yaml's Python parser, "c" for its libyaml-based C parser, or
+            "auto" (default) for the C parser when ruamel.yaml.clib is installed. The C parser is stricter on some
+            invalid YAML: an anchor defined twice raises a `ComposerError` with "c", while "pure" warns and lets later
+            aliases refer to the last definition.
+        source (Source, optional): Where to read files from, e.g. an `InMemorySource` or an `ArchiveSource`.
+            Defaults to the local filesystem.
+
+    Returns:
+        list[ValidationIssue]: The problems found, in the order they were found; empty if the file would load.
+
+    Raises:
+        ValueError: If the parser backend is unknown.
+        ImportError: If the "c" backend is requested but ruamel.yaml.clib is not installed.
+
+    """
+    context = _ResolutionContext(fs=_FileSystemCache(source), backend=backend)
+    allow_paths = _root_allow_paths(file_path, allow_paths)
+    try:
+        path = _check_file_path(file_path, allow_paths=allow_paths, fs=context.fs)
+    except (FileNotFoundError, PermissionError, ValueError) as err:
+        return [ValidationIssue(str(Path(file_path).absolute()), None, str(err))]
+    validator = _ReferenceGraphValidator(allow_paths, context)
+    validator.validate_file(path, None, (), (path, None))
+    return validator.issues
+
+
 __all__ = [
     "parse_yaml_with_references",
     "load_yaml_with_references",
+    "loads_yaml_with_references",
+    "iter_yaml_with_references",
+    "validate_yaml_references",
+    "ValidationIssue",
+    "digest_resolved",
     "flatten_sequences",
     "Flatten",
     "merge_mappings",
@@ -884,4 +2335,16 @@ __all__ = [
     "MultiDocument",
     "prune_ignores",
     "Ignore",
+    "PARSER_BACKENDS",
+    "LoadStats",
+    "FileStats",
+    "LoadDependencies",
+    "GlobExpansion",
+    "LazyMapping",
+    "LazySequence",
+    "Source",
+    "SourceStat",
+    "LocalSource",
+    "InMemorySource",
+    "ArchiveSource",
 ]
@@ -0,0 +1,449 @@
+import fnmatch
+import os
+import re
+import stat
+import sys
+from collections.abc import Callable, Sequence
+from functools import lru_cache
+from pathlib import Path, PurePath
+from typing import IO, Any, NamedTuple, Optional, Union
+
+from yaml_reference.sources import LocalSource, Source, SourceEntry
+
+PathLike = Union[str, os.PathLike]
+
+# Mirror the platform-dependent behaviour of `Path.glob` across the supported Python versions.
+_IGNORE_CASE = os.name == "nt"
+_TRAILING_RECURSIVE_MATCHES_FILES = sys.version_info >= (3, 13)
+_RECURSIVE_MUST_BE_WHOLE_COMPONENT = sys.version_info < (3, 13)
+_WILDCARD_CHARS = frozenset("*?[")
+
+_ALLOWED = 0
+_PARTIAL = 1
+_DENIED = 2
+
+
+class _GlobSegment(NamedTuple):
+    kind: str  # "literal", "wildcard" or "recursive"
+    name: str
+    match: Optional[Callable[[str], object]] = None
+
+
+class _CompiledGlob(NamedTuple):
+    segments: tuple[_GlobSegment, ...]
+    directories_only: bool
+
+
+@lru_cache(maxsize=256)
+def _compile_glob(pattern: str) -> _CompiledGlob:
+    """Split a relative glob pattern into per-component matchers, following the parsing rules of `Path.glob`.
+
+    Empty and `.` components are dropped, `**` is only special as a whole component, and a trailing separator restricts
+    the matches to directories.
+
+    Args:
+        pattern (str): Relative glob pattern, as written in a `!reference-all` tag.
+
+    Returns:
+        _CompiledGlob: The compiled pattern.
+
+    Raises:
+        ValueError: If the pattern is empty or uses `**` inside a larger component.
+    """
+    if not pattern:
+        raise ValueError(f"Unacceptable pattern: {pattern!r}")
+    parts = [part for part in PurePath(pattern).parts if part != "."]
+    if not parts:
+        raise ValueError(f"Unacceptable pattern: {pattern!r}")
+    flags = re.IGNORECASE if _IGNORE_CASE else 0
+    segments = []
+    for part in parts:
+        if part == "**":
+            segments.append(_GlobSegment("recursive", part))
+        elif "**" in part and _RECURSIVE_MUST_BE_WHOLE_COMPONENT:
+            raise ValueError(
+                "Invalid pattern: '**' can only be an entire path component"
+            )
+        elif _WILDCARD_CHARS.intersection(part):
+            regex = re.compile(fnmatch.translate(part), flags)
+            segments.append(_GlobSegment("wildcard", part, regex.match))
+        else:
+            segments.append(_GlobSegment("literal", part))
+    directories_only = pattern[-1] == os.sep or (
+        os.altsep is not None and pattern[-1] == os.altsep
+    )
+    return _CompiledGlob(tuple(segments), directories_only)
+
+
+_TERMINAL = object()
+
+
+def _path_parts(path: str) -> list[str]:
+    # Split a normalized path string into components comparable with `PurePath.parts` prefixes.
+    path = os.path.normcase(path)
+    if os.altsep:
+        path = path.replace(os.altsep, os.sep)
+    return path.rstrip(os.sep).split(os.sep)
+
+
+class _AllowPathMatcher(Sequence[Path]):
+    """Allow-list of directory roots, compiled once into a prefix trie over path components.
+
+    Answers "is this path inside an allowed root?" in time proportional to the depth of the path rather than the
+    number of roots, with the same lexical semantics as `Path.is_relative_to`. It behaves like the sequence of `Path`
+    objects it was built from, so it can be passed wherever an allow-list is expected; an empty matcher means "no
+    restrictions", like an empty list.
+
+    Args:
+        allow_paths (Sequence[str | os.PathLike]): Allowed directory roots.
+    """
+
+    def __init__(self, allow_paths: Sequence[PathLike]):
+        self.paths = tuple(
+            path if isinstance(path, Path) else Path(path) for path in allow_paths
+        )
+        self._trie: dict = {}
+        for path in self.paths:
+            node = self._trie
+            for part in _path_parts(str(path)):
+                node = node.setdefault(part, {})
+            node[_TERMINAL] = True
+
+    def __len__(self) -> int:
+        return len(self.paths)
+
+    def __iter__(self):
+        return iter(self.paths)
+
+    def __getitem__(self, index):
+        return self.paths[index]
+
+    def __repr__(self):
+        return f"_AllowPathMatcher({list(self.paths)!r})"
+
+    def allows(self, path: PathLike) -> bool:
+        """Return whether *path* lies inside (or is) one of the allowed roots."""
+        if not self.paths:
+            return True
+        node = self._trie
+        for part in _path_parts(os.fspath(path)):
+            if _TERMINAL in node:
+                return True
+            node = node.get(part)
+            if node is None:
+                return False
+        return _TERMINAL in node
+
+    def classify_directory(self, directory: PathLike) -> int:
+        """Classify a resolved directory against the allow-list.
+
+        Returns `_ALLOWED` if everything below the directory is allowed, `_PARTIAL` if only some allowed roots lie
+        strictly below it, and `_DENIED` otherwise.
+        """
+        if not self.paths:
+            return _ALLOWED
+        node = self._trie
+        for part in _path_parts(os.fspath(directory)):
+            if _TERMINAL in node:
+                return _ALLOWED
+            node = node.get(part)
+            if node is None:
+                return _DENIED
+        return _ALLOWED if _TERMINAL in node else _PARTIAL
+
+
+def _compile_allow_paths(allow_paths: Sequence[PathLike]) -> _AllowPathMatcher:
+    """Return *allow_paths* as a compiled matcher, compiling it only if it is not one already."""
+    if isinstance(allow_paths, _AllowPathMatcher):
+        return allow_paths
+    return _AllowPathMatcher(allow_paths)
+
+
+class _FileSystemCache:
+    """Filesystem metadata cache shared by every path check of one resolution.
+
+    Memoizes resolved paths, `stat`/`lstat` results (including negative entries for paths that do not exist) and
+    directory listings, so that a path reached several times while resolving a reference graph costs its system calls
+    only once. Resolving a path whose parent directory is already known costs a single `lstat` of the last component
+    instead of one per component.
+
+    The cache assumes the filesystem does not change while a single resolution is running, and must not be reused
+    across resolutions.
+
+    Args:
+        source (Source, optional): Where files, metadata and listings come from. Defaults to the local filesystem.
+    """
+
+    def __init__(self, source: Optional[Source] = None):
+        self.source = LocalSource() if source is None else source
+        self._realpaths: dict[str, str] = {}
+        self._stats: dict[str, Optional[os.stat_result]] = {}
+        self._lstats: dict[str, Optional[os.stat_result]] = {}
+        self._listings: dict[str, list[SourceEntry]] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def _lookup(self, memo: dict, path: str, compute: Callable[[str], Any]) -> Any:
+        try:
+            value = memo[path]
+        except KeyError:
+            self.misses += 1
+            value = memo[path] = compute(path)
+            return value
+        self.hits += 1
+        return value
+
+    def stat(self, path: PathLike) -> Optional[os.stat_result]:
+        """Return `os.stat` of *path* (following symlinks), or None if it does not exist."""
+        return self._lookup(self._stats, os.fspath(path), self.source.stat)
+
+    def lstat(self, path: PathLike) -> Optional[os.stat_result]:
+        """Return `os.lstat` of *path*, or None if it does not exist."""
+        return self._lookup(self._lstats, os.fspath(path), self.source.lstat)
+
+    def exists(self, path: PathLike) -> bool:
+        return self.stat(path) is not None
+
+    def is_file(self, path: PathLike) -> bool:
+        st = self.stat(path)
+        return st is not None and stat.S_ISREG(st.st_mode)
+
+    def is_dir(self, path: PathLike) -> bool:
+        st = self.stat(path)
+        return st is not None and stat.S_ISDIR(st.st_mode)
+
+    def size(self, path: PathLike) -> Optional[int]:
+        st = self.stat(path)
+        return None if st is None else st.st_size
+
+    def mtime_ns(self, path: PathLike) -> Optional[int]:
+        st = self.stat(path)
+        return None if st is None else st.st_mtime_ns
+
+    def realpath(self, path: PathLike) -> str:
+        """Return the canonical path of *path*, like `os.path.realpath` (and `Path.resolve()`)."""
+        return self._lookup(self._realpaths, os.fspath(path), self._compute_realpath)
+
+    def remember_realpath(self, path: str) -> None:
+        """Record that *path* is already canonical, e.g. because it was found inside a resolved directory."""
+        self._realpaths.setdefault(path, path)
+
+    def _compute_realpath(self, path: str) -> str:
+        head, tail = os.path.split(path)
+        if not head or not tail or head == path or tail in (".", ".."):
+            return self.source.realpath(path)
+        st = self.lstat(path)
+        if st is not None and stat.S_ISLNK(st.st_mode):
+            return self.source.realpath(path)
+        # Neither a symlink nor a special component: the canonical path is that of the parent plus the name.
+        return os.path.join(self.realpath(head), tail)
+
+    def scandir(self, path: str) -> list[SourceEntry]:
+        """Return the entries of directory *path*; unreadable directories are treated as empty, like `Path.glob`."""
+        return self._lookup(self._listings, path, self.source.scandir)
+
+    def open(self, path: PathLike) -> IO[str]:
+        """Open the file *path* for reading text. Contents are never cached."""
+        return self.source.open(os.fspath(path))
+
+
+class _GlobWalker:
+    """Walks the directory tree for one compiled glob pattern, collecting allowed regular files.
+
+    Each directory on the walk is tracked both as the path `Path.glob` would have produced and as its resolved form,
+    so that matches found through real (non-symlink) directories never need to be resolved individually. Directory
+    listings come from `Source.scandir`, whose entries carry their type and so avoid a `stat` call per entry.
+    """
+
+    def __init__(
+        self,
+        segments: Sequence[_GlobSegment],
+        allow_paths: _AllowPathMatcher,
+        fs: _FileSystemCache,
+        mtimes: Optional[dict[str, Optional[int]]] = None,
+    ):
+        self.segments = segments
+        self.allow_paths = allow_paths
+        self.fs = fs
+        self.matches: dict[str, str] = {}
+        # Resolved directories whose entries decided the matches, in the order they were consulted.
+        self.directories: dict[str, None] = {}
+        self.mtimes = mtimes
+        self._status_cache: dict[str, int] = {}
+
+    def _consult(self, directory_real: str) -> None:
+        # The mtime is taken before the directory is listed, so that a change made while the walk runs is not missed.
+        if self.mtimes is not None and directory_real not in self.mtimes:
+            self.mtimes[directory_real] = self.fs.mtime_ns(directory_real)
+        self.directories[directory_real] = None
+
+    def _status(self, directory: str) -> int:
+        status = self._status_cache.get(directory)
+        if status is None:
+            status = self.allow_paths.classify_directory(directory)
+            self._status_cache[directory] = status
+        return status
+
+    def _add_file(self, path: str, real: str, is_file: Callable[[], bool]) -> None:
+        if path in self.matches:
+            return
+        if not is_file():
+            return
+        if not self.allow_paths.allows(real):
+            return
+        self.matches[path] = real
+
+    def _add_entry(self, directory_real: str, entry: SourceEntry) -> None:
+        path = entry.path
+        if path in self.matches:
+            return
+        try:
+            is_symlink = entry.is_symlink()
+        except OSError:
+            return
+        if is_symlink:
+            # A symlink may point anywhere, including into an allowed root, so it is resolved and checked in full.
+            real = self.fs.realpath(path)
+            self._add_file(path, real, lambda: self.fs.is_file(real))
+            return
+        # A regular entry inside a resolved directory is its own resolved path; its type comes from the directory
+        # listing and, unless the allow-list is only partially covering the directory, so does its permission.
+        status = self._status(directory_real)
+        if status == _DENIED:
+            return
+        real = os.path.join(directory_real, entry.name)
+        try:
+            if not entry.is_file(follow_symlinks=False):
+                return
+        except OSError:
+            return
+        if status == _ALLOWED or self.allow_paths.allows(real):
+            self.fs.remember_realpath(real)
+            self.matches[path] = real
+
+    def _child_directory(
+        self, entry: SourceEntry, directory_real: str
+    ) -> Optional[str]:
+        try:
+            if not entry.is_dir():
+                return None
+            if entry.is_symlink():
+                return self.fs.realpath(entry.path)
+        except OSError:
+            return None
+        return os.path.join(directory_real, entry.name)
+
+    def _recursive_directories(self, path: str, real: str):
+        # `**` never follows symlinked directories.
+        stack = [(path, real)]
+        while stack:
+            directory, directory_real = stack.pop()
+            self._consult(directory_real)
+            entries = self.fs.scandir(directory)
+            yield directory, directory_real, entries
+            for entry in reversed(entries):
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(
+                            (entry.path, os.path.join(directory_real, entry.name))
+                        )
+                except OSError:
+                    continue
+
+    def walk(self, path: str, real: str, index: int = 0) -> None:
+        segment = self.segments[index]
+        last = index == len(self.segments) - 1
+
+        if segment.kind == "literal":
+            child = os.path.join(path, segment.name)
+            if segment.name == "..":
+                if not last:
+                    self.walk(child, os.path.dirname(real), index + 1)
+                return
+            st = self.fs.lstat(child)
+            if st is None:
+                # Creating the missing entry would change the result.
+                self._consult(real)
+                return
+            if stat.S_ISLNK(st.st_mode):
+                child_real = self.fs.realpath(child)
+                st = self.fs.stat(child_real)
+                if st is None:
+                    return
+            else:
+                child_real = os.path.join(real, segment.name)
+                self.fs.remember_realpath(child_real)
+            mode = st.st_mode
+            if last:
+                if stat.S_ISREG(mode) and self.allow_paths.allows(child_real):
+                    self.matches.setdefault(child, child_real)
+            elif stat.S_ISDIR(mode):
+                self.walk(child, child_real, index + 1)
+            return
+
+        if segment.kind == "wildcard":
+            self._consult(real)
+            for entry in self.fs.scandir(path):
+                if not segment.match(entry.name):
+                    continue
+                if last:
+                    self._add_entry(real, entry)
+                    continue
+                child_real = self._child_directory(entry, real)
+                if child_real is not None:
+                    self.walk(entry.path, child_real, index + 1)
+            return
+
+        # Recursive wildcard: zero or more nested directories.
+        for directory, directory_real, entries in self._recursive_directories(
+            path, real
+        ):
+            if not last:
+                self.walk(directory, directory_real, index + 1)
+            elif _TRAILING_RECURSIVE_MATCHES_FILES:
+                for entry in entries:
+                    self._add_entry(directory_real, entry)
+
+
+def glob_allowed_files(
+    base_directory: PathLike,
+    pattern: str,
+    allow_paths: Sequence[PathLike],
+    fs: Optional[_FileSystemCache] = None,
+    directories: Optional[list[str]] = None,
+    directory_mtimes: Optional[dict[str, Optional[int]]] = None,
+) -> list[Path]:
+    """Expand a `!reference-all` glob into the resolved, allowed regular files it matches.
+
+    Produces the same result as resolving every match of `Path(base_directory).glob(pattern)`, dropping paths that
+    do not exist, are not regular files or fall outside *allow_paths*, and sorting the rest by their string form.
+    Directories that cannot match the next pattern component are never listed, and regular files inside resolved
+    directories that lie outside the allow-list are dropped without any further system call.
+
+    Args:
+        base_directory (str | os.PathLike): Directory the pattern is relative to.
+        pattern (str): Relative glob pattern.
+        allow_paths (Sequence[str | os.PathLike]): Allowed directory roots, or a precompiled `_AllowPathMatcher`. An
+            empty sequence means no restrictions.
+        fs (_FileSystemCache, optional): Filesystem metadata cache of the current resolution.
+        directories (list[str], optional): List to append the resolved directories whose entries decided the result
+            to: every directory listed, and every directory in which a literal pattern component was missing.
+        directory_mtimes (dict[str, int | None], optional): Mapping to add the mtime in nanoseconds of each of those
+            directories to, as it was before the directory was listed; directories already in it are kept.
+
+    Returns:
+        list[Path]: Sorted resolved paths of the allowed files matched by the pattern.
+    """
+    compiled = _compile_glob(pattern)
+    if compiled.directories_only:
+        return []
+    if fs is None:
+        fs = _FileSystemCache()
+    base = os.fspath(base_directory)
+    walker = _GlobWalker(
+        compiled.segments, _compile_allow_paths(allow_paths), fs, directory_mtimes
+    )
+    walker.walk(base, fs.realpath(base))
+    if directories is not None:
+        directories.extend(walker.directories)
+    return [Path(real) for real in sorted(walker.matches.values())]
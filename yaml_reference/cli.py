@@ -1,12 +1,51 @@
+import filecmp
 import json
+import os
+import stat
 import sys
+import tempfile
+from collections.abc import Iterator
+from contextlib import contextmanager
 from pathlib import Path
+from typing import Any, Optional, TextIO
 
 from ruamel.yaml.error import YAMLError
-from yaml_reference import load_yaml_with_references
 
+from yaml_reference import (
+    PARSER_BACKENDS,
+    LoadDependencies,
+    LoadStats,
+    Source,
+    _root_allow_paths,
+    _virtual_root,
+    digest_resolved,
+    load_yaml_with_references,
+    validate_yaml_references,
+)
+from yaml_reference.manifest import (
+    build_manifest,
+    manifest_is_current,
+    read_manifest,
+    write_manifest,
+)
+from yaml_reference.stats import _span
 
-def compile_main(input_file: str, allow_paths: list[str] = []):
+
+def compile_main(
+    input_file: str,
+    allow_paths: list[str] = [],
+    backend: str = "auto",
+    profile: Optional[str] = None,
+    select: Optional[str] = None,
+    ndjson: bool = False,
+    check: bool = False,
+    depfile: Optional[str] = None,
+    depfile_target: Optional[str] = None,
+    output: Optional[str] = None,
+    manifest: Optional[str] = None,
+    if_changed: bool = False,
+    digest: bool = False,
+):
     """
     Compile a YAML file from the given input path containing !reference tags into a JSON file with resolved references.
     The resulting output JSON document (dumped to stdout) will be "safely" formatted:
@@ -18,22 +57,283 @@ def compile_main(input_file: str, allow_paths: list[str] = []):
     resolution of references in deterministic way.
 
     Args:
-        input_file (str): Path to the input YAML file with references to resolve and print as JSON.
+        input_file (str): Path to the input YAML file with references to resolve and print as JSON, or "-" to read it
+            from stdin, as a virtual file named "<stdin>" in the current directory.
         allow_paths (list[str]): List of paths to allow references from.
+        backend (str): YAML parser backend, one of "auto", "pure" or "c".
+        profile (str, optional): Path to write a Chrome trace-event profile of the compilation to. The profile is
+            written even when the compilation fails.
+        select (str, optional): JSON-pointer-style path (e.g. "services/3/database") of the only node to compile.
+        ndjson (bool): Print compact JSON lines instead of a single indented JSON document: one per document of a
+            multi-document input file, or per item of a root `!reference-all`, each as soon as it is resolved.
+            `!ignore`d documents are skipped.
+        check (bool): Only check that the input file would compile, without resolving it: every problem of its
+            reference graph is printed to stderr, and nothing to stdout. Exits with status 1 if there are any. Only
+            combines with `allow_paths` and `backend`.
+        depfile (str, optional): Path to write a Makefile-format depfile to once the compilation succeeds, listing
+            every file read and every directory whose entries decided the expansion of a `!reference-all` glob.
+        depfile_target (str, optional): Target of the depfile rule. Defaults to `output` if given, otherwise to the
+            depfile path without its ".d" suffix.
+        output (str, optional): Path to write the JSON output to instead of stdout. The output is written to a temporary
+            file which then atomically replaces it, and an existing file with identical contents is left untouched.
+        manifest (str, optional): Path to write a manifest of the compilation to once it succeeds, recording the hash of
+            every input and output file and the matches of every `!reference-all` glob. Requires `output`.
+        if_changed (bool): Check the `manifest` first and return without compiling anything if none of the recorded
+            inputs, outputs and glob matches changed since it was written.
+        digest (bool): Print the hexadecimal `digest_resolved` digest of the compiled data instead of its JSON.
     """
-    input_path = Path(input_file)
-    if not input_path.exists():
+    if input_file == "-" and (depfile or manifest is not None):
+        print(
+            "Error: --depfile and --manifest cannot be used when reading from stdin.",
+            file=sys.stderr,
+        )
+        sys.exit(1)
+    if check:
+        # Every other option shapes or records the output of a compilation, which --check never produces.
+        if (
+            select is not None
+            or ndjson
+            or digest
+            or output is not None
+            or depfile
+            or depfile_target is not None
+            or manifest is not None
+            or if_changed
+            or profile
+        ):
+            print(
+                "Error: --check cannot be combined with --select, --ndjson, --digest, --output, --depfile, "
+                "--depfile-target, --manifest, --if-changed or --profile.",
+                file=sys.stderr,
+            )
+            sys.exit(1)
+        _check(input_file, allow_paths, backend)
+        return
+    if manifest is not None and output is None:
+        print("Error: --manifest requires --output.", file=sys.stderr)
+        sys.exit(1)
+    if if_changed and manifest is None:
+        print("Error: --if-changed requires --manifest.", file=sys.stderr)
+        sys.exit(1)
+    key = {
+        "input": str(Path(input_file).absolute()),
+        "allow_paths": [str(Path(path).absolute()) for path in allow_paths],
+        "select": select,
+        "ndjson": ndjson,
+        "digest": digest,
+    }
+    if if_changed and manifest_is_current(read_manifest(manifest), key):
+        return
+    if manifest is not None:
+        # A failed compilation must not leave a manifest behind that vouches for the previous output.
+        Path(manifest).unlink(missing_ok=True)
+
+    stats = LoadStats(trace=True) if profile else None
+    dependencies = LoadDependencies() if depfile or manifest else None
+    try:
+        if output is None:
+            _compile(
+                input_file,
+                allow_paths,
+                backend,
+                stats,
+                select,
+                ndjson,
+                dependencies,
+                digest=digest,
+            )
+        else:
+            with _atomic_output(output) as out:
+                _compile(
+                    input_file,
+                    allow_paths,
+                    backend,
+                    stats,
+                    select,
+                    ndjson,
+                    dependencies,
+                    out,
+                    digest=digest,
+                )
+    finally:
+        if stats is not None:
+            stats.write_trace(profile)
+    if depfile:
+        if depfile_target is None:
+            depfile_target = output
+        if depfile_target is None:
+            depfile_target = (
+                depfile[: -len(".d")] if depfile.endswith(".d") else depfile
+            )
+        dependencies.write_depfile(depfile, depfile_target)
+    if manifest is not None:
+        root_allow_paths = _root_allow_paths(input_file, allow_paths)
+        write_manifest(
+            manifest,
+            build_manifest(dependencies, key, root_allow_paths, outputs=[output]),
+        )
+
+
+def _compile(
+    input_file: str,
+    allow_paths: list[str],
+    backend: str,
+    stats: Optional[LoadStats],
+    select: Optional[str] = None,
+    ndjson: bool = False,
+    dependencies: Optional[LoadDependencies] = None,
+    out: Optional[TextIO] = None,
+    digest: bool = False,
+):
+    # A root-level list (the documents of a multi-document file, or a root !reference-all) comes back as a generator
+    # when streamed, and each item is written out as soon as it is resolved. An indented JSON array on stdout is only
+    # written once it is complete, so that a failure after the first item leaves no truncated JSON behind; the
+    # temporary file of `output` is discarded on failure anyway.
+    stream = ndjson or digest or out is not None
+    if out is None:
+        out = sys.stdout
+    input_path, source = _input(input_file)
+    if source is None and not input_path.exists():
         print(f'Error: Input file "{input_path}" does not exist.', file=sys.stderr)
         sys.exit(1)
+    if ndjson and select is not None:
+        print("Error: --ndjson cannot be combined with --select.", file=sys.stderr)
+        sys.exit(1)
+    if ndjson and digest:
+        print("Error: --ndjson cannot be combined with --digest.", file=sys.stderr)
+        sys.exit(1)
+
+    with _compile_errors(input_path):
+        data = load_yaml_with_references(
+            input_path,
+            allow_paths=allow_paths,
+            backend=backend,
+            stats=stats,
+            select=select,
+            stream=stream,
+            dependencies=dependencies,
+            source=source,
+        )
+        if digest:
+            # A generator is digested one item at a time, to the digest of the list of its items.
+            with _span(stats, "output", "digest"):
+                out.write(digest_resolved(data) + "\n")
+        elif ndjson:
+            for item in data if isinstance(data, Iterator) else [data]:
+                with _span(stats, "output", "ndjson"):
+                    json.dump(item, out, sort_keys=True)
+                    out.write("\n")
+                    out.flush()
+        elif isinstance(data, Iterator):
+            _dump_json_array(data, stats, out)
+        else:
+            with _span(stats, "output", "json"):
+                json.dump(data, out, sort_keys=True, indent=2)
+
+
+def _check(
+    input_file: str,
+    allow_paths: list[str],
+    backend: str,
+):
+    input_path, source = _input(input_file)
+    with _compile_errors(input_path):
+        issues = validate_yaml_references(
+            input_path, allow_paths=allow_paths, backend=backend, source=source
+        )
+    for issue in issues:
+        print(f"Error: {issue}", file=sys.stderr)
+    if issues:
+        sys.exit(1)
+
+
+def _input(input_file: str) -> tuple[Path, Optional[Source]]:
+    """Return the path of the root file to load for *input_file*, and the source to load it from.
+
+    "-" stands for stdin, which is read at once and served as the virtual file "<stdin>" in the current directory.
+    """
+    if input_file != "-":
+        return Path(input_file), None
+    path, source = _virtual_root(sys.stdin.read(), ".", "<stdin>")
+    return Path(path), source
+
+
+def _dump_json_array(items: Iterator[Any], stats: Optional[LoadStats], out: TextIO):
+    """Write *items* to *out* as they come, exactly as `json.dump(list(items), sort_keys=True, indent=2)` would."""
+    empty = True
+    for item in items:
+        with _span(stats, "output", "json"):
+            out.write("[\n  " if empty else ",\n  ")
+            # Strings are dumped with escaped newlines, so every newline here separates two lines of the item.
+            out.write(json.dumps(item, sort_keys=True, indent=2).replace("\n", "\n  "))
+            out.flush()
+        empty = False
+    out.write("[]" if empty else "\n]")
+
+
+@contextmanager
+def _atomic_output(path: str) -> Iterator[TextIO]:
+    """Open a temporary file next to *path* for writing, and move it over *path* once the block succeeds.
+
+    If the block fails, or the new contents are byte-for-byte identical to those of *path*, the temporary file is
+    removed and *path* keeps its contents and mtime.
+    """
+    target = Path(os.path.realpath(path))
+    with _output_errors(path):
+        fd, temp_path = tempfile.mkstemp(
+            dir=target.parent, prefix=f".{target.name}.", suffix=".tmp"
+        )
+    replaced = False
+    try:
+        with os.fdopen(fd, "w") as out:
+            yield out
+        with _output_errors(path):
+            # Compares the two files chunk by chunk; files of different sizes are never read.
+            if target.exists() and filecmp.cmp(temp_path, target, shallow=False):
+                return
+            if target.exists():
+                mode = stat.S_IMODE(target.stat().st_mode)
+            else:
+                umask = os.umask(0)
+                os.umask(umask)
+                mode = 0o666 & ~umask
+            os.chmod(temp_path, mode)
+            os.replace(temp_path, target)
+        replaced = True
+    finally:
+        if not replaced:
+            os.unlink(temp_path)
+
 
+@contextmanager
+def _output_errors(path: str) -> Iterator[None]:
+    """Report the errors raised while writing the output file *path* on stderr and exit with status 1."""
     try:
-        data = load_yaml_with_references(input_path, allow_paths=allow_paths)
+        yield
+    except OSError as err:
+        print(f'Error: Failed to write "{path}":\n{err}', file=sys.stderr)
+        sys.exit(1)
+
+
+@contextmanager
+def _compile_errors(input_path: Path) -> Iterator[None]:
+    """Report the errors raised while compiling *input_path* on stderr and exit with status 1."""
+    try:
+        yield
     except PermissionError as perm:
         print(
             f'Error: Permission denied while resolving references in "{input_path}":\n{perm}',
             file=sys.stderr,
         )
         sys.exit(1)
+    except ImportError as err:
+        print(f"Error: {err}", file=sys.stderr)
+        sys.exit(1)
+    except KeyError as err:
+        print(
+            f'Error: Failed to compile "{input_path}":\n{err.args[0]}', file=sys.stderr
+        )
+        sys.exit(1)
     except (FileNotFoundError, ValueError, YAMLError) as err:
         print(
             f'Error: Failed to compile "{input_path}":\n{err}',
@@ -41,8 +341,6 @@ def compile_main(input_file: str, allow_paths: list[str] = []):
         )
         sys.exit(1)
 
-    json.dump(data, sys.stdout, sort_keys=True, indent=2)
-
 
 def compile_cli():
     import argparse
@@ -55,7 +353,7 @@ def compile_cli():
     )
     parser.add_argument(
         "input_file",
-        help="Path to the input YAML file with references to resolve and print as JSON.",
+        help='Path to the input YAML file with references to resolve and print as JSON, or "-" to read it from stdin.',
     )
     # Support 0+ args like --allow path1 --allow path2
     parser.add_argument(
@@ -65,9 +363,110 @@ def compile_cli():
         default=[],
         dest="allow_paths",
     )
+    parser.add_argument(
+        "--backend",
+        choices=PARSER_BACKENDS,
+        default="auto",
+        help='YAML parser backend. "auto" uses the C parser when ruamel.yaml.clib is installed (default: auto).',
+    )
+    parser.add_argument(
+        "--profile",
+        metavar="PROFILE_JSON",
+        help=(
+            "Write a Chrome trace-event profile of the compilation to this file, for chrome://tracing, "
+            "ui.perfetto.dev or speedscope.app."
+        ),
+    )
+    parser.add_argument(
+        "--select",
+        metavar="PATH",
+        help=(
+            'Only compile the node at this JSON-pointer-style path, e.g. "services/3/database". '
+            "Files outside the path to that node are not resolved."
+        ),
+    )
+    parser.add_argument(
+        "--ndjson",
+        action="store_true",
+        help=(
+            "Print one line of compact JSON per document of a multi-document input file, or per item of a root "
+            "!reference-all, as soon as it is resolved. Documents tagged !ignore are skipped."
+        ),
+    )
+    parser.add_argument(
+        "--check",
+        action="store_true",
+        help=(
+            "Only check that every referenced file exists, is allowed and parses, that globs and anchors are valid "
+            "and that there are no circular references. Prints every problem to stderr and nothing to stdout. Only "
+            "combines with --allow and --backend."
+        ),
+    )
+    parser.add_argument(
+        "--depfile",
+        metavar="DEPFILE",
+        help=(
+            "Write a Makefile-format depfile for make or ninja to this file, listing every file read and every "
+            "directory whose entries decide a !reference-all glob."
+        ),
+    )
+    parser.add_argument(
+        "--depfile-target",
+        metavar="TARGET",
+        help=(
+            'Target of the depfile rule (default: the --output file, or else the depfile path without its ".d" '
+            "suffix)."
+        ),
+    )
+    parser.add_argument(
+        "--output",
+        metavar="FILE",
+        help=(
+            "Write the JSON output to this file instead of stdout. The file is replaced atomically, and left untouched "
+            "if its contents would not change."
+        ),
+    )
+    parser.add_argument(
+        "--manifest",
+        metavar="MANIFEST_JSON",
+        help=(
+            "Write a manifest of the compilation to this file, recording the hash of every input and output file and "
+            "the matches of every !reference-all glob. Requires --output."
+        ),
+    )
+    parser.add_argument(
+        "--if-changed",
+        action="store_true",
+        help=(
+            "Exit without compiling if nothing recorded in the --manifest changed: files are checked by mtime and "
+            "only hashed if it differs, globs are only expanded again if a directory they depend on changed."
+        ),
+    )
+    parser.add_argument(
+        "--digest",
+        action="store_true",
+        help=(
+            "Print a canonical SHA-256 digest of the compiled data instead of its JSON, e.g. as a cache key. The data "
+            "is hashed as it is resolved, without serializing it."
+        ),
+    )
     args = parser.parse_args()
     if not args.input_file:
         print("Error: Input file path is required.", file=sys.stderr)
         sys.exit(1)
 
-    compile_main(args.input_file, allow_paths=args.allow_paths)
+    compile_main(
+        args.input_file,
+        allow_paths=args.allow_paths,
+        backend=args.backend,
+        profile=args.profile,
+        select=args.select,
+        ndjson=args.ndjson,
+        check=args.check,
+        depfile=args.depfile,
+        depfile_target=args.depfile_target,
+        output=args.output,
+        manifest=args.manifest,
+        if_changed=args.if_changed,
+        digest=args.digest,
+    )
@@ -0,0 +1,93 @@
+import os
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Optional, Union
+
+
+@dataclass
+class GlobExpansion:
+    """One `!reference-all` glob expanded during a load.
+
+    Args:
+        base_directory (str): Resolved directory the glob is relative to.
+        glob (str): The glob pattern, as written in the tag.
+        matches (list[str]): Resolved paths of the allowed files the glob matched, sorted.
+        directories (list[str]): Resolved directories whose entries decided the matches: adding, removing or renaming
+            an entry of one of them can change the expansion.
+    """
+
+    base_directory: str
+    glob: str
+    matches: list[str]
+    directories: list[str]
+
+
+@dataclass
+class LoadDependencies:
+    """Opt-in collector of the inputs of `load_yaml_with_references` and `iter_yaml_with_references`.
+
+    Pass an instance through the `dependencies` argument; the collector is filled while the load runs, including while
+    a streamed result is consumed, and can be reused to accumulate over several loads.
+
+    Args:
+        files (list[str]): Resolved paths of every file read, in the order they were first read.
+        globs (list[GlobExpansion]): Every `!reference-all` glob expanded, in the order they were expanded.
+        file_metadata (dict[str, tuple[int, int]]): Size and mtime in nanoseconds of every file read, as they were
+            before the file was first read.
+        directory_mtimes (dict[str, int | None]): Mtime in nanoseconds of every directory from `directories()`, as it
+            was before the directory was first listed; None if it did not exist.
+    """
+
+    files: list[str] = field(default_factory=list)
+    globs: list[GlobExpansion] = field(default_factory=list)
+    file_metadata: dict[str, tuple[int, int]] = field(default_factory=dict, repr=False)
+    directory_mtimes: dict[str, Optional[int]] = field(default_factory=dict, repr=False)
+    _seen: set[str] = field(default_factory=set, repr=False)
+
+    def add_file(
+        self, path: str, size: Optional[int] = None, mtime_ns: Optional[int] = None
+    ) -> None:
+        """Record that the file *path* was read, with the size and mtime it had before it was read, if known."""
+        if path not in self._seen:
+            self._seen.add(path)
+            self.files.append(path)
+        if size is not None and mtime_ns is not None:
+            self.file_metadata.setdefault(path, (size, mtime_ns))
+
+    def directories(self) -> list[str]:
+        """Return the directories whose entries decided the expansion of any glob, sorted.
+
+        Returns:
+            list[str]: Resolved directory paths.
+        """
+        return sorted({path for glob in self.globs for path in glob.directories})
+
+    def depfile(self, target: str) -> str:
+        """Return a Makefile-format rule making *target* depend on every file read and every directory from
+        `directories()`, as written by compilers for make and ninja.
+
+        Args:
+            target (str): Path of the file built from the loaded inputs.
+
+        Returns:
+            str: The rule, one prerequisite per line.
+        """
+        prerequisites = self.files + self.directories()
+        lines = [f"{_escape(target)}:"] + [
+            f"  {_escape(path)}" for path in prerequisites
+        ]
+        return " \\\n".join(lines) + "\n"
+
+    def write_depfile(self, path: Union[str, os.PathLike], target: str) -> None:
+        """Write the rule from `depfile(target)` to *path*.
+
+        Args:
+            path (str | os.PathLike): Destination file.
+            target (str): Path of the file built from the loaded inputs.
+        """
+        Path(path).write_text(self.depfile(target))
+
+
+def _escape(path: str) -> str:
+    # Make reads `$` as a variable reference, `#` as a comment and whitespace as a separator.
+    return path.replace("$", "$$").replace("#", "\\#").replace(" ", "\\ ")
@@ -0,0 +1,180 @@
+import datetime
+import hashlib
+from collections import abc
+from collections.abc import Callable, Iterator
+from typing import Any
+
+# Every value is encoded so that no encoding is a prefix of another: scalars carry their type and a length or a
+# terminator, and containers are wrapped in a type tag and an end marker. Equal digests thus mean equal typed trees.
+_END = b"e"
+_FLUSH_PIECES = 4096
+_MAX_CACHED_KEYS = 4096
+
+
+def _encode_str(value: str) -> bytes:
+    encoded = value.encode("utf-8", "surrogatepass")
+    return b"s%d:%s" % (len(encoded), encoded)
+
+
+def _encode_int(value: int) -> bytes:
+    return b"i%d;" % value
+
+
+def _encode_float(value: float) -> bytes:
+    return b"d%s;" % repr(value).encode()
+
+
+def _encode_bytes(value: bytes) -> bytes:
+    return b"b%d:%s" % (len(value), value)
+
+
+def _encode_temporal(value: Any) -> bytes:
+    return b"T%s:%s;" % (type(value).__name__.encode(), value.isoformat().encode())
+
+
+_SCALAR_ENCODERS: dict[type, Callable[[Any], bytes]] = {
+    str: _encode_str,
+    int: _encode_int,
+    float: _encode_float,
+    bool: lambda value: b"t" if value else b"f",
+    type(None): lambda value: b"n",
+    bytes: _encode_bytes,
+    datetime.date: _encode_temporal,
+    datetime.datetime: _encode_temporal,
+    datetime.time: _encode_temporal,
+}
+
+
+def _encode_scalar(value: Any) -> bytes:
+    """Encode a scalar of a subclass of the types in `_SCALAR_ENCODERS`, e.g. a `str` subclass."""
+    for base in type(value).__mro__[1:]:
+        encoder = _SCALAR_ENCODERS.get(base)
+        if encoder is not None:
+            return encoder(value)
+    raise TypeError(f"Cannot digest a value of type {type(value).__name__}: {value!r}")
+
+
+def _sort_key(key: Any) -> bytes:
+    """Return the encoding of a mapping key or set item, which decides its canonical position."""
+    encoder = _SCALAR_ENCODERS.get(type(key))
+    if encoder is not None:
+        return encoder(key)
+    if isinstance(key, tuple):
+        # A YAML sequence used as a mapping key.
+        return b"h" + bytes.fromhex(digest_resolved(key))
+    return _encode_scalar(key)
+
+
+class _StrKeyEncodings(dict):
+    """Encodings of the string mapping keys seen so far: mappings of the same shape repeat the same keys."""
+
+    def __missing__(self, key: str) -> bytes:
+        if len(self) >= _MAX_CACHED_KEYS:
+            self.clear()
+        encoded = self[key] = _encode_str(key)
+        return encoded
+
+
+def _mapping_values(
+    items: list[tuple[bytes, Any]], append: Callable[[bytes], None]
+) -> Iterator[Any]:
+    """Yield the values of encoded, sorted mapping items, appending the encoding of each key right before its value."""
+    for key, value in items:
+        append(key)
+        yield value
+
+
+def digest_resolved(data: Any) -> str:
+    """Return a canonical SHA-256 digest of resolved YAML data, without serializing it.
+
+    The data is walked without recursion and fed to the hash in batches of a compact binary encoding, so no serialized
+    copy of it is ever built. Mappings are hashed in a canonical key order, so that key order does not matter, and
+    scalars are tagged with their type, so that `1`, `1.0`, `True` and `"1"` all differ, as mapping keys too.
+
+    An iterator, such as the generator `load_yaml_with_references(..., stream=True)` returns, has the digest of the list
+    of its items, and is consumed one item at a time.
+
+    Args:
+        data (Any): Resolved data, as returned by `load_yaml_with_references`.
+
+    Returns:
+        str: The hexadecimal digest.
+
+    Raises:
+        TypeError: If *data* contains a value of a type YAML cannot represent, e.g. an unresolved `Reference`.
+        ValueError: If *data* contains itself.
+    """
+    hasher = hashlib.sha256()
+    pieces: list[bytes] = []
+    append = pieces.append
+    encoders = _SCALAR_ENCODERS
+    str_keys = _StrKeyEncodings()
+    # Items left to encode of every open container, innermost last, and the ids of those containers.
+    stack: list[Iterator[Any]] = [iter((data,))]
+    open_ids: list[int] = [0]
+    open_set: set[int] = set()
+    while stack:
+        for item in stack[-1]:
+            if len(pieces) >= _FLUSH_PIECES:
+                hasher.update(b"".join(pieces))
+                pieces.clear()
+            encoder = encoders.get(type(item))
+            if encoder is not None:
+                append(encoder(item))
+                continue
+            if isinstance(item, abc.Mapping):
+                # Distinct keys have distinct encodings, so the values are never compared.
+                items = sorted(
+                    [
+                        (
+                            str_keys[key] if type(key) is str else _sort_key(key),
+                            value,
+                        )
+                        for key, value in item.items()
+                    ]
+                )
+                # Most mappings only hold scalars: encode those at once, without opening a container.
+                try:
+                    encoded = [
+                        key + encoders[type(value)](value) for key, value in items
+                    ]
+                except KeyError:
+                    append(b"m")
+                    children: Iterator[Any] = _mapping_values(items, append)
+                else:
+                    append(b"m%se" % b"".join(encoded))
+                    continue
+            elif isinstance(item, (list, tuple)) or (
+                isinstance(item, abc.Sequence)
+                and not isinstance(item, (str, bytes, bytearray))
+            ):
+                try:
+                    encoded = [encoders[type(value)](value) for value in item]
+                except KeyError:
+                    append(b"l")
+                    children = iter(item)
+                else:
+                    append(b"l%se" % b"".join(encoded))
+                    continue
+            elif isinstance(item, abc.Set):
+                append(b"S")
+                children = iter(sorted(item, key=_sort_key))
+            elif isinstance(item, abc.Iterator):
+                append(b"l")
+                children = item
+            else:
+                append(_encode_scalar(item))
+                continue
+            if id(item) in open_set:
+                raise ValueError("Cannot digest data which contains itself.")
+            open_set.add(id(item))
+            open_ids.append(id(item))
+            stack.append(children)
+            break
+        else:
+            stack.pop()
+            open_set.discard(open_ids.pop())
+            if stack:
+                append(_END)
+    hasher.update(b"".join(pieces))
+    return hasher.hexdigest()
@@ -0,0 +1,170 @@
+import hashlib
+import json
+import os
+from collections.abc import Sequence
+from pathlib import Path
+from typing import Any, Optional, Union
+
+from yaml_reference._paths import _AllowPathMatcher, glob_allowed_files
+from yaml_reference.dependencies import LoadDependencies
+
+PathLike = Union[str, os.PathLike]
+
+MANIFEST_VERSION = 1
+
+
+def _file_digest(path: PathLike) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 16), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _mtime_ns(path: PathLike) -> Optional[int]:
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+
+def _file_record(path: PathLike) -> dict[str, Any]:
+    st = os.stat(path)
+    return {
+        "mtime_ns": st.st_mtime_ns,
+        "size": st.st_size,
+        "sha256": _file_digest(path),
+    }
+
+
+def _file_metadata(path: PathLike) -> tuple[int, int]:
+    st = os.stat(path)
+    return st.st_size, st.st_mtime_ns
+
+
+def _input_record(path: str, dependencies: LoadDependencies) -> dict[str, Any]:
+    """Return the record of the input *path* with the size and mtime the load saw before reading it.
+
+    The hash is only taken while the file still has that size and mtime: otherwise it would be the hash of contents the
+    load never parsed, and a file changed since then is left without one, so that it never matches its record.
+    """
+    metadata = dependencies.file_metadata.get(path)
+    if metadata is None:
+        return _file_record(path)
+    size, mtime_ns = metadata
+    record = {"mtime_ns": mtime_ns, "size": size, "sha256": None}
+    try:
+        if _file_metadata(path) == metadata:
+            digest = _file_digest(path)
+            if _file_metadata(path) == metadata:
+                record["sha256"] = digest
+    except OSError:
+        pass
+    return record
+
+
+def _file_unchanged(path: str, record: dict[str, Any]) -> bool:
+    """Return whether *path* still has the contents of *record*, only hashing it if its mtime differs."""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return False
+    if st.st_size != record["size"]:
+        return False
+    if st.st_mtime_ns == record["mtime_ns"]:
+        return True
+    return _file_digest(path) == record["sha256"]
+
+
+def build_manifest(
+    dependencies: LoadDependencies,
+    key: dict[str, Any],
+    allow_paths: Sequence[PathLike],
+    outputs: Sequence[PathLike],
+) -> dict[str, Any]:
+    """Return the manifest of a compilation, to be checked with `manifest_is_current` before the next one.
+
+    Args:
+        dependencies (LoadDependencies): Inputs recorded while loading.
+        key (dict[str, Any]): JSON-serializable options of the compilation; the manifest is only current for the same
+            key.
+        allow_paths (Sequence[str | os.PathLike]): Allow-list of the load, including the directory of the root file,
+            used to expand the globs again.
+        outputs (Sequence[str | os.PathLike]): Files written by the compilation.
+
+    Returns:
+        dict[str, Any]: The manifest, as JSON-serializable data: the size, mtime and SHA-256 hash of every input and
+        output file, and the matches of every `!reference-all` glob with the mtimes of the directories deciding them.
+        Inputs and directories are recorded as the load saw them before reading them, so that a change made while the
+        compilation runs makes the manifest stale.
+    """
+    globs = {}
+    for glob in dependencies.globs:
+        globs[glob.base_directory, glob.glob] = {
+            "base_directory": glob.base_directory,
+            "glob": glob.glob,
+            "matches": glob.matches,
+            "directories": {
+                path: dependencies.directory_mtimes[path]
+                if path in dependencies.directory_mtimes
+                else _mtime_ns(path)
+                for path in glob.directories
+            },
+        }
+    return {
+        "version": MANIFEST_VERSION,
+        "key": key,
+        "allow_paths": [os.fspath(path) for path in allow_paths],
+        "inputs": {
+            path: _input_record(path, dependencies) for path in dependencies.files
+        },
+        "globs": list(globs.values()),
+        "outputs": {os.fspath(path): _file_record(path) for path in outputs},
+    }
+
+
+def write_manifest(path: PathLike, manifest: dict[str, Any]) -> None:
+    Path(path).write_text(json.dumps(manifest, indent=1, sort_keys=True) + "\n")
+
+
+def read_manifest(path: PathLike) -> Optional[dict[str, Any]]:
+    """Return the manifest stored at *path*, or None if it is missing or unreadable."""
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def manifest_is_current(
+    manifest: Optional[dict[str, Any]], key: dict[str, Any]
+) -> bool:
+    """Return whether compiling again with the options *key* would reproduce the outputs recorded in *manifest*.
+
+    Files whose size and mtime are unchanged are trusted; the others are hashed. A glob is only expanded again if one
+    of the directories deciding its matches has a different mtime. Nothing is parsed.
+
+    Args:
+        manifest (dict[str, Any], optional): Manifest from `read_manifest`.
+        key (dict[str, Any]): Options of the compilation about to run.
+
+    Returns:
+        bool: True if no input, output or glob expansion changed.
+    """
+    if not manifest or manifest.get("version") != MANIFEST_VERSION:
+        return False
+    if manifest["key"] != key:
+        return False
+    for records in (manifest["outputs"], manifest["inputs"]):
+        for path, record in records.items():
+            if not _file_unchanged(path, record):
+                return False
+    allow_paths = _AllowPathMatcher(manifest["allow_paths"])
+    for glob in manifest["globs"]:
+        directories = glob["directories"]
+        if all(_mtime_ns(path) == mtime for path, mtime in directories.items()):
+            continue
+        matches = glob_allowed_files(glob["base_directory"], glob["glob"], allow_paths)
+        if [str(path) for path in matches] != glob["matches"]:
+            return False
+    return True
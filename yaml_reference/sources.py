@@ -0,0 +1,353 @@
+import io
+import os
+import stat
+import tarfile
+import time
+import zipfile
+from abc import ABC, abstractmethod
+from collections.abc import Mapping
+from contextlib import ExitStack
+from typing import IO, NamedTuple, Optional, Protocol, Union
+
+PathLike = Union[str, os.PathLike]
+
+
+class SourceStat(NamedTuple):
+    """The part of `os.stat_result` the resolver reads, for sources without a real filesystem underneath.
+
+    Args:
+        st_mode (int): File type and permission bits, see the `stat` module.
+        st_size (int): Size in bytes.
+        st_mtime_ns (int): Modification time in nanoseconds.
+    """
+
+    st_mode: int
+    st_size: int
+    st_mtime_ns: int = 0
+
+
+class SourceEntry(Protocol):
+    """A directory entry, as returned by `Source.scandir`; `os.DirEntry` is one."""
+
+    name: str
+    path: str
+
+    def is_dir(self, *, follow_symlinks: bool = True) -> bool: ...
+
+    def is_file(self, *, follow_symlinks: bool = True) -> bool: ...
+
+    def is_symlink(self) -> bool: ...
+
+
+class Source(ABC):
+    """Where the resolver reads files, their metadata and directory listings from.
+
+    Every file access of a resolution, from the path checks and `allow_paths` to the parsing of each file and the
+    matching of `!reference-all` globs, goes through a source. Paths are absolute strings in the syntax of `os.path`.
+    Metadata is looked up at most once per path during a resolution, so sources need no caching of their own.
+    """
+
+    @abstractmethod
+    def open(self, path: str) -> IO[str]:
+        """Open the file *path* for reading text.
+
+        Raises:
+            FileNotFoundError: If there is no file at *path*.
+        """
+
+    @abstractmethod
+    def stat(self, path: str) -> Optional[Union[os.stat_result, SourceStat]]:
+        """Return the metadata of *path*, following symbolic links, or None if it does not exist."""
+
+    def lstat(self, path: str) -> Optional[Union[os.stat_result, SourceStat]]:
+        """Return the metadata of *path* itself, or None if it does not exist. Defaults to `stat`, for sources
+        without symbolic links."""
+        return self.stat(path)
+
+    def realpath(self, path: str) -> str:
+        """Return the canonical form of *path*, like `os.path.realpath`. Defaults to the normalized absolute path, for
+        sources without symbolic links."""
+        return os.path.abspath(path)
+
+    @abstractmethod
+    def scandir(self, path: str) -> list[SourceEntry]:
+        """Return the entries of the directory *path*, or an empty list if it cannot be listed."""
+
+
+class LocalSource(Source):
+    """The local filesystem; the default source."""
+
+    def open(self, path: str) -> IO[str]:
+        return open(path)
+
+    def stat(self, path: str) -> Optional[os.stat_result]:
+        try:
+            return os.stat(path)
+        except (OSError, ValueError):
+            return None
+
+    def lstat(self, path: str) -> Optional[os.stat_result]:
+        try:
+            return os.lstat(path)
+        except (OSError, ValueError):
+            return None
+
+    def realpath(self, path: str) -> str:
+        return os.path.realpath(path)
+
+    def scandir(self, path: str) -> list[os.DirEntry]:
+        try:
+            with os.scandir(path) as entries:
+                return list(entries)
+        except OSError:
+            return []
+
+
+class _MemoryEntry(NamedTuple):
+    name: str
+    path: str
+    directory: bool
+
+    def is_dir(self, *, follow_symlinks: bool = True) -> bool:
+        return self.directory
+
+    def is_file(self, *, follow_symlinks: bool = True) -> bool:
+        return not self.directory
+
+    def is_symlink(self) -> bool:
+        return False
+
+
+class _TreeSource(Source):
+    """A source whose every file and directory is known up front, from a mapping or an index.
+
+    Directories are implied by the paths of the files they contain.
+    """
+
+    def __init__(self):
+        self._stats: dict[str, SourceStat] = {}
+        self._directories: dict[str, dict[str, bool]] = {}
+
+    def _add(self, path: str, st: SourceStat) -> None:
+        """Register the file or directory at the absolute, normalized *path*."""
+        self._stats[path] = st
+        if stat.S_ISDIR(st.st_mode):
+            self._directories.setdefault(path, {})
+        # Register the entry in its directory, and each new directory in its parent, up to a known directory.
+        directory, is_dir = path, stat.S_ISDIR(st.st_mode)
+        while True:
+            parent, name = os.path.split(directory)
+            if not name:
+                break
+            known = parent in self._directories
+            self._directories.setdefault(parent, {})[name] = is_dir
+            if known:
+                break
+            directory, is_dir = parent, True
+
+    def stat(self, path: str) -> Optional[SourceStat]:
+        # The tree is keyed by normalized paths, but the resolver asks for paths such as `/cfg/..`, as on disk.
+        path = os.path.normpath(path)
+        st = self._stats.get(path)
+        if st is not None:
+            return st
+        if path in self._directories:
+            return SourceStat(stat.S_IFDIR | 0o555, 0)
+        return None
+
+    def scandir(self, path: str) -> list[_MemoryEntry]:
+        return [
+            _MemoryEntry(name, os.path.join(path, name), directory)
+            for name, directory in self._directories.get(
+                os.path.normpath(path), {}
+            ).items()
+        ]
+
+
+class InMemorySource(_TreeSource):
+    """Files held in memory, e.g. a configuration bundle received over the network.
+
+    Directories are implied by the paths of the files they contain.
+
+    Args:
+        files (Mapping[str, str | bytes]): Contents of each file, keyed by path. Relative paths are relative to the
+            current directory, as on disk. Bytes are decoded as UTF-8.
+    """
+
+    def __init__(self, files: Mapping[PathLike, Union[str, bytes]]):
+        super().__init__()
+        self._files: dict[str, bytes] = {}
+        for path, content in files.items():
+            path = os.path.abspath(path)
+            content = content.encode("utf-8") if isinstance(content, str) else content
+            self._files[path] = content
+            self._add(path, SourceStat(stat.S_IFREG | 0o444, len(content)))
+
+    def __repr__(self):
+        return f"InMemorySource({len(self._files)} files)"
+
+    def open(self, path: str) -> IO[str]:
+        try:
+            content = self._files[os.path.normpath(path)]
+        except KeyError:
+            raise FileNotFoundError(f"File '{path}' does not exist.") from None
+        return io.StringIO(content.decode("utf-8"))
+
+
+class ArchiveSource(_TreeSource):
+    """Members of a zip or tar archive, read in place without extracting the archive.
+
+    The members are mounted under *root*, which defaults to the path of the archive itself, as if the archive were a
+    directory: the member `config/root.yaml` of `bundle.zip` is at `bundle.zip/config/root.yaml`. Only the index of the
+    archive is read up front, and a member is decompressed when it is opened. Zip archives and uncompressed tar
+    archives are read at the offset of each member; a compressed tar archive may have to be decompressed again from its
+    start to go back to an earlier member.
+
+    Only regular files and directories are served. Symbolic links, hard links and device members are left out, as are
+    members whose names are absolute or contain `..`, so that no member can stand for a path outside *root*.
+
+    The source keeps the archive open until `close` is called, or until the end of a `with` block.
+
+    Args:
+        archive (str | os.PathLike | IO[bytes]): Path of the archive, or a seekable binary file holding it.
+        root (str | os.PathLike, optional): Directory to mount the members under. Required when *archive* is a file
+            object.
+
+    Raises:
+        ValueError: If *archive* is neither a zip nor a tar archive, or if it is a file object and *root* is missing.
+    """
+
+    def __init__(
+        self, archive: Union[PathLike, IO[bytes]], root: Optional[PathLike] = None
+    ):
+        super().__init__()
+        if root is None:
+            if not isinstance(archive, (str, os.PathLike)):
+                raise ValueError("A root is required to mount an archive file object.")
+            root = archive
+        self.root = os.path.abspath(root)
+        self._members: dict[str, Union[zipfile.ZipInfo, tarfile.TarInfo]] = {}
+        self._zip: Optional[zipfile.ZipFile] = None
+        self._tar: Optional[tarfile.TarFile] = None
+        # Closes whichever archive is opened, on `close`.
+        self._archive = ExitStack()
+        if zipfile.is_zipfile(archive):
+            self._zip = self._archive.enter_context(zipfile.ZipFile(archive))
+            self._index_zip()
+            return
+        if not isinstance(archive, (str, os.PathLike)):
+            archive.seek(0)
+        try:
+            if isinstance(archive, (str, os.PathLike)):
+                tar = tarfile.TarFile.open(archive)
+            else:
+                tar = tarfile.TarFile.open(fileobj=archive)
+            self._tar = self._archive.enter_context(tar)
+        except tarfile.ReadError:
+            raise ValueError(
+                f"{archive!r} is neither a zip nor a tar archive."
+            ) from None
+        self._index_tar()
+
+    def __repr__(self):
+        return f"ArchiveSource({self.root!r}, {len(self._members)} files)"
+
+    def __enter__(self) -> "ArchiveSource":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Close the archive."""
+        self._archive.close()
+
+    def _mount(self, name: str) -> Optional[str]:
+        """Return the path of the member *name* under the root, or None if the name could leave it."""
+        name = name.replace("\\", "/")
+        if name.startswith("/"):
+            return None
+        parts = [part for part in name.split("/") if part not in ("", ".")]
+        if not parts or ".." in parts:
+            return None
+        return os.path.join(self.root, *parts)
+
+    def _index_zip(self) -> None:
+        for info in self._zip.infolist():
+            path = self._mount(info.filename)
+            if path is None:
+                continue
+            mtime_ns = int(time.mktime((*info.date_time, 0, 0, -1))) * 10**9
+            if info.is_dir():
+                self._add(path, SourceStat(stat.S_IFDIR | 0o555, 0, mtime_ns))
+            elif not stat.S_ISLNK(info.external_attr >> 16):
+                self._members[path] = info
+                self._add(
+                    path, SourceStat(stat.S_IFREG | 0o444, info.file_size, mtime_ns)
+                )
+
+    def _index_tar(self) -> None:
+        for info in self._tar.getmembers():
+            path = self._mount(info.name)
+            if path is None:
+                continue
+            mtime_ns = int(info.mtime) * 10**9
+            if info.isdir():
+                self._add(path, SourceStat(stat.S_IFDIR | 0o555, 0, mtime_ns))
+            elif info.isfile():
+                self._members[path] = info
+                self._add(path, SourceStat(stat.S_IFREG | 0o444, info.size, mtime_ns))
+
+    def open(self, path: str) -> IO[str]:
+        try:
+            info = self._members[os.path.normpath(path)]
+        except KeyError:
+            raise FileNotFoundError(f"File '{path}' does not exist.") from None
+        if self._zip is not None:
+            member = self._zip.open(info)
+        else:
+            member = self._tar.extractfile(info)
+        return io.TextIOWrapper(member, encoding="utf-8")
+
+
+class _VirtualFileSource(Source):
+    """*base*, plus a single file held in memory at *path*, e.g. a root document read from a string or stdin.
+
+    Args:
+        base (Source): Source of every other file.
+        path (str): Canonical absolute path of the virtual file.
+        text (str): Contents of the virtual file.
+    """
+
+    def __init__(self, base: Source, path: str, text: str):
+        self.base = base
+        self.path = path
+        self._directory, self._name = os.path.split(path)
+        self._text = text
+        self._stat = SourceStat(stat.S_IFREG | 0o444, len(text.encode("utf-8")))
+
+    def _is_virtual(self, path: str) -> bool:
+        return os.path.normpath(path) == self.path
+
+    def open(self, path: str) -> IO[str]:
+        if self._is_virtual(path):
+            return io.StringIO(self._text)
+        return self.base.open(path)
+
+    def stat(self, path: str) -> Optional[Union[os.stat_result, SourceStat]]:
+        return self._stat if self._is_virtual(path) else self.base.stat(path)
+
+    def lstat(self, path: str) -> Optional[Union[os.stat_result, SourceStat]]:
+        return self._stat if self._is_virtual(path) else self.base.lstat(path)
+
+    def realpath(self, path: str) -> str:
+        return self.path if self._is_virtual(path) else self.base.realpath(path)
+
+    def scandir(self, path: str) -> list[SourceEntry]:
+        entries = self.base.scandir(path)
+        if os.path.normpath(path) != self._directory:
+            return entries
+        # The virtual file shadows a file of the same name, as it does for `open` and `stat`.
+        return [entry for entry in entries if entry.name != self._name] + [
+            _MemoryEntry(self._name, os.path.join(path, self._name), False)
+        ]
@@ -0,0 +1,220 @@
+import json
+import os
+import time
+from collections.abc import Iterator
+from contextlib import AbstractContextManager, contextmanager, nullcontext
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Optional, Union
+
+
+@dataclass
+class FileStats:
+    """Timings and counters collected for one file during a load.
+
+    Args:
+        path (str): Resolved path of the file.
+        loads (int): Number of times the file was read and parsed (once per distinct anchor it is referenced with).
+        bytes_read (int): Total number of bytes read from the file, over all loads.
+        references (int): Number of `!reference`/`!reference-all` tags that resolved to the file.
+        parse_seconds (float): Time spent scanning, parsing and composing the file, excluding construction.
+        construct_seconds (float): Time spent constructing Python objects from the parsed documents.
+        anchor_seconds (float): Time spent extracting anchored nodes from the file, excluding construction.
+    """
+
+    path: str
+    loads: int = 0
+    bytes_read: int = 0
+    references: int = 0
+    parse_seconds: float = 0.0
+    construct_seconds: float = 0.0
+    anchor_seconds: float = 0.0
+
+
+@dataclass
+class LoadStats:
+    """Opt-in statistics collector for `load_yaml_with_references` and `parse_yaml_with_references`.
+
+    Pass an instance through the `stats` argument; the collector is filled while the call runs and can be reused to
+    accumulate over several calls. Timings are wall-clock seconds. Leaving `stats` unset skips all bookkeeping.
+
+    Args:
+        files (dict[str, FileStats]): Per-file statistics, keyed by resolved path.
+        passes (dict[str, float]): Time spent in each pass: "attribute", "resolve" (which includes parsing every
+            referenced file), "prune", "flatten" and "merge".
+        total_seconds (float): Total time spent in the instrumented calls.
+        glob_expansions (int): Number of `!reference-all` globs expanded.
+        glob_matches (int): Number of allowed files matched by those globs.
+        cache_hits (int): Filesystem metadata lookups answered from the per-load cache.
+        cache_misses (int): Filesystem metadata lookups that reached the filesystem.
+        trace (bool): Also keep every span as a Chrome trace event, see `trace_events` and `write_trace`.
+    """
+
+    files: dict[str, FileStats] = field(default_factory=dict)
+    passes: dict[str, float] = field(default_factory=dict)
+    total_seconds: float = 0.0
+    glob_expansions: int = 0
+    glob_matches: int = 0
+    cache_hits: int = 0
+    cache_misses: int = 0
+    trace: bool = False
+    _events: list[dict[str, Any]] = field(default_factory=list, repr=False)
+    # Open spans, innermost last: [time spent in child spans, path of the file the span belongs to].
+    _stack: list[list[Any]] = field(default_factory=list, repr=False)
+
+    def file(self, path: str) -> FileStats:
+        """Return the statistics of *path*, creating them on first use."""
+        try:
+            return self.files[path]
+        except KeyError:
+            file_stats = self.files[path] = FileStats(path=path)
+            return file_stats
+
+    @contextmanager
+    def span(
+        self, category: str, name: str, path: Optional[str] = None
+    ) -> Iterator[None]:
+        """Time the enclosed block and add it to the matching statistic.
+
+        Spans nest: the time of a span excludes that of the spans opened inside it wherever the statistic is exclusive
+        (parse and anchor times), so that construction is never counted twice. A span without *path* belongs to the
+        file of its innermost enclosing span.
+
+        Args:
+            category (str): One of "load", "parse", "anchor", "construct", "reference", "glob", "pass" or "output".
+            name (str): Name of the pass for the "pass" category; a label for the others.
+            path (str, optional): File the span belongs to.
+        """
+        if path is None and self._stack:
+            path = self._stack[-1][1]
+        frame = [0.0, path]
+        self._stack.append(frame)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self._stack.pop()
+            if self._stack:
+                self._stack[-1][0] += elapsed
+            self._record(category, name, path, elapsed, elapsed - frame[0])
+            if self.trace:
+                self._trace(category, name, path, start, elapsed)
+
+    def _trace(
+        self,
+        category: str,
+        name: str,
+        path: Optional[str],
+        start: float,
+        elapsed: float,
+    ) -> None:
+        event = {
+            "name": name,
+            "cat": category,
+            "ph": "X",
+            "ts": start * 1e6,
+            "dur": elapsed * 1e6,
+            "pid": os.getpid(),
+            "tid": 0,
+        }
+        if path is not None:
+            event["args"] = {"path": path}
+        self._events.append(event)
+
+    def _record(
+        self,
+        category: str,
+        name: str,
+        path: Optional[str],
+        elapsed: float,
+        exclusive: float,
+    ) -> None:
+        if category == "load":
+            self.total_seconds += elapsed
+        elif category == "pass":
+            self.passes[name] = self.passes.get(name, 0.0) + elapsed
+        elif path is not None:
+            if category == "parse":
+                self.file(path).parse_seconds += exclusive
+            elif category == "construct":
+                self.file(path).construct_seconds += elapsed
+            elif category == "anchor":
+                self.file(path).anchor_seconds += exclusive
+
+    def trace_events(self) -> list[dict[str, Any]]:
+        """Return the spans recorded with `trace=True` as Chrome trace "complete" events.
+
+        Events are ordered by start time and their timestamps, in microseconds, are relative to the earliest span. Each
+        referenced file nests under the file that references it, so the hierarchy follows the reference chain.
+
+        Returns:
+            list[dict[str, Any]]: The trace events.
+        """
+        if not self._events:
+            return []
+        origin = min(event["ts"] for event in self._events)
+        events = [{**event, "ts": event["ts"] - origin} for event in self._events]
+        # Outer spans first on ties, so that viewers nest spans which start in the same microsecond correctly.
+        events.sort(key=lambda event: (event["ts"], -event["dur"]))
+        return events
+
+    def write_trace(self, path: Union[str, os.PathLike]) -> None:
+        """Write the recorded spans to *path* in the Chrome trace-event format.
+
+        The file opens in chrome://tracing, https://ui.perfetto.dev and https://www.speedscope.app.
+
+        Args:
+            path (str | os.PathLike): Destination file.
+        """
+        trace = {"traceEvents": self.trace_events(), "displayTimeUnit": "ms"}
+        Path(path).write_text(json.dumps(trace, indent=1) + "\n")
+
+    def report(self) -> dict[str, Any]:
+        """Return the collected statistics as plain, JSON-serializable data.
+
+        Returns:
+            dict[str, Any]: Totals, per-pass times, glob and cache counters, and per-file statistics ordered by the
+            time spent on each file, slowest first.
+        """
+
+        def _file_seconds(file_stats: FileStats) -> float:
+            return (
+                file_stats.parse_seconds
+                + file_stats.construct_seconds
+                + file_stats.anchor_seconds
+            )
+
+        files = sorted(self.files.values(), key=_file_seconds, reverse=True)
+        return {
+            "total_seconds": self.total_seconds,
+            "files_loaded": len(self.files),
+            "bytes_read": sum(file_stats.bytes_read for file_stats in files),
+            "passes": dict(self.passes),
+            "globs": {
+                "expansions": self.glob_expansions,
+                "matches": self.glob_matches,
+            },
+            "cache": {"hits": self.cache_hits, "misses": self.cache_misses},
+            "files": [
+                {
+                    "path": file_stats.path,
+                    "loads": file_stats.loads,
+                    "bytes_read": file_stats.bytes_read,
+                    "references": file_stats.references,
+                    "parse_seconds": file_stats.parse_seconds,
+                    "construct_seconds": file_stats.construct_seconds,
+                    "anchor_seconds": file_stats.anchor_seconds,
+                }
+                for file_stats in files
+            ],
+        }
+
+
+def _span(
+    stats: Optional[LoadStats], category: str, name: str, path: Optional[str] = None
+) -> AbstractContextManager[None]:
+    """`LoadStats.span`, or a no-op context manager when statistics are disabled."""
+    if stats is None:
+        return nullcontext()
+    return stats.span(category, name, path)